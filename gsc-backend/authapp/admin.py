@@ -1,13 +1,57 @@
+import json
+
 from django.contrib import admin
-from .models import GoogleCredentials, CalendarItem
+from django.utils.html import format_html
+from .models import GoogleCredentials, CalendarItem, WatchChannel, RequestProfile, SyncSchedule
 
 @admin.register(GoogleCredentials)
 class GoogleCredentialsAdmin(admin.ModelAdmin):
     list_display = ('email', 'name', 'expiry')
     search_fields = ('email', 'name')
 
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'route', 'status', 'duration_ms', 'query_count', 'google_call_count', 'trigger')
+    list_filter = ('trigger', 'method', 'status')
+    search_fields = ('path', 'route')
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+    fields = (
+        'created_at', 'method', 'path', 'route', 'status', 'duration_ms', 'trigger',
+        'query_count', 'query_ms', 'google_call_count', 'google_ms',
+        'profile_report', 'google_calls_report', 'queries_report',
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description='Profile')
+    def profile_report(self, obj):
+        return format_html('<pre style="white-space: pre; overflow-x: auto">{}</pre>', obj.profile)
+
+    @admin.display(description='Google calls')
+    def google_calls_report(self, obj):
+        return format_html('<pre>{}</pre>', json.dumps(obj.google_calls, indent=2))
+
+    @admin.display(description='SQL queries')
+    def queries_report(self, obj):
+        lines = [f"{query['ms']:>8.2f} ms  {query['sql']}" for query in obj.queries]
+        return format_html('<pre style="white-space: pre-wrap">{}</pre>', "\n".join(lines))
+
 @admin.register(CalendarItem)
 class CalendarItemAdmin(admin.ModelAdmin):
     list_display = ('type', 'title', 'start_at', 'sync_status', 'user')
     list_filter = ('type', 'sync_status', 'is_holiday')
     search_fields = ('title', 'description', 'user__username')
+
+@admin.register(WatchChannel)
+class WatchChannelAdmin(admin.ModelAdmin):
+    list_display = ('calendar_id', 'user', 'channel_id', 'expiration')
+    search_fields = ('calendar_id', 'user__username', 'channel_id')
+
+@admin.register(SyncSchedule)
+class SyncScheduleAdmin(admin.ModelAdmin):
+    list_display = ('credentials', 'next_sync_at', 'last_synced_at', 'last_active_at', 'failures')
+    search_fields = ('credentials__email',)
+    ordering = ('next_sync_at',)
@@ -0,0 +1,156 @@
+import asyncio
+import time
+import weakref
+from urllib.parse import quote
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import metrics, throttle
+from .credentials import credential_manager
+from .services import get_discovery_document
+
+# httpx clients are bound to the event loop that created them
+_clients = weakref.WeakKeyDictionary()
+
+
+class GoogleAPIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"Google API error {status}: {message}")
+        self.status = status
+
+
+def get_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.GOOGLE_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GOOGLE_ASYNC_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(settings.GOOGLE_HTTP_READ_TIMEOUT, connect=settings.GOOGLE_HTTP_CONNECT_TIMEOUT),
+            transport=httpx.AsyncHTTPTransport(retries=settings.GOOGLE_HTTP_RETRIES),
+        )
+        _clients[loop] = client
+    return client
+
+
+def api_url(api, version, path):
+    # Same roots as the googleapiclient services, including GOOGLE_API_ROOT_URL overrides
+    document = get_discovery_document(api, version)
+    return document["rootUrl"] + document["servicePath"] + path
+
+
+def _error_message(response):
+    try:
+        return response.json()["error"]["message"]
+    except (ValueError, KeyError, TypeError):
+        return response.text
+
+
+async def google_request(email, method, api, version, path, params=None, body=None, method_id=None):
+    creds = credential_manager.cached(email) or await sync_to_async(credential_manager.get)(email)
+    url = api_url(api, version, path)
+
+    response = None
+    refreshed = False
+    attempt = 0
+    deadline = time.monotonic() + settings.GOOGLE_RATE_LIMIT_MAX_WAIT
+    while True:
+        await throttle.acquire_async(email)
+        token = creds.token
+        started = time.perf_counter()
+        response = await get_client().request(
+            method,
+            url,
+            params={k: v for k, v in (params or {}).items() if v is not None},
+            json=body,
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        metrics.record_google_call(
+            time.perf_counter() - started,
+            response.status_code,
+            len(response.request.content),
+            len(response.content),
+            method=method_id or f"{api}.{method}",
+        )
+        if response.status_code == 401 and not refreshed and creds.refresh_token:
+            refreshed = True
+            await sync_to_async(credential_manager.refresh)(email, creds, trigger="unauthorized", rejected_token=token)
+            continue
+        if throttle.is_rate_limited(response.status_code, response.content):
+            throttle.record("throttled")
+            retry_after = response.headers.get("retry-after")
+            delay = throttle.backoff_delay(attempt, retry_after)
+            if attempt == settings.GOOGLE_RATE_LIMIT_RETRIES or time.monotonic() + delay > deadline:
+                raise throttle.RateLimitExceeded(_error_message(response), retry_after=retry_after or delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        break
+
+    if response.status_code < 400:
+        throttle.record("success")
+    else:
+        raise GoogleAPIError(response.status_code, _error_message(response))
+    return response.json() if response.content else None
+
+
+def calendar_path(calendar_id, *parts):
+    return "/".join(["calendars", quote(calendar_id, safe="")] + [quote(p, safe="") for p in parts])
+
+
+async def list_events(email, calendar_id="primary", page_token=None, max_results=250, fields=None):
+    return await google_request(
+        email, "GET", "calendar", "v3", calendar_path(calendar_id, "events"),
+        params={
+            "maxResults": max_results, "singleEvents": "true", "orderBy": "startTime",
+            "pageToken": page_token, "fields": fields,
+        },
+        method_id="calendar.events.list",
+    )
+
+
+async def insert_event(email, calendar_id, body):
+    return await google_request(
+        email, "POST", "calendar", "v3", calendar_path(calendar_id, "events"),
+        params={"conferenceDataVersion": 1, "sendUpdates": "all"},
+        body=body,
+        method_id="calendar.events.insert",
+    )
+
+
+async def patch_event(email, calendar_id, event_id, body):
+    return await google_request(
+        email, "PATCH", "calendar", "v3", calendar_path(calendar_id, "events", event_id),
+        body=body,
+        method_id="calendar.events.patch",
+    )
+
+
+async def delete_event(email, calendar_id, event_id):
+    await google_request(
+        email, "DELETE", "calendar", "v3", calendar_path(calendar_id, "events", event_id),
+        method_id="calendar.events.delete",
+    )
+
+
+async def list_calendars(email):
+    return await google_request(email, "GET", "calendar", "v3", "users/me/calendarList", method_id="calendar.calendarList.list")
+
+
+async def list_tasks(email, tasklist="@default", fields=None):
+    tasks = []
+    page_token = None
+    while True:
+        result = await google_request(
+            email, "GET", "tasks", "v1", f"tasks/v1/lists/{quote(tasklist, safe='')}/tasks",
+            params={"showCompleted": "false", "maxResults": 100, "pageToken": page_token, "fields": fields},
+            method_id="tasks.tasks.list",
+        )
+        tasks.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return tasks
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AuthappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authapp'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .metrics import watch_connection
+
+        connection_created.connect(watch_connection)
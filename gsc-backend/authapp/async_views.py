@@ -0,0 +1,159 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from . import aio
+from .caching import revalidate
+from .google_helpers import build_event_body, build_event_patch
+from .payloads import FastJsonResponse, google_fields, parse_fields, project
+from .sync import mirror_event, unmirror_events
+from .throttle import error_status, retry_headers
+
+# Async counterparts of the Google-bound views. Under ASGI a worker keeps many
+# Google round-trips in flight instead of blocking a thread on each one.
+
+
+@revalidate
+async def fetch_google_events(request):
+    email = request.GET.get("email")
+    calendar_id = request.GET.get("calendar_id", "primary")
+
+    if not email:
+        return JsonResponse({"error": "Email is required"}, status=400)
+
+    try:
+        fields = parse_fields(request.GET.get("fields"))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        result = await aio.list_events(
+            email, calendar_id, page_token=request.GET.get("cursor"), fields=google_fields(fields),
+        )
+        return FastJsonResponse({
+            "events": project(result.get("items", []), fields),
+            "next_cursor": result.get("nextPageToken"),
+        })
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
+
+
+@csrf_exempt
+async def create_event(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=400)
+
+    try:
+        body = json.loads(request.body)
+    except Exception:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+
+    email = body.get("email")
+    title = body.get("title") or body.get("summary")
+    calendar_id = body.get("calendar_id", "primary")
+
+    if not email or not title or not body.get("start") or not body.get("end"):
+        return JsonResponse({"error": "Missing fields. Required: email, summary/title, start, end"}, status=400)
+
+    event_body = build_event_body({
+        "title": title,
+        "description": body.get("description", ""),
+        "start_at": body["start"],
+        "end_at": body["end"],
+        "attendees": body.get("attendees", []),
+        "add_meet": bool(body.get("add_meet")),
+    })
+
+    try:
+        created = await aio.insert_event(email, calendar_id, event_body)
+        await sync_to_async(mirror_event)(email, calendar_id, created)
+        return JsonResponse({"success": True, "event": created, "event-link": created.get("htmlLink")}, status=201)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
+
+
+@csrf_exempt
+async def update_event(request):
+    if request.method != "PUT":
+        return JsonResponse({"error": "PUT required"}, status=400)
+
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+
+    email = body.get("email")
+    event_id = body.get("event_id")
+    calendar_id = body.get("calendar_id", "primary")
+
+    if not email or not event_id:
+        return JsonResponse({"error": "Missing email or event_id"}, status=400)
+
+    try:
+        updated_event = await aio.patch_event(email, calendar_id, event_id, build_event_patch(body))
+        await sync_to_async(mirror_event)(email, calendar_id, updated_event)
+        return JsonResponse({"success": True, "event": updated_event})
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
+
+
+@csrf_exempt
+async def delete_event(request):
+    if request.method != "DELETE":
+        return JsonResponse({"error": "DELETE required"}, status=400)
+
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+
+    email = body.get("email")
+    event_id = body.get("event_id")
+    calendar_id = body.get("calendar_id", "primary")
+
+    if not email or not event_id:
+        return JsonResponse({"error": "Missing email or event_id"}, status=400)
+
+    try:
+        await aio.delete_event(email, calendar_id, event_id)
+        await sync_to_async(unmirror_events)(email, calendar_id, [event_id])
+        return JsonResponse({"success": True})
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
+
+
+@revalidate
+async def get_tasks(request):
+    email = request.GET.get("email")
+    if not email:
+        return JsonResponse({"error": "Email is required"}, status=400)
+
+    try:
+        fields = parse_fields(request.GET.get("fields"))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        tasks = await aio.list_tasks(email, request.GET.get("tasklist", "@default"), fields=google_fields(fields))
+        return FastJsonResponse({"tasks": project(tasks, fields)})
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
+
+
+@revalidate
+async def list_calendars(request):
+    email = request.GET.get("email")
+    if not email:
+        return JsonResponse({"error": "email is required"}, status=400)
+
+    try:
+        calendars = await aio.list_calendars(email)
+        result = [
+            {"id": c["id"], "summary": c.get("summary", ""), "primary": c.get("primary", False)}
+            for c in calendars.get("items", [])
+        ]
+        return JsonResponse({"calendars": result})
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
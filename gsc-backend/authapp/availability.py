@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .google_helpers import get_google_creds
+from .mirror import ensure_fresh
+from .models import CalendarItem, GoogleCredentials
+from .recurrence import expand_masters
+from .services import calendar_service
+from .sync import PRIMARY_CALENDAR, resolve_calendar_id
+from .throttle import execute
+
+# freebusy().query accepts at most 50 calendars per call
+FREEBUSY_BATCH_SIZE = 50
+
+# Longest range a single availability query may cover
+MAX_AVAILABILITY_DAYS = 62
+
+# Each day's slot grid starts on these boundaries (minutes past the hour)
+SLOT_GRANULARITY = timedelta(minutes=15)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def merge_intervals(intervals, buffer=timedelta(0)):
+    """Sorts (start, end) pairs and folds overlapping or touching ones together.
+
+    Each interval is first widened by buffer on both sides, so back-to-back
+    meetings keep that much room between them.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        start, end = start - buffer, end + buffer
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def working_windows(time_min, time_max, tz, work_start, work_end, work_days):
+    """Yields each day's working hours inside [time_min, time_max), in order."""
+    day = time_min.astimezone(tz).date()
+    last_day = time_max.astimezone(tz).date()
+    while day <= last_day:
+        if day.weekday() in work_days:
+            # Combining in the local zone keeps working hours right across DST changes
+            start = max(datetime.combine(day, work_start, tzinfo=tz), time_min)
+            end = min(datetime.combine(day, work_end, tzinfo=tz), time_max)
+            if start < end:
+                yield start, end
+        day += timedelta(days=1)
+
+
+def _align(moment):
+    remainder = (moment - _EPOCH) % SLOT_GRANULARITY
+    return moment + (SLOT_GRANULARITY - remainder) if remainder else moment
+
+
+def free_slots(busy, windows, duration, step=None):
+    """Slots of the given duration inside windows that do not touch any busy interval.
+
+    busy must be sorted and merged (see merge_intervals) and windows sorted, which
+    lets a single sweep over both lists do the work.
+    """
+    step = step or duration
+    slots = []
+
+    def fill(origin, start, end):
+        # Slots sit on a grid of step from the window's first aligned start
+        if start > origin:
+            start = origin + -((origin - start) // step) * step
+        else:
+            start = origin
+        while start + duration <= end:
+            slots.append((start, start + duration))
+            start += step
+
+    first = 0
+    for window_start, window_end in windows:
+        # Busy intervals that ended before this window can never matter again
+        while first < len(busy) and busy[first][1] <= window_start:
+            first += 1
+
+        origin = _align(window_start)
+        cursor = window_start
+        index = first
+        while index < len(busy) and busy[index][0] < window_end:
+            busy_start, busy_end = busy[index]
+            if busy_start > cursor:
+                fill(origin, cursor, busy_start)
+            cursor = max(cursor, busy_end)
+            index += 1
+        if cursor < window_end:
+            fill(origin, cursor, window_end)
+
+    return slots
+
+
+def mirror_busy(email, time_min, time_max, active=True):
+    """Busy intervals on the primary calendar, from the local mirror of a user we hold credentials for.
+
+    Like freebusy for everyone else, only the primary calendar counts.
+    """
+    calendar_id = resolve_calendar_id(email, PRIMARY_CALENDAR)
+    ensure_fresh(email, calendar_id, active=active)
+    items = (
+        CalendarItem.objects.filter(
+            user__username=email,
+            google_calendar_id=calendar_id,
+            type__in=[CalendarItem.TYPE_EVENT, CalendarItem.TYPE_APPOINTMENT],
+            sync_status=CalendarItem.SYNC_SYNCED,
+            start_at__lt=time_max,
+        )
+        # Events marked "show as available" do not block time. Most events carry no
+        # transparency key at all, and a bare exclude() would drop those too.
+        .filter(Q(metadata__transparency__isnull=True) | ~Q(metadata__transparency="transparent"))
+    )
+
+    busy = list(items.filter(is_recurring=False, end_at__gt=time_min).values_list("start_at", "end_at"))
+    masters = items.filter(is_recurring=True).filter(
+        Q(recurrence_end_at__isnull=True) | Q(recurrence_end_at__gt=time_min)
+    )
+    busy.extend((o.start_at, o.end_at) for o in expand_masters(masters, time_min, time_max))
+    return busy
+
+
+def freebusy_busy(email, calendar_ids, time_min, time_max):
+    """Asks Google for everyone else's busy times, 50 calendars per query.
+
+    Returns ({calendar_id: [(start, end), ...]}, {calendar_id: error reason}).
+    """
+    service = calendar_service(get_google_creds(email), email)
+    busy, errors = {}, {}
+
+    for offset in range(0, len(calendar_ids), FREEBUSY_BATCH_SIZE):
+        chunk = calendar_ids[offset:offset + FREEBUSY_BATCH_SIZE]
+        result = execute(service.freebusy().query(body={
+            "timeMin": time_min.isoformat(),
+            "timeMax": time_max.isoformat(),
+            "items": [{"id": calendar_id} for calendar_id in chunk],
+        }), email)
+
+        for calendar_id, calendar in result.get("calendars", {}).items():
+            if calendar.get("errors"):
+                errors[calendar_id] = calendar["errors"][0].get("reason", "unknown")
+                continue
+            busy[calendar_id] = [
+                (parse_datetime(period["start"]), parse_datetime(period["end"]))
+                for period in calendar.get("busy", [])
+            ]
+
+    return busy, errors
+
+
+def find_availability(email, attendees, time_min, time_max, tz, work_start, work_end, work_days,
+                      duration, buffer=timedelta(0)):
+    """Free slots shared by the requesting user and every attendee.
+
+    Attendees who signed in here are read from the mirror; the rest go to freebusy
+    using the requester's credentials.
+    """
+    people = list(dict.fromkeys([email] + list(attendees)))
+    local = set(GoogleCredentials.objects.filter(email__in=people).values_list("email", flat=True))
+
+    intervals = []
+    for person in people:
+        if person in local:
+            # Attendees are read on the requester's behalf, which says nothing of their own use
+            intervals.extend(mirror_busy(person, time_min, time_max, active=person == email))
+
+    errors = {}
+    remote = [person for person in people if person not in local]
+    if remote:
+        busy, errors = freebusy_busy(email, remote, time_min, time_max)
+        for periods in busy.values():
+            intervals.extend(periods)
+
+    busy = merge_intervals(intervals, buffer)
+    windows = working_windows(time_min, time_max, tz, work_start, work_end, work_days)
+    return free_slots(busy, list(windows), duration), busy, errors
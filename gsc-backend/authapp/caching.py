@@ -0,0 +1,143 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.views.decorators.cache import cache_control
+from googleapiclient.errors import HttpError
+
+from .models import GoogleCredentials
+from .payloads import dumps
+from .throttle import execute
+
+# Stale entries are kept this long so their Google ETag can still be revalidated
+REVALIDATE_FOR = 24 * 3600
+
+stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def record(name):
+    with _stats_lock:
+        stats[name] += 1
+
+
+def cache_key(kind, email):
+    # Hashed so any email is a valid key for memcached-style backends too
+    return f"gsc:{kind}:{hashlib.sha256(email.lower().encode()).hexdigest()}"
+
+
+def invalidate_user_cache(email, kinds=("profile", "calendars")):
+    cache.delete_many([cache_key(kind, email) for kind in kinds])
+
+
+def get_profile(email):
+    """Name, picture and email for a signed-in user; raises GoogleCredentials.DoesNotExist."""
+    key = cache_key("profile", email)
+    profile = cache.get(key)
+    if profile is not None:
+        record("profile_hit")
+        return profile
+
+    record("profile_miss")
+    creds = GoogleCredentials.objects.only("name", "picture", "email").get(email=email)
+    profile = {"name": creds.name, "picture": creds.picture, "email": creds.email}
+    cache.set(key, profile, settings.PROFILE_CACHE_TTL)
+    return profile
+
+
+def cached_google_list(email, kind, make_request, ttl):
+    """Returns a Google list response, cached per user for ttl seconds.
+
+    Once the ttl is up the request goes out with the previous response's ETag, so an
+    unchanged list comes back as an empty 304 instead of being downloaded again.
+    """
+    key = cache_key(kind, email)
+    entry = cache.get(key)
+    now = time.time()
+    if entry and entry["fresh_until"] > now:
+        record(f"{kind}_hit")
+        return entry["data"]
+
+    request = make_request()
+    if entry and entry["data"].get("etag"):
+        request.headers["If-None-Match"] = entry["data"]["etag"]
+
+    try:
+        data = execute(request, email)
+        record(f"{kind}_miss")
+    except HttpError as e:
+        if e.resp.status != 304 or not entry:
+            raise
+        data = entry["data"]
+        record(f"{kind}_revalidated")
+
+    cache.set(key, {"data": data, "fresh_until": now + ttl}, ttl + REVALIDATE_FOR)
+    return data
+
+
+def calendar_list(email, service):
+    return cached_google_list(
+        email, "calendars", lambda: service.calendarList().list(), settings.CALENDAR_LIST_CACHE_TTL,
+    )
+
+
+def etag_for(body):
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def conditional_response(request, data, unversioned=None):
+    """Responds with data and a strong ETag, or a bodiless 304 if the client already has it.
+
+    unversioned keys are sent in the same JSON object but left out of the ETag, for
+    values such as when the mirror was last synced, which change on every sync even
+    when the data does not.
+    """
+    # Encoded once: the ETag is the hash of the very bytes that would be sent
+    body = dumps(data)
+    etag = etag_for(body)
+    if unversioned:
+        # Spliced into the object rather than encoding the data a second time
+        extra = dumps(unversioned)
+        body = body[:-1] + b"," + extra[1:] if data else extra
+    # Weak comparison: compression hands clients the W/ form of the ETag
+    etags = {tag.removeprefix("W/") for tag in parse_etags(request.headers.get("If-None-Match", ""))}
+    if etag in etags or "*" in etags:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    return response
+
+
+# Cache-Control per kind of endpoint. Every response is for one user, named in the
+# URL, so shared caches must not keep any of them.
+# Reads of the mirror change with each sync: clients keep them but revalidate every
+# time, which costs a 304 when nothing changed.
+revalidate = cache_control(private=True, no_cache=True)
+# Streams come straight from Google and cannot be revalidated.
+no_store = cache_control(no_store=True)
+
+
+def cached_for(seconds):
+    """For responses built from the server-side cache, reusable by clients for as long.
+
+    Only successes are cacheable; an error is revalidated like a mirror read.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                patch_cache_control(response, private=True, max_age=seconds)
+            else:
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapped
+    return decorator
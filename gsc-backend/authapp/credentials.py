@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+
+from . import metrics
+from .models import GoogleCredentials
+from .transport import get_session
+
+
+class CredentialManager:
+    """In-memory cache of per-user Google credentials with single-flight, ahead-of-expiry refresh."""
+
+    def __init__(self):
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._refresh_locks = {}
+        self._scheduler = None
+
+    def get(self, email):
+        with self._lock:
+            creds = self._cache.get(email)
+            if creds is not None:
+                self._cache.move_to_end(email)
+
+        if creds is None:
+            creds = self._load(email)
+
+        if self._needs_refresh(creds, timedelta(0)):
+            creds = self.refresh(email, creds)
+
+        self._start_scheduler()
+        return creds
+
+    def cached(self, email):
+        # Lock-free fast path for async callers; None means go through get()
+        creds = self._cache.get(email)
+        if creds is None or self._needs_refresh(creds, timedelta(0)):
+            return None
+        return creds
+
+    def invalidate(self, email):
+        with self._lock:
+            self._cache.pop(email, None)
+
+    def refresh(self, email, creds, trigger="expired", rejected_token=None):
+        """Refreshes creds in place and stores the new token, once however many threads ask.
+
+        rejected_token is the token Google turned down, when the caller saw a 401.
+        """
+        token_before = rejected_token or creds.token
+
+        with self._refresh_lock(email):
+            # Another thread may have refreshed while we were waiting for the lock
+            if creds.token != token_before and creds.valid:
+                return creds
+
+            try:
+                creds.refresh(Request(session=get_session()))
+            except Exception:
+                metrics.token_refreshes.inc(trigger=trigger, outcome="failure")
+                raise
+            metrics.token_refreshes.inc(trigger=trigger, outcome="success")
+            GoogleCredentials.objects.filter(email=email).update(
+                access_token=creds.token,
+                expiry=timezone.make_aware(creds.expiry, dt_timezone.utc),
+            )
+        return creds
+
+    def refresh_expiring(self):
+        margin = timedelta(seconds=settings.GOOGLE_TOKEN_REFRESH_MARGIN)
+        with self._lock:
+            entries = list(self._cache.items())
+
+        for email, creds in entries:
+            if not self._needs_refresh(creds, margin):
+                continue
+            try:
+                self.refresh(email, creds, trigger="background")
+            except Exception:
+                # Revoked or broken refresh tokens will fail again on the request path
+                self.invalidate(email)
+
+    def _load(self, email):
+        row = GoogleCredentials.objects.get(email=email)
+        creds = Credentials(
+            token=row.access_token,
+            refresh_token=row.refresh_token,
+            token_uri=row.token_uri,
+            client_id=row.client_id,
+            client_secret=row.client_secret,
+            expiry=timezone.make_naive(row.expiry, dt_timezone.utc) if row.expiry else None,
+        )
+
+        with self._lock:
+            # Keep whichever object won the race so refreshes stay de-duplicated
+            creds = self._cache.setdefault(email, creds)
+            self._cache.move_to_end(email)
+            while len(self._cache) > settings.GOOGLE_CREDENTIAL_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return creds
+
+    def _needs_refresh(self, creds, margin):
+        if not creds.refresh_token or creds.expiry is None:
+            return False
+        now = timezone.now().replace(tzinfo=None)
+        return creds.expiry - margin <= now
+
+    def _refresh_lock(self, email):
+        with self._lock:
+            lock = self._refresh_locks.get(email)
+            if lock is None:
+                if len(self._refresh_locks) >= 2 * settings.GOOGLE_CREDENTIAL_CACHE_SIZE:
+                    # Forget the locks of users evicted from the cache that no refresh is holding
+                    for key, held in list(self._refresh_locks.items()):
+                        if key not in self._cache and not held.locked():
+                            del self._refresh_locks[key]
+                lock = self._refresh_locks[email] = threading.Lock()
+            return lock
+
+    def _start_scheduler(self):
+        interval = settings.GOOGLE_TOKEN_REFRESH_INTERVAL
+        if self._scheduler is not None or interval <= 0:
+            return
+        with self._lock:
+            if self._scheduler is not None:
+                return
+            self._scheduler = threading.Thread(target=self._run_scheduler, args=(interval,), daemon=True)
+            self._scheduler.start()
+
+    def _run_scheduler(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh_expiring()
+            finally:
+                close_old_connections()
+
+
+credential_manager = CredentialManager()
@@ -1,31 +1,35 @@
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from .models import GoogleCredentials
-import datetime
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from .caching import calendar_list
+from .credentials import credential_manager
+from .metrics import google_method
+from .models import GoogleCredentials, CalendarItem
+from .services import calendar_service, tasks_service
+from .sync import MIRROR_KEY, PRIMARY_CALENDAR, get_mirror_user, parse_google_time, mirror_events, unmirror_events, unmirror_tasks, resolve_calendar_id, task_list_id
+from .throttle import acquire, backoff_delay, execute, is_rate_limit_error, max_count, record
+import time
+import uuid
+
+# Google rejects batches with more than 50 calls
+BATCH_SIZE = 50
+
+# Largest pages each API will hand out
+TASKS_PAGE_SIZE = 100
+EVENTS_PAGE_SIZE = 250
 
 
 def get_google_creds(user_email):
-    cred = GoogleCredentials.objects.filter(email=user_email).first()
-    if not cred:
+    try:
+        return credential_manager.get(user_email)
+    except GoogleCredentials.DoesNotExist:
         raise Exception("Google credentials not found for user.")
 
-    return Credentials(
-        token=cred.access_token,
-        refresh_token=cred.refresh_token,
-        token_uri=cred.token_uri,
-        client_id=cred.client_id,
-        client_secret=cred.client_secret,
-        scopes=[
-            "https://www.googleapis.com/auth/calendar",
-            "https://www.googleapis.com/auth/tasks",
-        ],
-    )
-
 
 def fetch_user_calendars(user_email):
     creds = get_google_creds(user_email)
-    service = build("calendar", "v3", credentials=creds, cache_discovery=False)
-    calendars = service.calendarList().list().execute()
+    service = calendar_service(creds, user_email)
+    calendars = calendar_list(user_email, service)
     return [
         {
             "id": cal["id"],
@@ -36,17 +40,15 @@ def fetch_user_calendars(user_email):
     ]
 
 
-def create_google_event(user_email, data):
-    creds = get_google_creds(user_email)
-    service = build("calendar", "v3", credentials=creds, cache_discovery=False)
+def normalize_dt(dt_str):
+    if not isinstance(dt_str, str):
+        return None
+    if len(dt_str) == 16:  # "YYYY-MM-DDTHH:MM"
+        return dt_str + ":00"
+    return dt_str
 
-    def normalize_dt(dt_str):
-        if not isinstance(dt_str, str):
-            return None
-        if len(dt_str) == 16:  # "YYYY-MM-DDTHH:MM"
-            return dt_str + ":00"
-        return dt_str
 
+def build_event_body(data):
     event_body = {
         "summary": data["title"],
         "description": data.get("description", ""),
@@ -64,7 +66,7 @@ def create_google_event(user_email, data):
     if data.get("add_meet") == True:
         event_body["conferenceData"] = {
             "createRequest": {
-                "requestId": f"meet-{datetime.datetime.utcnow().timestamp()}",
+                "requestId": f"meet-{uuid.uuid4().hex}",
                 "conferenceSolutionKey": {"type": "hangoutsMeet"},
             }
         }
@@ -74,50 +76,297 @@ def create_google_event(user_email, data):
     if attendees:
         event_body["attendees"] = [{"email": email} for email in attendees]
 
-    event = (
-        service.events()
-        .insert(
-            calendarId=data["google_calendar_id"],
-            body=event_body,
-            conferenceDataVersion=1,
-            sendUpdates='all',  # Send emails to attendees
-        )
-        .execute()
-    )
+    return event_body
 
-    return event
 
+def event_insert_request(service, data):
+    return service.events().insert(
+        calendarId=data.get("google_calendar_id") or "primary",
+        body=build_event_body(data),
+        conferenceDataVersion=1,
+        sendUpdates='all',  # Send emails to attendees
+    )
 
-def create_google_task(user_email, data):
-    creds = get_google_creds(user_email)
-    service = build("tasks", "v1", credentials=creds, cache_discovery=False)
 
+def build_task_body(data):
     due_date = data.get("due_at")
     if due_date:
         # Append time to make it RFC 3339 compliant (required by Google Tasks)
         # Input is YYYY-MM-DD, Output needs to be YYYY-MM-DDTHH:MM:SS.000Z
         due_date = f"{due_date}T00:00:00.000Z"
 
-    task_body = {
+    return {
         "title": data["title"],
         "notes": data.get("description", ""),
         "due": due_date,
     }
 
-    task = service.tasks().insert(tasklist="@default", body=task_body).execute()
-    return task
+
+def task_insert_request(service, data):
+    return service.tasks().insert(tasklist=data.get("tasklist") or "@default", body=build_task_body(data))
+
+
+def _page_size(page_size, remaining):
+    # With a limit the last page asks only for what is left, so its token resumes right after it
+    return page_size if remaining is None else min(page_size, remaining)
+
+
+def iter_task_pages(user_email, page_token=None, tasklist="@default", fields=None, limit=None):
+    creds = get_google_creds(user_email)
+    service = tasks_service(creds, user_email)
+
+    # Yields (tasks, next_page_token) for one list until Google runs out of pages or limit items are out
+    remaining = limit
+    while True:
+        results = execute(service.tasks().list(
+            tasklist=tasklist,
+            showCompleted=False,
+            maxResults=_page_size(TASKS_PAGE_SIZE, remaining),
+            pageToken=page_token,
+            fields=fields,
+        ), user_email)
+        page_token = results.get("nextPageToken")
+        items = results.get("items", [])
+        yield items, page_token
+        if remaining is not None:
+            remaining -= len(items)
+        if not page_token or (remaining is not None and remaining <= 0):
+            return
+
+
+def iter_event_pages(user_email, calendar_id="primary", page_token=None, fields=None, limit=None):
+    # fields is a Google partial response selector, see payloads.google_fields
+    creds = get_google_creds(user_email)
+    service = calendar_service(creds, user_email)
+
+    remaining = limit
+    while True:
+        results = execute(service.events().list(
+            calendarId=calendar_id,
+            maxResults=_page_size(EVENTS_PAGE_SIZE, remaining),
+            singleEvents=True,
+            orderBy="startTime",
+            pageToken=page_token,
+            fields=fields,
+        ), user_email)
+        page_token = results.get("nextPageToken")
+        items = results.get("items", [])
+        yield items, page_token
+        if remaining is not None:
+            remaining -= len(items)
+        if not page_token or (remaining is not None and remaining <= 0):
+            return
+
+
+def mirrored_task_lists(user_email, task_ids):
+    # Task ids are unique per account; the mirror knows which list each one is in
+    return dict(CalendarItem.objects.filter(
+        user__username=user_email,
+        type=CalendarItem.TYPE_TASK,
+        google_item_id__in=task_ids,
+    ).exclude(google_calendar_id__isnull=True).values_list("google_item_id", "google_calendar_id"))
+
+
+def delete_google_task(user_email, task_id, tasklist=None):
+    creds = get_google_creds(user_email)
+    service = tasks_service(creds, user_email)
+    tasklist = tasklist or mirrored_task_lists(user_email, [task_id]).get(task_id) or "@default"
+    execute(service.tasks().delete(tasklist=tasklist, task=task_id), user_email)
+    unmirror_tasks(user_email, [task_id])
+
+
+# Deleting something that is already gone is not a failure
+ALREADY_DELETED_STATUSES = (404, 410)
+
+
+def execute_batch(service, requests, user_email=None):
+    # Returns (response, exception) pairs in the same order as requests
+    results = [None] * len(requests)
+
+    def callback(request_id, response, exception):
+        results[int(request_id)] = (response, exception)
+
+    # Every call inside a batch counts against quota, and Google can rate-limit
+    # some of them while the rest succeed; only those are sent again
+    pending = list(range(len(requests)))
+    # A batch takes one token per call, so it can be no larger than the user's burst
+    size = min(BATCH_SIZE, max_count(user_email))
+    deadline = time.monotonic() + settings.GOOGLE_RATE_LIMIT_MAX_WAIT
+    for attempt in range(settings.GOOGLE_RATE_LIMIT_RETRIES + 1):
+        for offset in range(0, len(pending), size):
+            chunk = pending[offset:offset + size]
+            acquire(user_email, len(chunk))
+            batch = service.new_batch_http_request(callback=callback)
+            for index in chunk:
+                batch.add(requests[index], request_id=str(index))
+            with google_method(f"batch.{requests[chunk[0]].methodId}"):
+                batch.execute()
+
+        limited = [index for index in pending if is_rate_limit_error(results[index][1])]
+        record("throttled", len(limited))
+        record("success", len(pending) - len(limited))
+        delay = backoff_delay(attempt)
+        # Calls still limited past the wait budget are reported with their 429s
+        if not limited or attempt == settings.GOOGLE_RATE_LIMIT_RETRIES or time.monotonic() + delay > deadline:
+            return results
+        time.sleep(delay)
+        pending = limited
+
+    return results
+
+
+# Written over a row already mirrored for a newly created item
+BATCH_CREATE_FIELDS = ["type", "title", "description", "start_at", "end_at", "due_at", "metadata", "sync_status", "updated_at"]
+
+
+def _mirror_row(user, data, google_item, error):
+    row = CalendarItem(
+        user=user,
+        type=data["type"],
+        title=data["title"][:512],
+        description=data.get("description", ""),
+    )
+
+    if error is not None:
+        row.sync_status = CalendarItem.SYNC_FAILED
+        row.metadata = {"error": str(error)}
+        return row
+
+    row.sync_status = CalendarItem.SYNC_SYNCED
+    row.google_item_id = google_item["id"]
+    row.metadata = google_item
+    if data["type"] == CalendarItem.TYPE_TASK:
+        row.google_calendar_id = task_list_id(google_item)
+        row.due_at = parse_date(data["due_at"]) if data.get("due_at") else None
+    else:
+        row.google_calendar_id = resolve_calendar_id(user.username, data.get("google_calendar_id") or PRIMARY_CALENDAR)
+        row.start_at = parse_google_time(google_item.get("start"))
+        row.end_at = parse_google_time(google_item.get("end"))
+    return row
 
 
-def fetch_user_tasks(user_email):
+def batch_create_items(user_email, items):
     creds = get_google_creds(user_email)
-    service = build("tasks", "v1", credentials=creds, cache_discovery=False)
-    
-    # Fetch tasks from default list
-    results = service.tasks().list(tasklist="@default", showCompleted=False, maxResults=20).execute()
-    return results.get("items", [])
+    user = get_mirror_user(user_email)
 
+    events = [i for i, item in enumerate(items) if item["type"] != CalendarItem.TYPE_TASK]
+    tasks = [i for i, item in enumerate(items) if item["type"] == CalendarItem.TYPE_TASK]
+    responses = [None] * len(items)
 
-def delete_google_task(user_email, task_id):
+    if events:
+        service = calendar_service(creds, user_email)
+        results = execute_batch(service, [event_insert_request(service, items[i]) for i in events], user_email)
+        for i, result in zip(events, results):
+            responses[i] = result
+
+    if tasks:
+        service = tasks_service(creds, user_email)
+        results = execute_batch(service, [task_insert_request(service, items[i]) for i in tasks], user_email)
+        for i, result in zip(tasks, results):
+            responses[i] = result
+
+    rows = [_mirror_row(user, item, *responses[i]) for i, item in enumerate(items)]
+    with transaction.atomic():
+        # A webhook or sync may have mirrored some of the new items already; their rows
+        # are taken over rather than tripping unique_mirror_item after Google has them
+        CalendarItem.objects.bulk_create(
+            [row for row in rows if row.google_item_id is not None],
+            update_conflicts=True,
+            unique_fields=MIRROR_KEY,
+            update_fields=BATCH_CREATE_FIELDS,
+        )
+        CalendarItem.objects.bulk_create([row for row in rows if row.google_item_id is None])
+
+    return [
+        {
+            "index": i,
+            "id": row.id,
+            "type": row.type,
+            "sync_status": row.sync_status,
+            "google_item": responses[i][0],
+            "error": str(responses[i][1]) if responses[i][1] else None,
+        }
+        for i, row in enumerate(rows)
+    ]
+
+
+def build_event_patch(data):
+    patch = {}
+    if data.get("summary"):
+        patch["summary"] = data["summary"]
+    if data.get("description"):
+        patch["description"] = data["description"]
+    if data.get("start"):
+        patch["start"] = {"dateTime": normalize_dt(data["start"]), "timeZone": "Asia/Kolkata"}
+    if data.get("end"):
+        patch["end"] = {"dateTime": normalize_dt(data["end"]), "timeZone": "Asia/Kolkata"}
+    return patch
+
+
+def _deleted(error):
+    return error is None or getattr(error, "status_code", None) in ALREADY_DELETED_STATUSES
+
+
+def bulk_delete_events(user_email, calendar_id, event_ids):
     creds = get_google_creds(user_email)
-    service = build("tasks", "v1", credentials=creds, cache_discovery=False)
-    service.tasks().delete(tasklist="@default", task=task_id).execute()
+    service = calendar_service(creds, user_email)
+
+    results = execute_batch(
+        service,
+        [service.events().delete(calendarId=calendar_id, eventId=event_id) for event_id in event_ids],
+        user_email,
+    )
+
+    deleted = [event_id for event_id, (_, error) in zip(event_ids, results) if _deleted(error)]
+    unmirror_events(user_email, calendar_id, deleted)
+
+    return [
+        {"id": event_id, "success": _deleted(error), "error": None if _deleted(error) else str(error)}
+        for event_id, (_, error) in zip(event_ids, results)
+    ]
+
+
+def bulk_update_events(user_email, calendar_id, updates):
+    creds = get_google_creds(user_email)
+    service = calendar_service(creds, user_email)
+
+    results = execute_batch(
+        service,
+        [
+            service.events().patch(calendarId=calendar_id, eventId=update["event_id"], body=build_event_patch(update))
+            for update in updates
+        ],
+        user_email,
+    )
+
+    # One ingest for the whole batch, not a write per event
+    mirror_events(user_email, calendar_id, [event for event, error in results if error is None])
+
+    return [
+        {
+            "id": update["event_id"],
+            "success": error is None,
+            "event": event,
+            "error": str(error) if error else None,
+        }
+        for update, (event, error) in zip(updates, results)
+    ]
+
+
+def bulk_delete_tasks(user_email, task_ids):
+    creds = get_google_creds(user_email)
+    service = tasks_service(creds, user_email)
+    lists = mirrored_task_lists(user_email, task_ids)
+
+    results = execute_batch(
+        service,
+        [service.tasks().delete(tasklist=lists.get(task_id, "@default"), task=task_id) for task_id in task_ids],
+        user_email,
+    )
+
+    unmirror_tasks(user_email, [task_id for task_id, (_, error) in zip(task_ids, results) if _deleted(error)])
+
+    return [
+        {"id": task_id, "success": _deleted(error), "error": None if _deleted(error) else str(error)}
+        for task_id, (_, error) in zip(task_ids, results)
+    ]
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from authapp.watch import renew_expiring_channels
+
+
+class Command(BaseCommand):
+    help = "Re-register Calendar watch channels that expire within GOOGLE_WATCH_RENEW_MARGIN"
+
+    def handle(self, *args, **options):
+        renewed = renew_expiring_channels()
+        self.stdout.write(f"Renewed {renewed} channel(s)")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from authapp.outbox import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = "Push pending CalendarItems to Google (run with OUTBOX_INPROCESS_WORKER=false on web workers)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain what is due and exit")
+
+    def handle(self, *args, **options):
+        OutboxWorker().run(once=options["once"])
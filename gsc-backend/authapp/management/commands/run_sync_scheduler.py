@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from authapp.scheduler import SyncScheduler
+
+
+class Command(BaseCommand):
+    help = "Keep the mirror of every connected Google account fresh in the background"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Sync the accounts that are due and exit")
+        parser.add_argument("--workers", type=int, help="Accounts synced at once (default SCHEDULER_WORKERS)")
+
+    def handle(self, *args, **options):
+        SyncScheduler(workers=options["workers"]).run(once=options["once"])
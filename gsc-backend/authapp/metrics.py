@@ -0,0 +1,246 @@
+import bisect
+import contextvars
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+
+# Metrics live in process memory, like the throttle buckets: scrape every worker,
+# and let Prometheus sum across them.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket (last one is +Inf)], sum
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(float(bound))
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, [('le', le)])} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(float(total))}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}"
+
+
+class _StatsCounter:
+    """Exports the stats Counter of another module (throttle, caching) as a counter.
+
+    The module is looked up at scrape time, since throttle itself reports into this one.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames, module, split):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.module = module
+        self.split = split
+        _registry.append(self)
+
+    def samples(self):
+        stats = importlib.import_module(self.module).stats
+        for key, value in sorted(dict(stats).items()):
+            yield f"{self.name}{_labels(self.labelnames, self.split(key))} {value}"
+
+
+request_duration = Histogram(
+    "gsc_http_request_duration_seconds",
+    "Time spent producing a response, by route.",
+    ("method", "route", "status"),
+)
+request_queries = Histogram(
+    "gsc_http_request_db_queries",
+    "Database queries run on the request thread, by route.",
+    ("route",),
+    buckets=QUERY_BUCKETS,
+)
+google_duration = Histogram(
+    "gsc_google_request_duration_seconds",
+    "Latency of HTTP calls to Google APIs, by API method.",
+    ("method", "status"),
+)
+google_bytes = Counter(
+    "gsc_google_bytes_total",
+    "Bytes sent to and received from Google APIs, by API method.",
+    ("method", "direction"),
+)
+google_response_size = Histogram(
+    "gsc_google_response_bytes",
+    "Size of Google API response bodies, by API method.",
+    ("method",),
+    buckets=BYTES_BUCKETS,
+)
+token_refreshes = Counter(
+    "gsc_google_token_refreshes_total",
+    "OAuth access token refreshes.",
+    ("trigger", "outcome"),
+)
+_StatsCounter(
+    "gsc_google_throttle_events_total",
+    "Client-side rate limiter outcomes: success, throttled, delayed_locally, rejected_locally.",
+    ("outcome",),
+    "authapp.throttle",
+    lambda key: (key,),
+)
+_StatsCounter(
+    "gsc_cache_requests_total",
+    "Response cache lookups by cache and result (hit, miss, revalidated).",
+    ("cache", "result"),
+    "authapp.caching",
+    lambda key: tuple(key.rsplit("_", 1)),
+)
+
+
+# Google API method the current thread or task is calling, for the transport to label with
+_current_method = contextvars.ContextVar("google_method", default="unknown")
+
+
+@contextmanager
+def google_method(method_id):
+    token = _current_method.set(method_id or "unknown")
+    try:
+        yield
+    finally:
+        _current_method.reset(token)
+
+
+# Set by the profiling middleware to also collect each call of the current request
+_call_log = contextvars.ContextVar("google_call_log", default=None)
+
+
+@contextmanager
+def google_call_log():
+    calls = []
+    token = _call_log.set(calls)
+    try:
+        yield calls
+    finally:
+        _call_log.reset(token)
+
+
+# Query observers of the current request. Context variables follow the request into
+# sync_to_async threads, so queries of sync views served under ASGI are seen too.
+_query_observers = contextvars.ContextVar("db_query_observers", default=())
+
+
+@contextmanager
+def observe_queries(observer):
+    """Calls observer(sql, many, seconds) for each query run in the current context."""
+    token = _query_observers.set(_query_observers.get() + (observer,))
+    try:
+        yield observer
+    finally:
+        _query_observers.reset(token)
+
+
+def _observed_execute(execute, sql, params, many, context):
+    observers = _query_observers.get()
+    if not observers:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        for observer in observers:
+            observer(sql, many, duration)
+
+
+def watch_connection(sender, connection, **kwargs):
+    # connection_created receiver; a wrapper reconnecting fires it again
+    if _observed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_observed_execute)
+
+
+def record_google_call(duration, status, sent=0, received=0, method=None):
+    method = method or _current_method.get()
+    calls = _call_log.get()
+    if calls is not None:
+        calls.append({
+            "method": method,
+            "status": status,
+            "ms": round(duration * 1000, 2),
+            "sent": sent,
+            "received": received,
+        })
+    google_duration.observe(duration, method=method, status=status)
+    google_bytes.inc(sent, method=method, direction="sent")
+    google_bytes.inc(received, method=method, direction="received")
+    google_response_size.observe(received, method=method)
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,298 @@
+import cProfile
+import hmac
+import io
+import pstats
+import random
+import threading
+import time
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from . import metrics
+from .models import RequestProfile
+
+try:
+    import brotli
+except ImportError:  # optional; without it responses are only gzipped
+    brotli = None
+
+# Kept per profile; a request making more than this is already the finding
+MAX_RECORDED_QUERIES = 500
+PROFILE_TOP_FUNCTIONS = 60
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, sql, many, duration):
+        self.count += 1
+
+
+def _route(request):
+    # The URL pattern, not the path, so ids in URLs do not blow up label cardinality
+    match = getattr(request, "resolver_match", None)
+    return match.route if match else "unmatched"
+
+
+class MetricsMiddleware:
+    """Records latency and database query count of every request, labelled by route.
+
+    Queries are counted through metrics.observe_queries, under WSGI and ASGI alike,
+    including those of sync views and sync_to_async calls. Work handed to thread
+    pools (events/all) does not carry the request's context and is not included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+
+        started = time.perf_counter()
+        with metrics.observe_queries(_QueryCounter()) as queries:
+            response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - started, queries.count)
+        return response
+
+    async def _acall(self, request):
+        started = time.perf_counter()
+        with metrics.observe_queries(_QueryCounter()) as queries:
+            response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - started, queries.count)
+        return response
+
+    def _record(self, request, response, duration, queries):
+        route = _route(request)
+        metrics.request_duration.observe(duration, method=request.method, route=route, status=response.status_code)
+        metrics.request_queries.observe(queries, route=route)
+
+
+class _QueryLog:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.queries = []
+
+    def __call__(self, sql, many, duration):
+        self.count += 1
+        self.total += duration
+        if len(self.queries) < MAX_RECORDED_QUERIES:
+            self.queries.append({"sql": sql, "ms": round(duration * 1000, 2), "many": many})
+
+
+class ProfilingMiddleware:
+    """Runs cProfile over a sample of requests and stores what they spent time on.
+
+    A request is profiled when it is picked at PROFILE_SAMPLE_RATE, or when it sends
+    the PROFILE_HEADER header with PROFILE_TOKEN as its value. Sampled requests are
+    kept only if they took at least PROFILE_SLOW_MS. One request per process is
+    profiled at a time.
+
+    cProfile only sees the thread it runs in. Under WSGI that is the whole request.
+    Under ASGI it is the event loop: async views (aio/) are covered, though other
+    requests running on the loop meanwhile show up too, and a sync view is seen only
+    as a wait for its worker thread. Profile sync views on the WSGI service. The
+    query log and Google calls are recorded in full either way.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    # cProfile hooks the interpreter, so concurrent profiles would only measure each other
+    _busy = threading.Lock()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+
+        trigger = self._trigger(request)
+        if trigger is None or not self._busy.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            profiler, queries = cProfile.Profile(), _QueryLog()
+            started = time.perf_counter()
+            with metrics.google_call_log() as calls, metrics.observe_queries(queries):
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+            self._save(request, response, trigger, time.perf_counter() - started, profiler, queries, calls)
+            return response
+        finally:
+            self._busy.release()
+
+    async def _acall(self, request):
+        trigger = self._trigger(request)
+        if trigger is None or not self._busy.acquire(blocking=False):
+            return await self.get_response(request)
+        try:
+            profiler, queries = cProfile.Profile(), _QueryLog()
+            started = time.perf_counter()
+            with metrics.google_call_log() as calls, metrics.observe_queries(queries):
+                profiler.enable()
+                try:
+                    response = await self.get_response(request)
+                finally:
+                    profiler.disable()
+            duration = time.perf_counter() - started
+            if self._keep(trigger, duration):
+                await sync_to_async(self._save)(request, response, trigger, duration, profiler, queries, calls)
+            return response
+        finally:
+            self._busy.release()
+
+    def _trigger(self, request):
+        token = settings.PROFILE_TOKEN
+        supplied = request.headers.get(settings.PROFILE_HEADER)
+        if token and supplied and hmac.compare_digest(supplied, token):
+            return RequestProfile.TRIGGER_HEADER
+        if settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE:
+            return RequestProfile.TRIGGER_SAMPLED
+        return None
+
+    def _keep(self, trigger, duration):
+        return trigger != RequestProfile.TRIGGER_SAMPLED or duration * 1000 >= settings.PROFILE_SLOW_MS
+
+    def _save(self, request, response, trigger, duration, profiler, queries, calls):
+        if not self._keep(trigger, duration):
+            return
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        RequestProfile.objects.create(
+            method=request.method,
+            path=request.get_full_path()[:2048],
+            route=_route(request),
+            status=response.status_code,
+            duration_ms=duration * 1000,
+            trigger=trigger,
+            query_count=queries.count,
+            query_ms=queries.total * 1000,
+            google_call_count=len(calls),
+            google_ms=sum(call["ms"] for call in calls),
+            profile=report.getvalue(),
+            queries=queries.queries,
+            google_calls=calls,
+        )
+
+
+def accepted_encodings(header):
+    """Content codings from an Accept-Encoding header mapped to their q-values."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def _negotiate(header):
+    accepted = accepted_encodings(header)
+    offered = (["br"] if brotli is not None else []) + ["gzip"]
+    # Ties go to brotli, which is the smaller of the two on JSON
+    ranked = sorted(offered, key=lambda coding: -accepted.get(coding, accepted.get("*", 0.0)))
+    best = ranked[0]
+    return best if accepted.get(best, accepted.get("*", 0.0)) > 0 else None
+
+
+def _stream_compressor(coding):
+    """(compress, finish) functions for one streamed response.
+
+    Every chunk is flushed, so streamed lines reach the client as they are produced,
+    and the whole response stays a single brotli stream or gzip member.
+    """
+    if coding == "br":
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        return (lambda chunk: compressor.process(chunk) + compressor.flush()), compressor.finish
+    # wbits=31 writes the gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(wbits=31)
+    return (lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+
+
+def _compress_sequence(coding, chunks):
+    compress, finish = _stream_compressor(coding)
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+async def _acompress_sequence(coding, chunks):
+    compress, finish = _stream_compressor(coding)
+    async for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compresses responses with brotli or gzip, whichever the client prefers.
+
+    brotli is used when the package is installed. Bodies smaller than
+    COMPRESSION_MIN_BYTES are sent as they are; streamed responses are always
+    compressed. Like Django's GZipMiddleware, strong ETags are made weak.
+    """
+
+    # Random bytes in the gzip header, as in GZipMiddleware, against BREACH
+    max_random_bytes = 100
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        coding = _negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if coding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _acompress_sequence(coding, response.streaming_content)
+            else:
+                response.streaming_content = _compress_sequence(coding, response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            content = self._compress(coding, response.content)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers["Content-Length"] = str(len(content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = coding
+        return response
+
+    def _compress(self, coding, content):
+        if coding == "br":
+            return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        return compress_string(content, max_random_bytes=self.max_random_bytes)
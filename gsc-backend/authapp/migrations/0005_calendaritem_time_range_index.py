@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0004_syncstate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calendaritem',
+            index=models.Index(fields=['user', 'google_calendar_id', 'start_at'], name='calitem_user_cal_start_idx'),
+        ),
+    ]
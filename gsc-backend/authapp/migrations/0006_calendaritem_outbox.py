@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0005_calendaritem_time_range_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendaritem',
+            name='next_sync_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='calendaritem',
+            name='request_id',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='calendaritem',
+            name='sync_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='calendaritem',
+            name='sync_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddIndex(
+            model_name='calendaritem',
+            index=models.Index(fields=['sync_status', 'next_sync_at'], name='calitem_outbox_idx'),
+        ),
+    ]
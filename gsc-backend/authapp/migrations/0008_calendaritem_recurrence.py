@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:10
+
+from django.db import migrations, models
+
+
+def reset_sync_tokens(apps, schema_editor):
+    # The mirror used to hold expanded instances; a full resync replaces them with
+    # recurring masters and drops the old instance rows
+    SyncState = apps.get_model('authapp', 'SyncState')
+    SyncState.objects.update(sync_token=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0007_watchchannel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendaritem',
+            name='is_recurring',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='calendaritem',
+            name='original_start_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='calendaritem',
+            name='recurrence_end_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='calendaritem',
+            name='recurring_event_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(reset_sync_tokens, migrations.RunPython.noop),
+    ]
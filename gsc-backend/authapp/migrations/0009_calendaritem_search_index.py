@@ -0,0 +1,117 @@
+from django.db import migrations
+
+# The search index is maintained by the database itself, so rows written through
+# bulk_create() or update() are indexed too. Attendees and location live in the
+# metadata JSON. Both backends split on non-alphanumerics, so "alice@example.com"
+# is searchable as "alice".
+
+POSTGRES_FORWARD = [
+    "ALTER TABLE authapp_calendaritem ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION authapp_calendaritem_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('simple', regexp_replace(
+                coalesce(NEW.metadata->>'location', '') || ' ' || coalesce((
+                    SELECT string_agg(concat_ws(' ', a->>'email', a->>'displayName'), ' ')
+                    FROM jsonb_array_elements(
+                        CASE WHEN jsonb_typeof(NEW.metadata->'attendees') = 'array'
+                        THEN NEW.metadata->'attendees' ELSE '[]'::jsonb END
+                    ) AS a
+                ), ''),
+                '[^[:alnum:]]+', ' ', 'g')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER authapp_calendaritem_search_update
+    BEFORE INSERT OR UPDATE OF title, description, metadata ON authapp_calendaritem
+    FOR EACH ROW EXECUTE FUNCTION authapp_calendaritem_search_vector()
+    """,
+    # Touch every row once so the trigger fills in existing items
+    "UPDATE authapp_calendaritem SET title = title",
+    "CREATE INDEX calitem_search_idx ON authapp_calendaritem USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP TRIGGER IF EXISTS authapp_calendaritem_search_update ON authapp_calendaritem",
+    "DROP FUNCTION IF EXISTS authapp_calendaritem_search_vector()",
+    "ALTER TABLE authapp_calendaritem DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_ROW = """
+    {row}.id,
+    {row}.title,
+    coalesce(json_extract({row}.metadata, '$.location'), '') || ' ' || coalesce((
+        SELECT group_concat(coalesce(json_extract(a.value, '$.email'), '') || ' '
+                            || coalesce(json_extract(a.value, '$.displayName'), ''), ' ')
+        FROM json_each({row}.metadata, '$.attendees') AS a
+    ), ''),
+    {row}.description
+"""
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE authapp_calendaritem_fts USING fts5(
+        title, details, description,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER authapp_calendaritem_fts_insert AFTER INSERT ON authapp_calendaritem BEGIN
+        INSERT INTO authapp_calendaritem_fts (rowid, title, details, description)
+        SELECT {SQLITE_ROW.format(row="new")};
+    END
+    """,
+    f"""
+    CREATE TRIGGER authapp_calendaritem_fts_update
+    AFTER UPDATE OF title, description, metadata ON authapp_calendaritem BEGIN
+        DELETE FROM authapp_calendaritem_fts WHERE rowid = old.id;
+        INSERT INTO authapp_calendaritem_fts (rowid, title, details, description)
+        SELECT {SQLITE_ROW.format(row="new")};
+    END
+    """,
+    """
+    CREATE TRIGGER authapp_calendaritem_fts_delete AFTER DELETE ON authapp_calendaritem BEGIN
+        DELETE FROM authapp_calendaritem_fts WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    INSERT INTO authapp_calendaritem_fts (rowid, title, details, description)
+    SELECT {SQLITE_ROW.format(row="c")} FROM authapp_calendaritem AS c
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS authapp_calendaritem_fts_insert",
+    "DROP TRIGGER IF EXISTS authapp_calendaritem_fts_update",
+    "DROP TRIGGER IF EXISTS authapp_calendaritem_fts_delete",
+    "DROP TABLE IF EXISTS authapp_calendaritem_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        statements_for = {"postgresql": statements[0], "sqlite": statements[1]}
+        # Other backends fall back to plain LIKE matching in search.py
+        for statement in statements_for.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0008_calendaritem_recurrence'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run((POSTGRES_FORWARD, SQLITE_FORWARD)),
+            _run((POSTGRES_BACKWARD, SQLITE_BACKWARD)),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0009_calendaritem_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='syncstate',
+            name='unique_sync_state_per_calendar',
+        ),
+        migrations.AddField(
+            model_name='syncstate',
+            name='resource',
+            field=models.CharField(choices=[('calendar', 'Calendar'), ('tasks', 'Task list')], default='calendar', max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name='syncstate',
+            constraint=models.UniqueConstraint(fields=('user', 'resource', 'calendar_id'), name='unique_sync_state_per_resource'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0010_syncstate_resource'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=2048)),
+                ('route', models.CharField(max_length=255)),
+                ('status', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('trigger', models.CharField(choices=[('sampled', 'Sampled'), ('header', 'Header')], max_length=20)),
+                ('query_count', models.PositiveIntegerField(default=0)),
+                ('query_ms', models.FloatField(default=0)),
+                ('google_call_count', models.PositiveIntegerField(default=0)),
+                ('google_ms', models.FloatField(default=0)),
+                ('profile', models.TextField(blank=True)),
+                ('queries', models.JSONField(blank=True, default=list)),
+                ('google_calls', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='authapp_req_created_587d6c_idx'), models.Index(fields=['route', 'duration_ms'], name='authapp_req_route_fb571a_idx')],
+            },
+        ),
+    ]
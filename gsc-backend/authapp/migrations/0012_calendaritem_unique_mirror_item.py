@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:28
+
+import importlib
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+# SQLite adds the constraint by rebuilding the table, which drops the triggers
+# keeping the search index in step; put them back afterwards.
+search_index = importlib.import_module("authapp.migrations.0009_calendaritem_search_index")
+SQLITE_TRIGGERS = [statement for statement in search_index.SQLITE_FORWARD if "CREATE TRIGGER" in statement]
+
+
+def restore_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for statement in SQLITE_TRIGGERS:
+        schema_editor.execute(statement)
+
+
+def drop_duplicates(apps, schema_editor):
+    # Keep the newest row of every Google item mirrored more than once
+    CalendarItem = apps.get_model("authapp", "CalendarItem")
+    duplicates = (
+        CalendarItem.objects.filter(google_calendar_id__isnull=False, google_item_id__isnull=False)
+        .values("user_id", "google_calendar_id", "google_item_id")
+        .annotate(keep=Max("id"), copies=Count("id"))
+        .filter(copies__gt=1)
+    )
+    for duplicate in list(duplicates):
+        CalendarItem.objects.filter(
+            user_id=duplicate["user_id"],
+            google_calendar_id=duplicate["google_calendar_id"],
+            google_item_id=duplicate["google_item_id"],
+        ).exclude(id=duplicate["keep"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0011_requestprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Unapplying removes the constraint with another rebuild, so restore the triggers then too
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='calendaritem',
+            constraint=models.UniqueConstraint(fields=('user', 'google_calendar_id', 'google_item_id'), name='unique_mirror_item'),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
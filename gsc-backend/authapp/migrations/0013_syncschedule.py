@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0012_calendaritem_unique_mirror_item'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('next_sync_at', models.DateTimeField()),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('last_active_at', models.DateTimeField(blank=True, null=True)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('credentials', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sync_schedule', to='authapp.googlecredentials')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['next_sync_at'], name='syncschedule_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def forget_primary_alias(apps, schema_editor):
+    # Mirror state used to be keyed on the "primary" alias as well as on the primary
+    # calendar's real id, mirroring that calendar twice. Synced copies under the alias
+    # are dropped; the scheduler mirrors the calendar again under its real id. Rows
+    # still waiting in the outbox are kept: Google accepts the alias on insert.
+    CalendarItem = apps.get_model("authapp", "CalendarItem")
+    SyncState = apps.get_model("authapp", "SyncState")
+    WatchChannel = apps.get_model("authapp", "WatchChannel")
+
+    CalendarItem.objects.filter(google_calendar_id="primary", sync_status="synced").delete()
+    SyncState.objects.filter(resource="calendar", calendar_id="primary").delete()
+    WatchChannel.objects.filter(calendar_id="primary").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0014_calendaritem_user_start_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(forget_primary_alias, migrations.RunPython.noop),
+    ]
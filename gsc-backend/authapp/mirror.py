@@ -0,0 +1,203 @@
+import base64
+import heapq
+import logging
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import CalendarItem, SyncState
+from .recurrence import expand_masters
+from .scheduler import mark_active
+from .sync import TASK_LISTS_STATE_ID, resolve_calendar_id, sync_calendar, sync_tasks
+from .watch import active_channel, ensure_channel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 250
+MAX_PAGE_SIZE = 2500
+
+
+def parse_query_time(value):
+    if not value:
+        return None
+    dt = parse_datetime(value)
+    if dt is None:
+        raise ValueError(f"Invalid datetime: {value}")
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, dt_timezone.utc)
+    return dt
+
+
+# Keyset cursor over (start_at, id), opaque to clients
+def encode_cursor(item):
+    raw = f"{item.start_at.isoformat()}|{item.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        start, item_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return parse_datetime(start), int(item_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def ensure_fresh(email, calendar_id, active=True):
+    """Syncs the calendar if its mirror is older than the allowed staleness.
+
+    Pass active=False when reading for someone else, so the scheduler does not treat
+    the account as in use.
+    """
+    if active:
+        mark_active(email)
+    calendar_id = resolve_calendar_id(email, calendar_id)
+    state = SyncState.objects.filter(
+        user__username=email, resource=SyncState.RESOURCE_CALENDAR, calendar_id=calendar_id,
+    ).first()
+
+    # With a live push channel Google tells us about changes, so polling can back off
+    watched = settings.GOOGLE_WEBHOOK_URL and active_channel(email, calendar_id)
+    max_age = timedelta(seconds=(
+        settings.GOOGLE_WATCHED_MAX_STALENESS_SECONDS if watched else settings.MIRROR_MAX_STALENESS_SECONDS
+    ))
+
+    if state and state.synced_at and timezone.now() - state.synced_at < max_age:
+        return state.synced_at, False
+
+    try:
+        synced_at = sync_calendar(email, calendar_id)["synced_at"]
+    except Exception:
+        # Serve what we have if Google is unavailable, but only if we have something
+        if not state or not state.synced_at:
+            raise
+        return state.synced_at, True
+
+    if settings.GOOGLE_WEBHOOK_URL and not watched:
+        try:
+            ensure_channel(email, calendar_id)
+        except Exception:
+            # The mirror is fresh either way; the next read tries to watch again
+            logger.exception("Could not watch calendar %s of %s", calendar_id, email)
+    return synced_at, False
+
+
+def _page_items(email, calendar_id, time_min=None, time_max=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    # Only what Google holds is served: rows still in the outbox or that failed to push are left out
+    items = CalendarItem.objects.filter(
+        user__username=email,
+        google_calendar_id=calendar_id,
+        type__in=[CalendarItem.TYPE_EVENT, CalendarItem.TYPE_APPOINTMENT],
+        sync_status=CalendarItem.SYNC_SYNCED,
+        start_at__isnull=False,
+    )
+    masters = items.filter(is_recurring=True)
+    items = items.filter(is_recurring=False)
+    if time_max:
+        items = items.filter(start_at__lt=time_max)
+        masters = masters.filter(start_at__lt=time_max)
+    if time_min:
+        items = items.filter(Q(end_at__gt=time_min) | Q(end_at__isnull=True, start_at__gte=time_min))
+        masters = masters.filter(Q(recurrence_end_at__isnull=True) | Q(recurrence_end_at__gt=time_min))
+    after = None
+    if cursor:
+        after = decode_cursor(cursor)
+        items = items.filter(Q(start_at__gt=after[0]) | Q(start_at=after[0], id__gt=after[1]))
+
+    singles = items.order_by("start_at", "id").only("id", "start_at", "metadata")[:limit]
+    # Expanding over the whole window, not from the cursor, lets every page share one cached expansion
+    occurrences = expand_masters(masters, time_min, time_max)
+    if after:
+        occurrences = (o for o in occurrences if (o.start_at, o.id) > after)
+
+    merged = heapq.merge(singles, occurrences, key=lambda item: (item.start_at, item.id))
+    return list(islice(merged, limit))
+
+
+def events_page(email, calendar_id, time_min=None, time_max=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    page = _page_items(email, resolve_calendar_id(email, calendar_id), time_min, time_max, cursor, limit + 1)
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return [item.metadata for item in page[:limit]], next_cursor
+
+
+def _calendar_events(email, calendar_id, time_min, time_max, limit):
+    try:
+        synced_at, stale = ensure_fresh(email, calendar_id)
+        return synced_at, stale, _page_items(email, calendar_id, time_min, time_max, limit=limit)
+    finally:
+        # Pool threads are thrown away with the request, so close their connections now
+        connections.close_all()
+
+
+def events_for_calendars(email, calendar_ids, time_min=None, time_max=None, limit=DEFAULT_PAGE_SIZE):
+    """Refreshes and reads every calendar concurrently, then merges them in start order.
+
+    Returns (events, calendars) where calendars maps each id to its sync status or error.
+    """
+    calendars = {}
+    per_calendar = []
+
+    # Asked for both by the "primary" alias and by its id, the primary calendar is read once
+    requested = {}
+    for calendar_id in calendar_ids:
+        requested.setdefault(resolve_calendar_id(email, calendar_id), calendar_id)
+
+    workers = max(1, min(len(requested), settings.EVENTS_FANOUT_WORKERS))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            calendar_id: pool.submit(_calendar_events, email, resolved, time_min, time_max, limit)
+            for resolved, calendar_id in requested.items()
+        }
+        for calendar_id, future in futures.items():
+            try:
+                synced_at, stale, items = future.result()
+            except Exception as e:
+                calendars[calendar_id] = {"error": str(e)}
+                continue
+            calendars[calendar_id] = {"synced_at": synced_at.isoformat(), "stale": stale}
+            # Each list is already sorted, so a heap merge keeps this O(n log k)
+            per_calendar.append([(item.start_at, item.id, calendar_id, item.metadata) for item in items])
+
+    merged = heapq.merge(*per_calendar, key=lambda row: (row[0], row[1]))
+    events = [dict(metadata, calendarId=calendar_id) for _, _, calendar_id, metadata in islice(merged, limit)]
+    return events, calendars
+
+
+def ensure_tasks_fresh(email):
+    """Syncs all task lists if they were last synced longer ago than the allowed staleness."""
+    mark_active(email)
+    state = SyncState.objects.filter(
+        user__username=email, resource=SyncState.RESOURCE_TASKS, calendar_id=TASK_LISTS_STATE_ID,
+    ).first()
+    max_age = timedelta(seconds=settings.MIRROR_MAX_STALENESS_SECONDS)
+
+    if state and state.synced_at and timezone.now() - state.synced_at < max_age:
+        return state.synced_at, False
+
+    try:
+        return sync_tasks(email)["synced_at"], False
+    except Exception:
+        if not state or not state.synced_at:
+            raise
+        return state.synced_at, True
+
+
+def tasks_from_mirror(email, tasklist=None, show_completed=False):
+    """Mirrored tasks as Google returns them, each tagged with the id of its list."""
+    items = CalendarItem.objects.filter(
+        user__username=email,
+        type=CalendarItem.TYPE_TASK,
+        sync_status=CalendarItem.SYNC_SYNCED,
+    )
+    if tasklist:
+        items = items.filter(google_calendar_id=tasklist)
+    if not show_completed:
+        items = items.filter(Q(metadata__status__isnull=True) | ~Q(metadata__status="completed"))
+
+    rows = items.order_by("google_calendar_id", "due_at", "id").values_list("google_calendar_id", "metadata")
+    return [dict(metadata, tasklist=list_id) for list_id, metadata in rows]
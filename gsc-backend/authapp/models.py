@@ -78,6 +78,19 @@ class CalendarItem(models.Model):
 
     sync_status = models.CharField(max_length=32, choices=SYNC_CHOICES, default=SYNC_PENDING)
 
+    # Outbox bookkeeping for items written locally and pushed to Google later
+    request_id = models.CharField(max_length=64, blank=True)
+    sync_attempts = models.PositiveIntegerField(default=0)
+    next_sync_at = models.DateTimeField(null=True, blank=True)
+    sync_error = models.TextField(blank=True)
+
+    # Recurring series are stored once as a master (is_recurring) and expanded on read.
+    # Modified or cancelled occurrences are rows pointing back at their master.
+    is_recurring = models.BooleanField(default=False)
+    recurrence_end_at = models.DateTimeField(null=True, blank=True)
+    recurring_event_id = models.CharField(max_length=255, blank=True)
+    original_start_at = models.DateTimeField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -85,9 +98,126 @@ class CalendarItem(models.Model):
         indexes = [
             models.Index(fields=['user', 'google_calendar_id']),
             models.Index(fields=['google_item_id']),
+            models.Index(fields=['user', 'google_calendar_id', 'start_at'], name='calitem_user_cal_start_idx'),
+            models.Index(fields=['user', 'start_at'], name='calitem_user_start_idx'),
+            models.Index(fields=['sync_status', 'next_sync_at'], name='calitem_outbox_idx'),
+        ]
+        constraints = [
+            # One mirror row per Google item; lets sync upsert in bulk. Rows not yet
+            # pushed to Google have no google_item_id and are not constrained.
+            models.UniqueConstraint(fields=['user', 'google_calendar_id', 'google_item_id'], name='unique_mirror_item'),
         ]
 
     def __str__(self):
         return f"{self.type} - {self.title}"
 
-    
\ No newline at end of file
+    
+
+# Incremental sync bookkeeping, one row per (user, calendar) or (user, task list)
+class SyncState(models.Model):
+    RESOURCE_CALENDAR = 'calendar'
+    RESOURCE_TASKS = 'tasks'
+
+    RESOURCE_CHOICES = [
+        (RESOURCE_CALENDAR, 'Calendar'),
+        (RESOURCE_TASKS, 'Task list'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_states')
+    resource = models.CharField(max_length=20, choices=RESOURCE_CHOICES, default=RESOURCE_CALENDAR)
+    calendar_id = models.CharField(max_length=255)
+
+    # Calendar syncToken, or for task lists the updatedMin to ask for next time
+    sync_token = models.TextField(null=True, blank=True)
+    synced_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'resource', 'calendar_id'], name='unique_sync_state_per_resource'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.calendar_id}"
+
+
+# Background refresh bookkeeping for one connected account, see scheduler.py
+class SyncSchedule(models.Model):
+    credentials = models.OneToOneField(GoogleCredentials, on_delete=models.CASCADE, related_name='sync_schedule')
+
+    # When the scheduler next picks the account up; pushed forward while a worker holds it
+    next_sync_at = models.DateTimeField()
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    # Last time the user read their mirror; active accounts are refreshed more often
+    last_active_at = models.DateTimeField(null=True, blank=True)
+
+    failures = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_sync_at'], name='syncschedule_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.credentials} at {self.next_sync_at}"
+
+
+# Calendar push-notification channel registered with events().watch
+class WatchChannel(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='watch_channels')
+    calendar_id = models.CharField(max_length=255)
+
+    channel_id = models.CharField(max_length=64, unique=True)
+    resource_id = models.CharField(max_length=255)
+    token = models.CharField(max_length=64)
+    expiration = models.DateTimeField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'calendar_id']),
+            models.Index(fields=['expiration']),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.calendar_id} ({self.channel_id})"
+
+
+# A profiled request, captured by ProfilingMiddleware for sampled or explicitly flagged requests
+class RequestProfile(models.Model):
+    TRIGGER_SAMPLED = 'sampled'
+    TRIGGER_HEADER = 'header'
+
+    TRIGGER_CHOICES = [
+        (TRIGGER_SAMPLED, 'Sampled'),
+        (TRIGGER_HEADER, 'Header'),
+    ]
+
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2048)
+    route = models.CharField(max_length=255)
+    status = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    trigger = models.CharField(max_length=20, choices=TRIGGER_CHOICES)
+
+    query_count = models.PositiveIntegerField(default=0)
+    query_ms = models.FloatField(default=0)
+    google_call_count = models.PositiveIntegerField(default=0)
+    google_ms = models.FloatField(default=0)
+
+    # pstats report sorted by cumulative time, plus the individual SQL queries and Google calls
+    profile = models.TextField(blank=True)
+    queries = models.JSONField(default=list, blank=True)
+    google_calls = models.JSONField(default=list, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['route', 'duration_ms']),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
@@ -0,0 +1,191 @@
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from googleapiclient.errors import HttpError
+
+from .google_helpers import build_event_body, build_task_body, get_google_creds
+from .models import CalendarItem
+from .services import calendar_service, tasks_service
+from .sync import PRIMARY_CALENDAR, get_mirror_user, parse_google_time, resolve_calendar_id, task_list_id
+from .throttle import execute, is_rate_limit_error
+
+# Google errors worth retrying; anything else in the 4xx range is the payload's fault.
+# 403 is retried only for rate limits (see _retryable), not for missing permissions.
+RETRYABLE_STATUSES = (408, 429, 500, 502, 503, 504)
+
+# How long a claimed item is hidden from other workers while it is being pushed
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def enqueue_item(email, data):
+    """Stores the item as pending and returns immediately; the worker pushes it to Google."""
+    request_id = uuid.uuid4().hex
+    item = CalendarItem(
+        user=get_mirror_user(email),
+        type=data["type"],
+        title=data["title"][:512],
+        description=data.get("description", ""),
+        request_id=request_id,
+        next_sync_at=timezone.now(),
+    )
+
+    if data["type"] == CalendarItem.TYPE_TASK:
+        item.metadata = build_task_body(data)
+        # Left empty for the default list, whose real id Google only tells us on insert
+        item.google_calendar_id = data.get("tasklist") or None
+        item.due_at = parse_date(data["due_at"]) if data.get("due_at") else None
+    else:
+        # uuid hex is valid base32hex, so Google accepts it as a client-chosen event id,
+        # which makes retried inserts idempotent
+        item.metadata = dict(build_event_body(data), id=request_id)
+        item.google_calendar_id = resolve_calendar_id(email, data.get("google_calendar_id") or PRIMARY_CALENDAR)
+        item.start_at = parse_google_time(item.metadata["start"])
+        item.end_at = parse_google_time(item.metadata["end"])
+
+    item.save()
+    transaction.on_commit(worker.wake)
+    return item
+
+
+def _insert_event(service, item, email):
+    try:
+        return execute(service.events().insert(
+            calendarId=item.google_calendar_id,
+            body=item.metadata,
+            conferenceDataVersion=1,
+            sendUpdates='all',
+        ), email)
+    except HttpError as e:
+        # 409: an earlier attempt went through but we never saw the response
+        if e.resp.status != 409:
+            raise
+        return execute(service.events().get(calendarId=item.google_calendar_id, eventId=item.request_id), email)
+
+
+def push_item(item):
+    email = item.user.username
+    creds = get_google_creds(email)
+
+    if item.type == CalendarItem.TYPE_TASK:
+        # The Tasks API has no client-chosen ids, so a lost response can still duplicate a task
+        service = tasks_service(creds, email)
+        google_item = execute(service.tasks().insert(tasklist=item.google_calendar_id or "@default", body=item.metadata), email)
+        item.google_calendar_id = task_list_id(google_item) or item.google_calendar_id
+    else:
+        google_item = _insert_event(calendar_service(creds, email), item, email)
+        # Items queued before calendars were keyed on real ids may still name the alias
+        item.google_calendar_id = resolve_calendar_id(email, item.google_calendar_id)
+
+    with transaction.atomic():
+        # A sync may have mirrored the new event before we got here
+        CalendarItem.objects.filter(
+            user=item.user,
+            google_calendar_id=item.google_calendar_id,
+            google_item_id=google_item["id"],
+        ).exclude(pk=item.pk).delete()
+
+        item.google_item_id = google_item["id"]
+        item.metadata = google_item
+        item.sync_status = CalendarItem.SYNC_SYNCED
+        item.sync_error = ""
+        item.next_sync_at = None
+        if item.type != CalendarItem.TYPE_TASK:
+            item.start_at = parse_google_time(google_item.get("start"))
+            item.end_at = parse_google_time(google_item.get("end"))
+        item.save()
+    return item
+
+
+def _retryable(error):
+    if not isinstance(error, HttpError):
+        # Network errors and our own RateLimitExceeded
+        return True
+    return error.resp.status in RETRYABLE_STATUSES or is_rate_limit_error(error)
+
+
+def _record_failure(item, error):
+    item.sync_attempts += 1
+    item.sync_error = str(error)
+
+    if not _retryable(error) or item.sync_attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        item.sync_status = CalendarItem.SYNC_FAILED
+        item.next_sync_at = None
+    else:
+        # Exponential backoff with full jitter
+        delay = min(settings.OUTBOX_BACKOFF_MAX, settings.OUTBOX_BACKOFF_BASE * 2 ** item.sync_attempts)
+        item.next_sync_at = timezone.now() + timedelta(seconds=random.uniform(0, delay))
+
+    item.save(update_fields=["sync_attempts", "sync_error", "sync_status", "next_sync_at", "updated_at"])
+
+
+def process_item(item_id):
+    try:
+        item = CalendarItem.objects.select_related("user").get(pk=item_id)
+        try:
+            push_item(item)
+        except Exception as e:
+            _record_failure(item, e)
+    finally:
+        close_old_connections()
+
+
+def claim_due_items(limit):
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            CalendarItem.objects.select_for_update(skip_locked=True)
+            .filter(sync_status=CalendarItem.SYNC_PENDING, next_sync_at__lte=now)
+            .order_by("next_sync_at")
+            .values_list("id", flat=True)[:limit]
+        )
+        # Push the lease forward so other workers skip these until we are done
+        CalendarItem.objects.filter(id__in=ids).update(next_sync_at=now + CLAIM_LEASE)
+    return ids
+
+
+class OutboxWorker:
+    def __init__(self):
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def wake(self):
+        if settings.OUTBOX_INPROCESS_WORKER:
+            self.start()
+        self._wake.set()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, daemon=True)
+                self._thread.start()
+
+    def run(self, once=False):
+        workers = settings.OUTBOX_WORKERS
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                try:
+                    ids = claim_due_items(workers * 4)
+                except Exception:
+                    # Database hiccup; try again on the next poll
+                    ids = []
+                finally:
+                    close_old_connections()
+
+                list(pool.map(process_item, ids))
+
+                if once and not ids:
+                    return
+                if not ids:
+                    self._wake.wait(settings.OUTBOX_POLL_INTERVAL)
+                    self._wake.clear()
+
+
+worker = OutboxWorker()
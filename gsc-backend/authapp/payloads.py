@@ -0,0 +1,70 @@
+import json
+import re
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used without it
+    orjson = None
+
+# ?fields= takes top-level keys of Google's event and task resources
+FIELD_NAME = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+MAX_FIELDS = 50
+
+_encoder = DjangoJSONEncoder()
+
+
+def parse_fields(value):
+    """Field names asked for with ?fields=id,summary,start, or None for whole items."""
+    if not value:
+        return None
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    invalid = [name for name in fields if not FIELD_NAME.match(name)]
+    if invalid or not fields:
+        raise ValueError(f"Invalid fields: {', '.join(invalid) or value}")
+    if len(fields) > MAX_FIELDS:
+        raise ValueError(f"At most {MAX_FIELDS} fields can be selected")
+    return fields
+
+
+def project(items, fields, keep=()):
+    """Items cut down to fields (plus keep, keys the endpoint adds itself)."""
+    if fields is None:
+        return items
+    keys = fields + tuple(key for key in keep if key not in fields)
+    return [{key: item[key] for key in keys if key in item} for item in items]
+
+
+def google_fields(fields, page_keys=("nextPageToken",)):
+    """Google's partial response selector for a list call returning only fields of each item.
+
+    Cuts what Google sends, and so what we receive and decode, before the response
+    reaches us. Results are still passed through project() in case the keys asked for
+    are not all understood by the API.
+    """
+    if fields is None:
+        return None
+    return ",".join(page_keys + (f"items({','.join(fields)})",))
+
+
+def _default(value):
+    # Same output as JsonResponse for the types orjson leaves to us
+    return _encoder.default(value)
+
+
+def dumps(data):
+    """JSON bytes for a response body, with orjson when it is installed."""
+    if orjson is not None:
+        # Datetimes are handed to DjangoJSONEncoder so both encoders format them alike
+        return orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+class FastJsonResponse(HttpResponse):
+    """JsonResponse for large lists, encoded by dumps()."""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
@@ -0,0 +1,158 @@
+import hashlib
+import heapq
+from collections import namedtuple
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from dateutil.rrule import rrulestr
+from django.core.cache import cache
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import CalendarItem
+
+# Same shape the mirror queries hand out, so occurrences and stored rows merge freely.
+# id is the master's row id: it only breaks ties between events starting together.
+Occurrence = namedtuple("Occurrence", "id start_at end_at metadata")
+
+# How far ahead open-ended series are expanded when a caller gives no end
+RECURRENCE_HORIZON = timedelta(days=365)
+
+# Expanded windows are cached this long; the key changes whenever the series does
+EXPANSION_CACHE_TTL = 3600
+
+
+def _local_start(value):
+    """The series start as RRULE evaluation needs it: wall-clock time in the event's zone.
+
+    All-day series are naive dates, timed series are aware in their own zone so
+    occurrences keep their local time across DST changes.
+    """
+    if value.get("date"):
+        return datetime.combine(parse_date(value["date"]), time.min)
+    start = parse_datetime(value["dateTime"])
+    if value.get("timeZone"):
+        zone = ZoneInfo(value["timeZone"])
+        start = start.replace(tzinfo=zone) if start.tzinfo is None else start.astimezone(zone)
+    return start
+
+
+def _as_utc(moment):
+    # Naive moments come from all-day series, which the mirror stores as UTC midnight
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=dt_timezone.utc)
+    return moment.astimezone(dt_timezone.utc)
+
+
+def rule_set(event):
+    return rrulestr("\n".join(event["recurrence"]), dtstart=_local_start(event["start"]), forceset=True)
+
+
+def _duration(event):
+    start, end = event["start"], event.get("end") or event["start"]
+    if start.get("date"):
+        return parse_date(end["date"]) - parse_date(start["date"])
+    return parse_datetime(end["dateTime"]) - parse_datetime(start["dateTime"])
+
+
+def series_end(event):
+    """When the last occurrence ends, or None for a series that never stops."""
+    rules = [line for line in event["recurrence"] if line.startswith("RRULE")]
+    if any("UNTIL=" not in rule and "COUNT=" not in rule for rule in rules):
+        return None
+    last = None
+    for last in rule_set(event):
+        pass
+    return _as_utc(last) + _duration(event) if last else None
+
+
+def _occurrence(master, event, start, duration):
+    all_day = "date" in event["start"]
+    utc_start = _as_utc(start)
+    if all_day:
+        instance_id = f"{event['id']}_{start:%Y%m%d}"
+        start_value = {"date": start.date().isoformat()}
+        end_value = {"date": (start + duration).date().isoformat()}
+    else:
+        instance_id = f"{event['id']}_{utc_start:%Y%m%dT%H%M%SZ}"
+        zone = event["start"].get("timeZone")
+        start_value = {"dateTime": start.isoformat(), **({"timeZone": zone} if zone else {})}
+        end_value = {"dateTime": (start + duration).isoformat(), **({"timeZone": zone} if zone else {})}
+
+    metadata = {key: value for key, value in event.items() if key != "recurrence"}
+    metadata.update(
+        id=instance_id,
+        start=start_value,
+        end=end_value,
+        recurringEventId=event["id"],
+        originalStartTime=start_value,
+    )
+    return Occurrence(master.id, utc_start, utc_start + duration, metadata)
+
+
+def iter_occurrences(master, time_min=None, time_max=None, skip=()):
+    """Lazily yields the master's occurrences overlapping [time_min, time_max), in order.
+
+    skip holds the original start times (UTC) of occurrences that were moved or
+    cancelled; those are stored as rows of their own.
+    """
+    event = master.metadata
+    duration = _duration(event)
+    rules = rule_set(event)
+
+    if time_min is not None:
+        # Occurrences starting a little before the window can still overlap it
+        after = time_min - duration
+        if "date" in event["start"]:
+            after = after.astimezone(dt_timezone.utc).replace(tzinfo=None)
+        starts = rules.xafter(after, inc=False)
+    else:
+        starts = iter(rules)
+
+    for start in starts:
+        occurrence = _occurrence(master, event, start, duration)
+        if time_max is not None and occurrence.start_at >= time_max:
+            return
+        if occurrence.start_at in skip or (time_min is not None and occurrence.end_at <= time_min):
+            continue
+        yield occurrence
+
+
+def _cached_expansion(master, time_min, time_max, skip):
+    version = f"{master.id}|{master.updated_at.isoformat()}|{time_min.isoformat()}|{time_max.isoformat()}|"
+    version += ",".join(sorted(moment.isoformat() for moment in skip))
+    key = f"gsc:rrule:{hashlib.sha256(version.encode()).hexdigest()}"
+
+    occurrences = cache.get(key)
+    if occurrences is None:
+        occurrences = list(iter_occurrences(master, time_min, time_max, skip))
+        cache.set(key, occurrences, EXPANSION_CACHE_TTL)
+    return occurrences
+
+
+def expand_masters(masters, time_min=None, time_max=None):
+    """Occurrences of every master in the window, merged in (start_at, id) order.
+
+    Bounded windows are expanded once and cached; an open-ended window is consumed
+    lazily, so callers can stop after a page.
+    """
+    masters = list(masters)
+    if not masters:
+        return iter(())
+
+    skip = {}
+    exceptions = CalendarItem.objects.filter(
+        user_id__in={master.user_id for master in masters},
+        recurring_event_id__in=[master.google_item_id for master in masters],
+        original_start_at__isnull=False,
+    ).values_list("google_calendar_id", "recurring_event_id", "original_start_at")
+    for calendar_id, master_id, original_start in exceptions:
+        skip.setdefault((calendar_id, master_id), set()).add(original_start)
+
+    streams = []
+    for master in masters:
+        master_skip = skip.get((master.google_calendar_id, master.google_item_id), set())
+        if time_min is not None and time_max is not None:
+            streams.append(_cached_expansion(master, time_min, time_max, master_skip))
+        else:
+            streams.append(iter_occurrences(master, time_min, time_max, master_skip))
+    return heapq.merge(*streams, key=lambda occurrence: (occurrence.start_at, occurrence.id))
@@ -0,0 +1,247 @@
+import heapq
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from google.auth.exceptions import RefreshError
+
+from .caching import cache_key
+from .google_helpers import fetch_user_calendars
+from .models import GoogleCredentials, SyncSchedule, SyncState, WatchChannel
+from .sync import TASK_LISTS_STATE_ID, sync_calendar, sync_tasks
+from .watch import renew_expiring_channels
+
+# How long a claimed account is hidden from other schedulers while a worker syncs it.
+# A scheduler that dies mid-turn leaves its accounts to be picked up after this.
+CLAIM_LEASE = timedelta(minutes=15)
+
+# Claims look this many times further down the due queue than they take, so that
+# active accounts can be picked ahead of idle ones that have waited a little longer
+CLAIM_WINDOW = 10
+ACTIVE_PRIORITY = 10
+
+# Reads record activity at most this often per account and process
+ACTIVITY_RESOLUTION = 300
+
+FAILURE_BACKOFF_BASE = 60
+UPKEEP_INTERVAL = 60
+CHANNEL_RENEW_INTERVAL = 3600
+
+
+def mark_active(email):
+    """Records that the user is reading their mirror, which shortens their refresh interval.
+
+    An account connected since the scheduler's last upkeep is scheduled here, due at
+    once, so the rest of its calendars follow the one being read.
+    """
+    if not cache.add(cache_key("active", email), True, ACTIVITY_RESOLUTION):
+        return
+    now = timezone.now()
+    if SyncSchedule.objects.filter(credentials__email=email).update(last_active_at=now):
+        return
+    credentials_id = GoogleCredentials.objects.filter(email=email).values_list("id", flat=True).first()
+    if credentials_id is not None:
+        SyncSchedule.objects.get_or_create(
+            credentials_id=credentials_id, defaults={"next_sync_at": now, "last_active_at": now},
+        )
+
+
+def refresh_interval(schedule, now):
+    """Seconds between background syncs of the account, by how recently it was used."""
+    if schedule.last_synced_at is None:
+        # Never synced in the background: treated as active until its mirror is complete
+        return settings.SCHEDULER_ACTIVE_INTERVAL
+    idle_for = now - schedule.last_active_at if schedule.last_active_at else None
+    if idle_for is not None and idle_for < timedelta(seconds=settings.SCHEDULER_ACTIVE_WINDOW):
+        return settings.SCHEDULER_ACTIVE_INTERVAL
+    if idle_for is not None and idle_for < timedelta(seconds=settings.SCHEDULER_DORMANT_AFTER):
+        return settings.SCHEDULER_IDLE_INTERVAL
+    return settings.SCHEDULER_DORMANT_INTERVAL
+
+
+def jittered(seconds):
+    # Accounts connected or synced together drift apart instead of staying in lockstep
+    jitter = settings.SCHEDULER_JITTER
+    return timedelta(seconds=seconds * random.uniform(1 - jitter, 1 + jitter))
+
+
+def ensure_schedules():
+    """Schedules accounts connected since the last run, spread over the idle interval."""
+    now = timezone.now()
+    missing = GoogleCredentials.objects.filter(sync_schedule__isnull=True).values_list("id", flat=True)
+    created = SyncSchedule.objects.bulk_create(
+        [
+            SyncSchedule(
+                credentials_id=credentials_id,
+                next_sync_at=now + timedelta(seconds=random.uniform(0, settings.SCHEDULER_IDLE_INTERVAL)),
+            )
+            for credentials_id in missing.iterator()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    return len(created)
+
+
+def claim_due(limit):
+    """Leases up to limit due accounts, most overdue first, active accounts weighted ahead."""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    active_since = now - timedelta(seconds=settings.SCHEDULER_ACTIVE_WINDOW)
+
+    def priority(row):
+        _, next_sync_at, last_active_at, last_synced_at = row
+        overdue = (now - next_sync_at).total_seconds() + 1
+        active = last_synced_at is None or (last_active_at and last_active_at >= active_since)
+        return overdue * (ACTIVE_PRIORITY if active else 1)
+
+    with transaction.atomic():
+        candidates = list(
+            SyncSchedule.objects.select_for_update(skip_locked=True)
+            .filter(next_sync_at__lte=now)
+            .order_by("next_sync_at")
+            .values_list("id", "next_sync_at", "last_active_at", "last_synced_at")[:limit * CLAIM_WINDOW]
+        )
+        ids = [row[0] for row in heapq.nlargest(limit, candidates, key=priority)]
+        SyncSchedule.objects.filter(id__in=ids).update(next_sync_at=now + CLAIM_LEASE)
+    return ids
+
+
+def _due_resources(email, max_age, now):
+    """The account's calendars and its tasks not synced within max_age, stalest first."""
+    calendar_ids = [calendar["id"] for calendar in fetch_user_calendars(email)]
+    synced = {
+        (resource, calendar_id): synced_at
+        for resource, calendar_id, synced_at in SyncState.objects.filter(user__username=email).values_list(
+            "resource", "calendar_id", "synced_at",
+        )
+    }
+    # Calendars with a live push channel are synced on notification; poll them only as a fallback
+    watched = set(
+        WatchChannel.objects.filter(user__username=email, expiration__gt=now).values_list("calendar_id", flat=True)
+    )
+    watched_max_age = max(max_age, timedelta(seconds=settings.GOOGLE_WATCHED_MAX_STALENESS_SECONDS))
+
+    resources = [(SyncState.RESOURCE_CALENDAR, calendar_id) for calendar_id in calendar_ids]
+    resources.append((SyncState.RESOURCE_TASKS, TASK_LISTS_STATE_ID))
+    due = []
+    for key in resources:
+        synced_at = synced.get(key)
+        allowed = watched_max_age if key[0] == SyncState.RESOURCE_CALENDAR and key[1] in watched else max_age
+        if synced_at is None or now - synced_at >= allowed:
+            due.append(key)
+    # Never synced first, then by age
+    due.sort(key=lambda key: (synced.get(key) is not None, synced.get(key) or now))
+    return due
+
+
+def sync_account(schedule_id):
+    """One turn for one account: its stalest calendars and task lists, up to SCHEDULER_RESOURCES_PER_TURN.
+
+    An account with more left goes to the back of the due queue, so accounts with
+    many calendars cannot hold workers while others wait.
+    """
+    try:
+        schedule = SyncSchedule.objects.select_related("credentials").filter(pk=schedule_id).first()
+        if schedule is None:
+            # The account was disconnected after being claimed
+            return
+        email = schedule.credentials.email
+        now = timezone.now()
+        interval = refresh_interval(schedule, now)
+        try:
+            # Half the interval: calendars the user's own reads just refreshed are left alone
+            due = _due_resources(email, timedelta(seconds=interval / 2), now)
+            turn = due[:settings.SCHEDULER_RESOURCES_PER_TURN]
+            errors = []
+            for resource, calendar_id in turn:
+                try:
+                    if resource == SyncState.RESOURCE_TASKS:
+                        sync_tasks(email)
+                    else:
+                        sync_calendar(email, calendar_id)
+                except RefreshError:
+                    raise
+                except Exception as e:
+                    errors.append(f"{calendar_id}: {e}")
+            if turn and len(errors) == len(turn):
+                raise RuntimeError("; ".join(errors))
+        except Exception as e:
+            _record_failure(schedule, e)
+            return
+
+        schedule.failures = 0
+        schedule.last_error = "; ".join(errors)
+        schedule.last_synced_at = now
+        if len(due) > len(turn):
+            schedule.next_sync_at = timezone.now()
+        else:
+            schedule.next_sync_at = now + jittered(interval)
+        schedule.save(update_fields=["failures", "last_error", "last_synced_at", "next_sync_at"])
+    finally:
+        close_old_connections()
+
+
+def _record_failure(schedule, error):
+    schedule.failures += 1
+    schedule.last_error = str(error)
+    if isinstance(error, RefreshError):
+        # Access was revoked or the refresh token expired; only the user signing in again helps
+        delay = settings.SCHEDULER_DORMANT_INTERVAL
+    else:
+        delay = min(settings.SCHEDULER_DORMANT_INTERVAL, FAILURE_BACKOFF_BASE * 2 ** schedule.failures)
+    # Exponential backoff with jitter, so a Google outage does not end in a stampede
+    schedule.next_sync_at = timezone.now() + timedelta(seconds=random.uniform(delay / 2, delay))
+    schedule.save(update_fields=["failures", "last_error", "next_sync_at"])
+
+
+class SyncScheduler:
+    """Keeps the mirror of every connected account fresh in the background.
+
+    Accounts are leased from SyncSchedule rows, so a restart picks up where the last
+    run left off and several schedulers can share the work. Each sync resumes from the
+    sync tokens in SyncState rather than refetching.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or settings.SCHEDULER_WORKERS
+        self._next_upkeep = 0
+        self._next_renewal = 0
+
+    def upkeep(self):
+        now = time.monotonic()
+        if now >= self._next_upkeep:
+            self._next_upkeep = now + UPKEEP_INTERVAL
+            ensure_schedules()
+        if settings.GOOGLE_WEBHOOK_URL and now >= self._next_renewal:
+            self._next_renewal = now + CHANNEL_RENEW_INTERVAL
+            renew_expiring_channels()
+
+    def run(self, once=False):
+        running = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                try:
+                    self.upkeep()
+                    # Only as many accounts as there are free workers, so leases are not
+                    # spent waiting in the pool's queue
+                    ids = claim_due(self.workers - len(running))
+                except Exception:
+                    # Database hiccup; try again on the next poll
+                    ids = []
+                finally:
+                    close_old_connections()
+
+                running.update(pool.submit(sync_account, schedule_id) for schedule_id in ids)
+                if once and not running:
+                    return
+                if running:
+                    _, running = wait(running, timeout=settings.SCHEDULER_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(settings.SCHEDULER_POLL_INTERVAL)
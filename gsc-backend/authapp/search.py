@@ -0,0 +1,136 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import CalendarItem
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Past this many full-text hits a query is ordered by date instead of relevance
+BROAD_MATCHES = 5000
+
+# Longest query accepted, in characters and in words
+MAX_QUERY_LENGTH = 256
+MAX_TERMS = 10
+
+# Columns every backend returns, in this order
+_COLUMNS = "c.id, c.type, c.title, c.start_at, c.end_at, c.due_at, c.google_calendar_id, c.google_item_id, c.metadata"
+
+
+def search_terms(query):
+    """Words of query, as the index tokenizers split them; ValueError for a query too big to search."""
+    if len(query) > MAX_QUERY_LENGTH:
+        raise ValueError(f"Search query must be at most {MAX_QUERY_LENGTH} characters")
+    # Index tokenizers split on anything that is not a letter or digit; do the same
+    terms = re.findall(r"\w+", query.lower())
+    if len(terms) > MAX_TERMS:
+        raise ValueError(f"Search query must be at most {MAX_TERMS} words")
+    return terms
+
+
+def _filters(user_id, time_min, time_max, item_type):
+    # WHERE fragments for the raw queries. Raw SQL skips field adaptation, so values
+    # are converted the way the backend stores them.
+    moment = connection.ops.adapt_datetimefield_value
+    day = connection.ops.adapt_datefield_value
+
+    sql = ["c.user_id = %s"]
+    params = [user_id]
+    if time_min:
+        sql.append("(c.end_at > %s OR c.start_at >= %s OR c.due_at >= %s)")
+        params += [moment(time_min), moment(time_min), day(time_min.date())]
+    if time_max:
+        sql.append("(c.start_at < %s OR c.due_at < %s)")
+        params += [moment(time_max), day(time_max.date())]
+    if item_type:
+        sql.append("c.type = %s")
+        params.append(item_type)
+    return sql, params
+
+
+def _postgres(terms, user_id, time_min, time_max, item_type, limit):
+    where, params = _filters(user_id, time_min, time_max, item_type)
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    sql = f"""
+        SELECT {_COLUMNS}, ts_rank_cd(c.search_vector, q) AS rank
+        FROM authapp_calendaritem AS c, to_tsquery('simple', %s) AS q
+        WHERE c.search_vector @@ q AND {" AND ".join(where)}
+        ORDER BY rank DESC, c.start_at DESC NULLS LAST
+        LIMIT %s
+    """
+    return CalendarItem.objects.raw(sql, [tsquery] + params + [limit])
+
+
+def _sqlite(terms, user_id, time_min, time_max, item_type, limit):
+    where, params = _filters(user_id, time_min, time_max, item_type)
+    match = " ".join(f'"{term}"*' for term in terms)
+
+    def broad(match):
+        # Counting hits reads the index only; ranking them reads every matching row
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM (SELECT 1 FROM authapp_calendaritem_fts"
+                " WHERE authapp_calendaritem_fts MATCH %s LIMIT %s)",
+                [match, BROAD_MATCHES + 1],
+            )
+            return cursor.fetchone()[0] > BROAD_MATCHES
+
+    def query(match, exclude, limit):
+        excluded = f"AND c.id NOT IN ({', '.join(['%s'] * len(exclude))})" if exclude else ""
+        if not (time_min or time_max) and broad(match):
+            # A short prefix still being typed matches a large share of the mirror once
+            # each, which bm25 cannot tell apart anyway: list the latest hits instead,
+            # walking calitem_user_start_idx until the page is full. A date window
+            # already narrows what gets ranked, and would make that walk a scan.
+            sql = f"""
+                SELECT {_COLUMNS}, NULL AS rank
+                FROM authapp_calendaritem AS c
+                WHERE c.id IN (
+                    SELECT rowid FROM authapp_calendaritem_fts WHERE authapp_calendaritem_fts MATCH %s
+                ) AND {" AND ".join(where)} {excluded}
+                ORDER BY c.start_at DESC
+                LIMIT %s
+            """
+        else:
+            # bm25 is lower for better matches; weight title over attendees/location over description
+            sql = f"""
+                SELECT {_COLUMNS}, -bm25(authapp_calendaritem_fts, 10.0, 4.0, 1.0) AS rank
+                FROM authapp_calendaritem_fts
+                JOIN authapp_calendaritem AS c ON c.id = authapp_calendaritem_fts.rowid
+                WHERE authapp_calendaritem_fts MATCH %s AND {" AND ".join(where)} {excluded}
+                ORDER BY rank DESC, c.start_at DESC
+                LIMIT %s
+            """
+        return list(CalendarItem.objects.raw(sql, [match] + params + list(exclude) + [limit]))
+
+    # Ranking costs one bm25() per matching row, and common words in descriptions
+    # match a lot of rows. Title, attendee and location hits outrank description-only
+    # ones anyway, so rank those first and only go through descriptions to fill the page.
+    items = query(f"{{title details}} : ({match})", [], limit)
+    if len(items) < limit:
+        items += query(match, [item.id for item in items], limit - len(items))
+    return items
+
+
+def _fallback(terms, user_id, time_min, time_max, item_type, limit):
+    items = CalendarItem.objects.filter(user_id=user_id)
+    for term in terms:
+        items = items.filter(Q(title__icontains=term) | Q(description__icontains=term))
+    if time_min:
+        items = items.filter(Q(end_at__gt=time_min) | Q(start_at__gte=time_min) | Q(due_at__gte=time_min.date()))
+    if time_max:
+        items = items.filter(Q(start_at__lt=time_max) | Q(due_at__lt=time_max.date()))
+    if item_type:
+        items = items.filter(type=item_type)
+    return items.order_by("-start_at")[:limit]
+
+
+def search_items(user_id, query, time_min=None, time_max=None, item_type=None, limit=DEFAULT_LIMIT):
+    """Mirror rows matching every word of query as a prefix, best matches first."""
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    backend = {"postgresql": _postgres, "sqlite": _sqlite}.get(connection.vendor, _fallback)
+    return list(backend(terms, user_id, time_min, time_max, item_type, limit))
@@ -16,13 +16,21 @@ class CalendarItemSerializer(serializers.ModelSerializer):
 class GoogleItemCreateSerializer(serializers.Serializer):
     type = serializers.ChoiceField(choices=["event", "task", "appointment"])
     title = serializers.CharField()
-    description = serializers.CharField(required=False)
+    description = serializers.CharField(required=False, allow_blank=True)
     
-    google_calendar_id = serializers.CharField(required=False)
+    google_calendar_id = serializers.CharField(required=False, allow_blank=True, allow_null=True)
 
-    start_at = serializers.CharField(required=False)
-    end_at = serializers.CharField(required=False)
+    start_at = serializers.CharField(required=False, allow_blank=True)
+    end_at = serializers.CharField(required=False, allow_blank=True)
 
-    due_at = serializers.CharField(required=False)
+    due_at = serializers.CharField(required=False, allow_blank=True)
+    # Task list for tasks; the user's default list when left out
+    tasklist = serializers.CharField(required=False, allow_blank=True)
 
     add_meet = serializers.BooleanField(required=False)
+    attendees = serializers.ListField(child=serializers.EmailField(), required=False)
+
+    def validate(self, data):
+        if data["type"] in ["event", "appointment"] and not (data.get("start_at") and data.get("end_at")):
+            raise serializers.ValidationError("start_at and end_at are required for events")
+        return data
@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from django.conf import settings
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from .transport import AuthorizedTransport
+
+DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/{api}/{version}/rest"
+
+_documents = {}
+_documents_lock = threading.Lock()
+
+_services = OrderedDict()
+_services_lock = threading.Lock()
+
+
+def _load_document(api, version):
+    # Prefer the copy bundled with googleapiclient, then our on-disk cache, then the network
+    content = get_static_doc(api, version)
+    if content:
+        return json.loads(content)
+
+    cache_dir = settings.GOOGLE_DISCOVERY_CACHE_DIR
+    path = os.path.join(cache_dir, f"{api}.{version}.json")
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+
+    response = requests.get(DISCOVERY_URL.format(api=api, version=version), timeout=10)
+    response.raise_for_status()
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(path, "w") as f:
+        f.write(response.text)
+    return response.json()
+
+
+def get_discovery_document(api, version):
+    key = (api, version)
+    if key not in _documents:
+        with _documents_lock:
+            if key not in _documents:
+                document = _load_document(api, version)
+                # Lets benchmarks and local runs point the clients at a stand-in server
+                if settings.GOOGLE_API_ROOT_URL:
+                    document = dict(document, rootUrl=settings.GOOGLE_API_ROOT_URL)
+                _documents[key] = document
+    return _documents[key]
+
+
+def get_service(api, version, credentials, user_key):
+    key = (api, version, user_key)
+    now = time.monotonic()
+
+    with _services_lock:
+        entry = _services.get(key)
+        # Credentials are refreshed in place, so a different object means the user re-authorized
+        if entry and entry[1] is credentials and now - entry[2] < settings.GOOGLE_SERVICE_CACHE_TTL:
+            _services.move_to_end(key)
+            return entry[0]
+
+    service = build_from_document(get_discovery_document(api, version), http=AuthorizedTransport(credentials, user_key))
+
+    with _services_lock:
+        _services[key] = (service, credentials, now)
+        _services.move_to_end(key)
+        # Drop least recently used entries past the size bound, and expired ones at the cold end
+        while _services:
+            _, _, built_at = next(iter(_services.values()))
+            if len(_services) <= settings.GOOGLE_SERVICE_CACHE_SIZE and now - built_at < settings.GOOGLE_SERVICE_CACHE_TTL:
+                break
+            _services.popitem(last=False)
+    return service
+
+
+def calendar_service(credentials, user_key):
+    return get_service("calendar", "v3", credentials, user_key)
+
+
+def tasks_service(credentials, user_key):
+    return get_service("tasks", "v1", credentials, user_key)
+
+
+def clear_service_cache():
+    with _services_lock:
+        _services.clear()
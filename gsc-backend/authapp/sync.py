@@ -0,0 +1,424 @@
+import heapq
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+from urllib.parse import unquote
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.fields.json import KT
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from googleapiclient.errors import HttpError
+
+from .caching import cache_key, calendar_list
+from .models import CalendarItem, SyncState
+from .recurrence import RECURRENCE_HORIZON, expand_masters, series_end
+from .services import calendar_service, tasks_service
+from .throttle import execute
+from .utils import get_valid_credentials
+
+User = get_user_model()
+
+EVENTS_PAGE_SIZE = 250
+TASKS_PAGE_SIZE = 100
+
+# Task changes are asked for from a little before the last sync, in case of clock skew
+TASKS_UPDATED_OVERLAP = timedelta(minutes=5)
+
+# Per-user task state recording when all lists were last synced, next to one row per list
+TASK_LISTS_STATE_ID = "@lists"
+
+# Google's alias for an account's own calendar; see resolve_calendar_id
+PRIMARY_CALENDAR = "primary"
+
+# Google items are diffed against the mirror in one query and written in bulk, this many rows per statement
+INGEST_BATCH_SIZE = 500
+MIRROR_KEY = ["user", "google_calendar_id", "google_item_id"]
+EVENT_FIELDS = [
+    "type", "title", "description", "start_at", "end_at", "metadata", "sync_status",
+    "is_recurring", "recurrence_end_at", "recurring_event_id", "original_start_at", "updated_at",
+]
+TASK_FIELDS = ["google_calendar_id", "title", "description", "due_at", "metadata", "sync_status", "updated_at"]
+
+
+def get_mirror_user(email):
+    # Google accounts are identified by email; the mirror hangs off a Django user
+    user, _ = User.objects.get_or_create(username=email, defaults={"email": email})
+    return user
+
+
+def parse_google_time(value):
+    if not value:
+        return None
+    if value.get("dateTime"):
+        dt = parse_datetime(value["dateTime"])
+        # Bodies we build ourselves carry a naive local time plus a timeZone
+        if dt and timezone.is_naive(dt):
+            dt = timezone.make_aware(dt, ZoneInfo(value.get("timeZone") or "UTC"))
+        return dt
+    if value.get("date"):
+        # All-day events only carry a date
+        return datetime.combine(parse_date(value["date"]), time.min, tzinfo=dt_timezone.utc)
+    return None
+
+
+def list_event_changes(service, calendar_id, sync_token=None, email=None):
+    """Returns (events, next_sync_token); a full listing when sync_token is None."""
+    # Recurring series come back once as a master plus their exceptions; the mirror
+    # expands them locally (see recurrence.py)
+    params = {"calendarId": calendar_id, "maxResults": EVENTS_PAGE_SIZE, "singleEvents": False}
+    if sync_token:
+        params["syncToken"] = sync_token
+
+    events = []
+    page_token = None
+    while True:
+        result = execute(service.events().list(pageToken=page_token, **params), email)
+        events.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return events, result.get("nextSyncToken")
+
+
+def _event_row(user, calendar_id, event):
+    row = CalendarItem(
+        user=user,
+        type=CalendarItem.TYPE_EVENT,
+        google_calendar_id=calendar_id,
+        google_item_id=event["id"],
+        metadata=event,
+        sync_status=CalendarItem.SYNC_SYNCED,
+        recurring_event_id=event.get("recurringEventId") or "",
+        original_start_at=parse_google_time(event.get("originalStartTime")),
+    )
+    if event.get("status") == "cancelled":
+        # A deleted occurrence of a series: keep it so expansion skips that date.
+        # Without a start_at it never shows up in listings itself.
+        return row
+
+    row.title = (event.get("summary") or "")[:512]
+    row.description = event.get("description") or ""
+    row.start_at = parse_google_time(event.get("start"))
+    row.end_at = parse_google_time(event.get("end"))
+    row.is_recurring = bool(event.get("recurrence"))
+    row.recurrence_end_at = series_end(event) if row.is_recurring else None
+    return row
+
+
+def _delete_rows(pks):
+    deleted = 0
+    for offset in range(0, len(pks), INGEST_BATCH_SIZE):
+        deleted += CalendarItem.objects.filter(pk__in=pks[offset:offset + INGEST_BATCH_SIZE]).delete()[0]
+    return deleted
+
+
+def _stored_items(queryset):
+    """Maps google_item_id to (pk, etag, calendar or list id, type) of the mirror rows in queryset."""
+    # KT reads the etag as text; a plain key lookup would JSON-decode the quotes it carries
+    rows = queryset.values_list("pk", "google_item_id", KT("metadata__etag"), "google_calendar_id", "type")
+    return {item_id: (pk, etag, container, item_type) for pk, item_id, etag, container, item_type in rows}
+
+
+def _unchanged(item, match, container_id):
+    # Google changes the etag with every edit; items without one are always rewritten
+    etag = item.get("etag")
+    return match is not None and etag is not None and match[1] == etag and match[2] == container_id
+
+
+def _write_rows(rows, existing, fields):
+    """Upserts rows in batches; returns how many were written."""
+    now = timezone.now()
+    upserts, moves = [], []
+    for row in rows:
+        row.updated_at = now
+        match = existing.get(row.google_item_id)
+        if match is None or (match[2] == row.google_calendar_id and row.google_calendar_id is not None):
+            upserts.append(row)
+        else:
+            # Stored under another list, so the row's key changes with it; or keyed on a
+            # NULL list, which the unique constraint treats as distinct from any other
+            row.pk = match[0]
+            moves.append(row)
+
+    # New and changed rows go through the same upsert, which also absorbs items a
+    # write path mirrored since the diff
+    CalendarItem.objects.bulk_create(
+        upserts,
+        batch_size=INGEST_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=MIRROR_KEY,
+        update_fields=[field for field in fields if field not in MIRROR_KEY],
+    )
+    CalendarItem.objects.bulk_update(moves, fields, batch_size=INGEST_BATCH_SIZE)
+    return len(rows)
+
+
+def ingest_events(user, calendar_id, events, full=False):
+    """Writes Google events to the mirror with a handful of bulk statements.
+
+    With full, the events are the whole calendar and stored events missing from it are
+    removed. Returns (written, deleted).
+    """
+    # An event can show up twice across pages of changes; the later copy wins
+    latest = {event["id"]: event for event in events}
+    cancelled = {
+        event_id for event_id, event in latest.items()
+        if event.get("status") == "cancelled" and not event.get("recurringEventId")
+    }
+
+    stored = CalendarItem.objects.filter(user=user, google_calendar_id=calendar_id, google_item_id__isnull=False)
+    if not full:
+        stored = stored.filter(google_item_id__in=list(latest))
+    existing = _stored_items(stored)
+    doomed = [existing[event_id][0] for event_id in cancelled if event_id in existing]
+    if full:
+        doomed += [
+            match[0] for event_id, match in existing.items()
+            if event_id not in latest and match[3] == CalendarItem.TYPE_EVENT
+        ]
+    rows = [
+        _event_row(user, calendar_id, event) for event_id, event in latest.items()
+        if event_id not in cancelled and not _unchanged(event, existing.get(event_id), calendar_id)
+    ]
+
+    with transaction.atomic():
+        deleted = _delete_rows(doomed)
+        if cancelled:
+            # Cancelling a series takes its exceptions with it
+            deleted += CalendarItem.objects.filter(
+                user=user, google_calendar_id=calendar_id, recurring_event_id__in=list(cancelled),
+            ).delete()[0]
+        written = _write_rows(rows, existing, EVENT_FIELDS)
+    return written, deleted
+
+
+def resolve_calendar_id(email, calendar_id):
+    """calendar_id with the "primary" alias replaced by the real id of the account's calendar.
+
+    Mirror rows, sync tokens and watch channels are keyed on real ids: keyed on the
+    alias as well, the primary calendar would be mirrored, polled and watched twice.
+    """
+    if calendar_id != PRIMARY_CALENDAR:
+        return calendar_id
+    key = cache_key("primary_calendar", email)
+    resolved = cache.get(key)
+    if resolved is None:
+        service = calendar_service(get_valid_credentials(email), email)
+        calendars = calendar_list(email, service).get("items", [])
+        # Google names an account's primary calendar after the account itself
+        resolved = next((calendar["id"] for calendar in calendars if calendar.get("primary")), email)
+        # The primary calendar of an account never changes
+        cache.set(key, resolved, None)
+    return resolved
+
+
+# Write paths keep the mirror current instead of waiting for the next sync
+def mirror_event(email, calendar_id, event):
+    mirror_events(email, calendar_id, [event])
+
+
+def mirror_events(email, calendar_id, events):
+    if events:
+        ingest_events(get_mirror_user(email), resolve_calendar_id(email, calendar_id), events)
+
+
+def unmirror_events(email, calendar_id, event_ids):
+    CalendarItem.objects.filter(
+        user__username=email,
+        google_calendar_id=resolve_calendar_id(email, calendar_id),
+        google_item_id__in=event_ids,
+    ).delete()
+
+
+def sync_calendar(email, calendar_id=PRIMARY_CALENDAR):
+    calendar_id = resolve_calendar_id(email, calendar_id)
+    user = get_mirror_user(email)
+    state, _ = SyncState.objects.get_or_create(
+        user=user, resource=SyncState.RESOURCE_CALENDAR, calendar_id=calendar_id,
+    )
+
+    creds = get_valid_credentials(email)
+    service = calendar_service(creds, email)
+
+    full = not state.sync_token
+    try:
+        events, next_token = list_event_changes(service, calendar_id, state.sync_token, email)
+    except HttpError as e:
+        # 410 Gone: the sync token expired, Google wants a full resync
+        if e.resp.status != 410:
+            raise
+        full = True
+        events, next_token = list_event_changes(service, calendar_id, email=email)
+
+    with transaction.atomic():
+        updated, deleted = ingest_events(user, calendar_id, events, full=full)
+
+        state.sync_token = next_token
+        state.synced_at = timezone.now()
+        state.save(update_fields=["sync_token", "synced_at"])
+
+    return {"full": full, "updated": updated, "deleted": deleted, "synced_at": state.synced_at}
+
+
+def mirrored_events(email, calendar_id=PRIMARY_CALENDAR):
+    items = CalendarItem.objects.filter(
+        user__username=email,
+        google_calendar_id=resolve_calendar_id(email, calendar_id),
+        type=CalendarItem.TYPE_EVENT,
+        sync_status=CalendarItem.SYNC_SYNCED,
+        start_at__isnull=False,
+    )
+    singles = items.filter(is_recurring=False).order_by("start_at", "id")
+    # Series without an end are expanded up to the horizon
+    occurrences = expand_masters(items.filter(is_recurring=True), time_max=timezone.now() + RECURRENCE_HORIZON)
+    merged = heapq.merge(singles, occurrences, key=lambda item: (item.start_at, item.id))
+    return [item.metadata for item in merged]
+
+
+def task_list_id(task):
+    # Tasks do not name their list, but their selfLink does: .../lists/{list}/tasks/{task}
+    parts = task.get("selfLink", "").split("/")
+    if "lists" in parts and parts.index("lists") + 1 < len(parts):
+        return unquote(parts[parts.index("lists") + 1])
+    return None
+
+
+def _task_row(user, tasklist_id, task):
+    return CalendarItem(
+        user=user,
+        type=CalendarItem.TYPE_TASK,
+        google_calendar_id=tasklist_id,
+        google_item_id=task["id"],
+        title=(task.get("title") or "")[:512],
+        description=task.get("notes") or "",
+        due_at=parse_datetime(task["due"]).date() if task.get("due") else None,
+        metadata=task,
+        sync_status=CalendarItem.SYNC_SYNCED,
+    )
+
+
+def ingest_tasks(user, tasklist_id, tasks, full=False):
+    """Writes Google tasks of one list to the mirror, like ingest_events. Returns (written, deleted)."""
+    latest = {task["id"]: task for task in tasks}
+    removed = [task_id for task_id, task in latest.items() if task.get("deleted")]
+
+    # Task ids are unique per account, so rows stored before their list was known, or
+    # under a list the task has since moved out of, still match
+    stored = CalendarItem.objects.filter(user=user, type=CalendarItem.TYPE_TASK, google_item_id__isnull=False)
+    if full:
+        stored = stored.filter(Q(google_calendar_id=tasklist_id) | Q(google_item_id__in=list(latest)))
+    else:
+        stored = stored.filter(google_item_id__in=list(latest))
+    existing = _stored_items(stored)
+    doomed = [existing[task_id][0] for task_id in removed if task_id in existing]
+    if full:
+        doomed += [match[0] for task_id, match in existing.items() if task_id not in latest]
+
+    def list_of(task_id):
+        # A task whose list is unknown (no selfLink) stays in the list the mirror has it in
+        return tasklist_id or (existing[task_id][2] if task_id in existing else None)
+
+    rows = [
+        _task_row(user, list_of(task_id), task) for task_id, task in latest.items()
+        if not task.get("deleted") and not _unchanged(task, existing.get(task_id), list_of(task_id))
+    ]
+
+    with transaction.atomic():
+        deleted = _delete_rows(doomed)
+        written = _write_rows(rows, existing, TASK_FIELDS)
+    return written, deleted
+
+
+def mirror_task(email, task, tasklist_id=None):
+    ingest_tasks(get_mirror_user(email), tasklist_id or task_list_id(task), [task])
+
+
+def unmirror_tasks(email, task_ids):
+    CalendarItem.objects.filter(
+        user__username=email,
+        type=CalendarItem.TYPE_TASK,
+        google_item_id__in=task_ids,
+    ).delete()
+
+
+def list_task_lists(service, email=None):
+    lists = []
+    page_token = None
+    while True:
+        result = execute(service.tasklists().list(maxResults=100, pageToken=page_token), email)
+        lists.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return lists
+
+
+def list_task_changes(service, tasklist_id, updated_min=None, email=None):
+    """Every task in the list, or with updated_min only those changed since, deletions included."""
+    params = {
+        "tasklist": tasklist_id,
+        "maxResults": TASKS_PAGE_SIZE,
+        "showCompleted": True,
+        "showHidden": True,
+    }
+    if updated_min:
+        params.update(updatedMin=updated_min, showDeleted=True)
+
+    tasks = []
+    page_token = None
+    while True:
+        result = execute(service.tasks().list(pageToken=page_token, **params), email)
+        tasks.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return tasks
+
+
+def sync_tasks(email):
+    """Mirrors every task list of the user, incrementally where a previous sync left off."""
+    user = get_mirror_user(email)
+    service = tasks_service(get_valid_credentials(email), email)
+    states = {
+        state.calendar_id: state
+        for state in SyncState.objects.filter(user=user, resource=SyncState.RESOURCE_TASKS)
+    }
+
+    lists = list_task_lists(service, email)
+    list_ids = [tasklist["id"] for tasklist in lists]
+    updated = deleted = 0
+
+    for tasklist_id in list_ids:
+        state = states.get(tasklist_id) or SyncState(
+            user=user, resource=SyncState.RESOURCE_TASKS, calendar_id=tasklist_id,
+        )
+        started = timezone.now()
+        tasks = list_task_changes(service, tasklist_id, state.sync_token, email)
+
+        with transaction.atomic():
+            written, removed = ingest_tasks(user, tasklist_id, tasks, full=not state.sync_token)
+            updated += written
+            deleted += removed
+
+            state.sync_token = (started - TASKS_UPDATED_OVERLAP).isoformat()
+            state.synced_at = started
+            state.save()
+
+    # Lists deleted in Google take their tasks with them
+    with transaction.atomic():
+        deleted += (
+            CalendarItem.objects.filter(user=user, type=CalendarItem.TYPE_TASK)
+            .exclude(google_item_id__isnull=True)
+            .exclude(google_calendar_id__in=list_ids)
+            .delete()[0]
+        )
+        SyncState.objects.filter(user=user, resource=SyncState.RESOURCE_TASKS).exclude(
+            calendar_id__in=list_ids + [TASK_LISTS_STATE_ID],
+        ).delete()
+        synced_at = timezone.now()
+        SyncState.objects.update_or_create(
+            user=user, resource=SyncState.RESOURCE_TASKS, calendar_id=TASK_LISTS_STATE_ID,
+            defaults={"synced_at": synced_at},
+        )
+
+    return {"lists": list_ids, "updated": updated, "deleted": deleted, "synced_at": synced_at}
@@ -0,0 +1,104 @@
+import json
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase, override_settings
+from google.oauth2.credentials import Credentials
+
+from authapp import aio
+from authapp.throttle import RateLimitExceeded
+
+EMAIL = "a@example.com"
+
+
+@override_settings(GOOGLE_USER_QPS=1000, GOOGLE_RATE_LIMIT_RETRIES=1, GOOGLE_API_ROOT_URL="")
+class GoogleRequestTests(SimpleTestCase):
+    def setUp(self):
+        self.creds = Credentials("token-1", refresh_token="refresh", token_uri="https://oauth2.example.com/token",
+                                 client_id="id", client_secret="secret")
+        self.manager = mock.Mock()
+        self.manager.cached.return_value = self.creds
+        patcher = mock.patch("authapp.aio.credential_manager", self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("authapp.aio.asyncio.sleep", mock.AsyncMock())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.sent = []
+
+    def serve(self, *responses):
+        responses = list(responses)
+
+        def handler(request):
+            self.sent.append(request)
+            return responses.pop(0)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        patcher = mock.patch("authapp.aio.get_client", return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_list_is_sent_with_the_token_and_without_empty_params(self):
+        self.serve(httpx.Response(200, json={"items": [{"id": "e1"}]}))
+        result = await aio.list_events(EMAIL, "team@group.calendar.google.com")
+        self.assertEqual(result, {"items": [{"id": "e1"}]})
+        request, = self.sent
+        self.assertEqual(request.url.raw_path.split(b"?")[0], b"/calendar/v3/calendars/team%40group.calendar.google.com/events")
+        self.assertNotIn("pageToken", request.url.params)
+        self.assertEqual(request.headers["authorization"], "Bearer token-1")
+
+    async def test_unauthorized_request_is_sent_again_after_one_refresh(self):
+        def refresh(email, creds, trigger, rejected_token):
+            creds.token = "token-2"
+        self.manager.refresh.side_effect = refresh
+        self.serve(httpx.Response(401), httpx.Response(200, json={}))
+        await aio.list_calendars(EMAIL)
+        self.manager.refresh.assert_called_once_with(EMAIL, self.creds, trigger="unauthorized", rejected_token="token-1")
+        self.assertEqual(self.sent[-1].headers["authorization"], "Bearer token-2")
+
+    async def test_errors_carry_google_status_and_message(self):
+        self.serve(httpx.Response(404, json={"error": {"message": "Not Found"}}))
+        with self.assertRaisesMessage(aio.GoogleAPIError, "Google API error 404: Not Found") as raised:
+            await aio.delete_event(EMAIL, "primary", "e1")
+        self.assertEqual(raised.exception.status, 404)
+
+    async def test_rate_limits_are_retried_then_raised(self):
+        limited = httpx.Response(429, json={"error": {"message": "slow down"}})
+        self.serve(limited, limited)
+        with self.assertRaises(RateLimitExceeded):
+            await aio.list_calendars(EMAIL)
+        self.assertEqual(len(self.sent), 2)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class AsyncViewTests(SimpleTestCase):
+    @mock.patch("authapp.async_views.aio.list_events", new_callable=mock.AsyncMock)
+    async def test_events_are_projected_to_the_fields_asked_for(self, list_events):
+        list_events.return_value = {"items": [{"id": "e1", "summary": "Standup", "etag": '"1"'}], "nextPageToken": "n"}
+        response = await self.async_client.get("/auth/aio/events/", {"email": EMAIL, "fields": "id,summary"})
+        self.assertEqual(json.loads(response.content), {"events": [{"id": "e1", "summary": "Standup"}], "next_cursor": "n"})
+        self.assertEqual(list_events.call_args.kwargs["fields"], "nextPageToken,items(id,summary)")
+
+    @mock.patch("authapp.async_views.mirror_event")
+    @mock.patch("authapp.async_views.aio.insert_event", new_callable=mock.AsyncMock)
+    async def test_created_event_is_mirrored(self, insert_event, mirror_event):
+        insert_event.return_value = {"id": "e1", "htmlLink": "https://calendar.google.com/e1"}
+        body = {"email": EMAIL, "title": "Standup", "start": "2025-03-10T09:00", "end": "2025-03-10T09:30"}
+        response = await self.async_client.post("/auth/aio/events/create", body, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(insert_event.call_args.args[2]["start"]["dateTime"], "2025-03-10T09:00:00")
+        mirror_event.assert_called_once_with(EMAIL, "primary", insert_event.return_value)
+
+    async def test_malformed_json_is_a_400(self):
+        for method, path in (("post", "create"), ("put", "update"), ("delete", "delete")):
+            with self.subTest(path=path):
+                send = getattr(self.async_client, method)
+                response = await send(f"/auth/aio/events/{path}", "{", content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+
+    @mock.patch("authapp.async_views.aio.list_calendars", new_callable=mock.AsyncMock)
+    async def test_quota_errors_are_a_429(self, list_calendars):
+        list_calendars.side_effect = RateLimitExceeded("slow down", retry_after=2.5)
+        response = await self.async_client.get("/auth/aio/calendars/", {"email": EMAIL})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "3")
@@ -0,0 +1,126 @@
+from datetime import datetime, time, timedelta, timezone
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone as django_timezone
+
+from authapp.availability import find_availability, free_slots, merge_intervals, working_windows
+from authapp.models import GoogleCredentials
+from authapp.sync import get_mirror_user, ingest_events
+
+from .test_sync import EMAIL, event, resolve_primary
+
+WORKDAYS = {0, 1, 2, 3, 4}
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class IntervalTests(SimpleTestCase):
+    def test_overlapping_and_touching_intervals_are_merged(self):
+        merged = merge_intervals([
+            (utc(2025, 3, 10, 11), utc(2025, 3, 10, 12)),
+            (utc(2025, 3, 10, 9), utc(2025, 3, 10, 10)),
+            (utc(2025, 3, 10, 9, 30), utc(2025, 3, 10, 9, 45)),
+            (utc(2025, 3, 10, 10), utc(2025, 3, 10, 10, 30)),
+        ])
+        self.assertEqual(merged, [(utc(2025, 3, 10, 9), utc(2025, 3, 10, 10, 30)),
+                                  (utc(2025, 3, 10, 11), utc(2025, 3, 10, 12))])
+
+    def test_buffer_widens_each_interval(self):
+        merged = merge_intervals(
+            [(utc(2025, 3, 10, 9), utc(2025, 3, 10, 10)), (utc(2025, 3, 10, 10, 20), utc(2025, 3, 10, 11))],
+            buffer=timedelta(minutes=10),
+        )
+        self.assertEqual(merged, [(utc(2025, 3, 10, 8, 50), utc(2025, 3, 10, 11, 10))])
+
+    def test_working_windows_skip_days_off_and_follow_dst(self):
+        tz = ZoneInfo("America/New_York")
+        # Friday 7 March to Monday 10 March 2025; clocks went forward on Sunday the 9th
+        windows = list(working_windows(utc(2025, 3, 7), utc(2025, 3, 11), tz, time(9), time(17), WORKDAYS))
+        self.assertEqual(windows, [
+            (utc(2025, 3, 7, 14), utc(2025, 3, 7, 22)),
+            (utc(2025, 3, 10, 13), utc(2025, 3, 10, 21)),
+        ])
+
+    def test_working_windows_are_clipped_to_the_range(self):
+        windows = list(working_windows(utc(2025, 3, 10, 12), utc(2025, 3, 10, 15), timezone.utc,
+                                       time(9), time(17), WORKDAYS))
+        self.assertEqual(windows, [(utc(2025, 3, 10, 12), utc(2025, 3, 10, 15))])
+
+    def test_free_slots_fill_the_gaps_on_an_aligned_grid(self):
+        busy = [(utc(2025, 3, 10, 10), utc(2025, 3, 10, 10, 50))]
+        windows = [(utc(2025, 3, 10, 9, 5), utc(2025, 3, 10, 12))]
+        slots = free_slots(busy, windows, timedelta(minutes=30))
+        self.assertEqual([start.strftime("%H:%M") for start, _ in slots], ["09:15", "11:15"])
+
+    def test_free_slots_step_can_be_finer_than_the_duration(self):
+        windows = [(utc(2025, 3, 10, 9), utc(2025, 3, 10, 10))]
+        slots = free_slots([], windows, timedelta(minutes=30), step=timedelta(minutes=15))
+        self.assertEqual([start.strftime("%H:%M") for start, _ in slots], ["09:00", "09:15", "09:30"])
+
+    def test_busy_intervals_spanning_windows_block_each_of_them(self):
+        busy = [(utc(2025, 3, 10, 16), utc(2025, 3, 11, 10))]
+        windows = [(utc(2025, 3, 10, 15), utc(2025, 3, 10, 17)), (utc(2025, 3, 11, 9), utc(2025, 3, 11, 11))]
+        slots = free_slots(busy, windows, timedelta(hours=1))
+        self.assertEqual(slots, [(utc(2025, 3, 10, 15), utc(2025, 3, 10, 16)),
+                                 (utc(2025, 3, 11, 10), utc(2025, 3, 11, 11))])
+
+
+class FindAvailabilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        GoogleCredentials.objects.create(
+            email=EMAIL, access_token="token", refresh_token="refresh", token_uri="https://oauth2.example.com/token",
+            client_id="id", client_secret="secret", expiry=django_timezone.now() + timedelta(hours=1),
+        )
+        resolve_primary()
+        ingest_events(get_mirror_user(EMAIL), EMAIL, [
+            event("single", hour=9),
+            event("daily", hour=11, recurrence=["RRULE:FREQ=DAILY;COUNT=5"]),
+            event("free", hour=13, transparency="transparent"),
+        ], full=True)
+        # Only the primary calendar counts, as with freebusy
+        ingest_events(get_mirror_user(EMAIL), "team@group.calendar.google.com", [event("team", hour=14)], full=True)
+        patcher = mock.patch("authapp.availability.ensure_fresh")
+        self.ensure_fresh = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def find(self, attendees=(), **kwargs):
+        return find_availability(EMAIL, list(attendees), utc(2025, 3, 10, 9), utc(2025, 3, 10, 15), timezone.utc,
+                                 time(9), time(15), WORKDAYS, timedelta(hours=1), **kwargs)
+
+    def test_mirror_busy_times_include_series_and_skip_transparent_events(self):
+        slots, busy, errors = self.find()
+        self.assertEqual(busy, [(utc(2025, 3, 10, 9), utc(2025, 3, 10, 9, 30)),
+                                (utc(2025, 3, 10, 11), utc(2025, 3, 10, 11, 30))])
+        # Hour-long slots stay on the hour grid the working day starts on
+        self.assertEqual([start.hour for start, _ in slots], [10, 12, 13, 14])
+        self.assertEqual(errors, {})
+
+    @mock.patch("authapp.availability.freebusy_busy")
+    def test_other_attendees_are_asked_of_google(self, freebusy_busy):
+        freebusy_busy.return_value = (
+            {"b@example.com": [(utc(2025, 3, 10, 12), utc(2025, 3, 10, 15))]},
+            {"c@example.com": "notFound"},
+        )
+        slots, _, errors = self.find(["b@example.com", "c@example.com", EMAIL])
+        freebusy_busy.assert_called_once_with(EMAIL, ["b@example.com", "c@example.com"],
+                                              utc(2025, 3, 10, 9), utc(2025, 3, 10, 15))
+        self.assertEqual(slots, [(utc(2025, 3, 10, 10), utc(2025, 3, 10, 11))])
+        self.assertEqual(errors, {"c@example.com": "notFound"})
+
+    def test_attendees_in_the_mirror_are_refreshed_without_marking_them_active(self):
+        GoogleCredentials.objects.create(
+            email="b@example.com", access_token="token", refresh_token="refresh", token_uri="https://oauth2.example.com/token",
+            client_id="id", client_secret="secret", expiry=django_timezone.now() + timedelta(hours=1),
+        )
+        resolve_primary("b@example.com", "b@example.com")
+        self.find(["b@example.com"])
+        self.assertEqual([(call.args[:2], call.kwargs) for call in self.ensure_fresh.call_args_list], [
+            ((EMAIL, EMAIL), {"active": True}),
+            (("b@example.com", "b@example.com"), {"active": False}),
+        ])
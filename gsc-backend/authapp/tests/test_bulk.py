@@ -0,0 +1,99 @@
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from authapp.google_helpers import batch_create_items, bulk_update_events
+from authapp.models import CalendarItem
+from authapp.sync import get_mirror_user, ingest_events
+
+from .test_sync import EMAIL, event, resolve_primary, task
+from .test_throttle import http_error
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class BulkBodyTests(SimpleTestCase):
+    def send(self, path, body, method="delete"):
+        return getattr(self.client, method)(path, data=body, content_type="application/json")
+
+    def test_body_that_is_not_an_object_is_a_400(self):
+        for body in ("[]", "42", '"email"', "null"):
+            with self.subTest(body=body):
+                response = self.send("/auth/events/bulk-delete", body)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(json.loads(response.content), {"error": "Request body must be a JSON object"})
+
+    def test_malformed_json_is_a_400(self):
+        self.assertEqual(self.send("/auth/tasks/bulk-delete", "{").status_code, 400)
+
+    def test_missing_ids_are_a_400(self):
+        response = self.send("/auth/events/bulk-delete", json.dumps({"email": "a@example.com", "event_ids": []}))
+        self.assertEqual(response.status_code, 400)
+
+    def test_updates_without_an_event_id_are_a_400(self):
+        body = json.dumps({"email": "a@example.com", "updates": [{"title": "x"}]})
+        self.assertEqual(self.send("/auth/events/bulk-update", body, method="patch").status_code, 400)
+
+    @mock.patch("authapp.views.bulk_delete_events")
+    def test_partial_failure_is_a_207(self, bulk_delete_events):
+        bulk_delete_events.return_value = [
+            {"id": "e1", "success": True, "error": None},
+            {"id": "e2", "success": False, "error": "Not Found"},
+        ]
+        body = json.dumps({"email": "a@example.com", "event_ids": ["e1", "e2"], "calendar_id": "work"})
+        response = self.send("/auth/events/bulk-delete", body)
+        self.assertEqual(response.status_code, 207)
+        bulk_delete_events.assert_called_once_with("a@example.com", "work", ["e1", "e2"])
+
+
+class BatchCreateTests(TestCase):
+    def setUp(self):
+        resolve_primary()
+        for target in ("get_google_creds", "calendar_service", "tasks_service", "execute_batch"):
+            patcher = mock.patch(f"authapp.google_helpers.{target}")
+            setattr(self, target, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.execute_batch.side_effect = [
+            [(event("e1"), None), (None, http_error(400))],
+            [(task("t1", tasklist="L1"), None)],
+        ]
+        self.items = [
+            {"type": CalendarItem.TYPE_EVENT, "title": "e1", "start_at": "2025-03-10T09:00", "end_at": "2025-03-10T09:30"},
+            {"type": CalendarItem.TYPE_EVENT, "title": "bad", "start_at": "2025-03-10T09:00", "end_at": "2025-03-10T08:00"},
+            {"type": CalendarItem.TYPE_TASK, "title": "t1"},
+        ]
+
+    def test_items_are_mirrored_with_their_outcome(self):
+        results = batch_create_items(EMAIL, self.items)
+        self.assertEqual([r["sync_status"] for r in results], ["synced", "failed", "synced"])
+        rows = CalendarItem.objects.in_bulk([r["id"] for r in results])
+        self.assertEqual(rows[results[0]["id"]].google_calendar_id, EMAIL)
+        self.assertEqual(rows[results[2]["id"]].google_calendar_id, "L1")
+        self.assertIsNone(rows[results[1]["id"]].google_item_id)
+
+    def test_item_a_sync_mirrored_first_takes_over_its_row(self):
+        ingest_events(get_mirror_user(EMAIL), EMAIL, [event("e1")])
+        mirrored = CalendarItem.objects.get(google_item_id="e1")
+        results = batch_create_items(EMAIL, self.items)
+        self.assertEqual(results[0]["id"], mirrored.pk)
+        self.assertEqual(CalendarItem.objects.filter(google_item_id="e1").count(), 1)
+
+
+class BulkUpdateTests(TestCase):
+    def setUp(self):
+        resolve_primary()
+        ingest_events(get_mirror_user(EMAIL), EMAIL, [event("e1"), event("e2"), event("e3")], full=True)
+        for target in ("get_google_creds", "calendar_service", "execute_batch"):
+            patcher = mock.patch(f"authapp.google_helpers.{target}")
+            setattr(self, target, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def test_updated_events_are_mirrored_in_one_ingest(self):
+        self.execute_batch.return_value = [(event("e1", 2), None), (None, http_error(404)), (event("e3", 2), None)]
+        updates = [{"event_id": event_id, "summary": "new"} for event_id in ("e1", "e2", "e3")]
+        with mock.patch("authapp.sync.ingest_events", wraps=ingest_events) as ingest:
+            report = bulk_update_events(EMAIL, "primary", updates)
+        ingest.assert_called_once()
+        self.assertEqual([r["success"] for r in report], [True, False, True])
+        titles = dict(CalendarItem.objects.values_list("google_item_id", "title"))
+        self.assertEqual(titles, {"e1": "e1 v2", "e2": "e2 v1", "e3": "e3 v2"})
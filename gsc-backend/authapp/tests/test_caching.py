@@ -0,0 +1,59 @@
+import json
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from authapp.caching import conditional_response
+from authapp.sync import get_mirror_user, ingest_events
+
+from .test_sync import EMAIL, event, resolve_primary
+
+SYNCED_AT = datetime(2025, 3, 10, 9, tzinfo=timezone.utc)
+
+
+class ConditionalResponseTests(SimpleTestCase):
+    def respond(self, data, unversioned=None, if_none_match=None):
+        headers = {"HTTP_IF_NONE_MATCH": if_none_match} if if_none_match else {}
+        return conditional_response(RequestFactory().get("/", **headers), data, unversioned)
+
+    def test_unversioned_keys_are_sent_but_not_hashed(self):
+        first = self.respond({"events": [1, 2]}, {"synced_at": "a", "stale": False})
+        second = self.respond({"events": [1, 2]}, {"synced_at": "b", "stale": True})
+        self.assertEqual(first["ETag"], second["ETag"])
+        self.assertEqual(json.loads(second.content), {"events": [1, 2], "synced_at": "b", "stale": True})
+
+    def test_changed_data_changes_the_etag(self):
+        self.assertNotEqual(self.respond({"events": [1]})["ETag"], self.respond({"events": [2]})["ETag"])
+
+    def test_matching_etag_gets_a_304_weak_or_strong(self):
+        etag = self.respond({"events": []})["ETag"]
+        self.assertEqual(self.respond({"events": []}, if_none_match=etag).status_code, 304)
+        self.assertEqual(self.respond({"events": []}, if_none_match=f"W/{etag}").status_code, 304)
+        self.assertEqual(self.respond({"events": [1]}, if_none_match=etag).status_code, 200)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class MirrorPollTests(TestCase):
+    def setUp(self):
+        resolve_primary()
+        ingest_events(get_mirror_user(EMAIL), EMAIL, [event("e1")], full=True)
+
+    def get(self, synced_at, **headers):
+        with mock.patch("authapp.views.ensure_fresh", return_value=(synced_at, False)):
+            return self.client.get("/auth/events/?email=a@example.com", headers=headers)
+
+    def test_poll_after_a_sync_that_changed_nothing_gets_a_304(self):
+        first = self.get(SYNCED_AT)
+        later = SYNCED_AT + timedelta(minutes=1)
+        second = self.get(later, **{"If-None-Match": first["ETag"]})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["X-Synced-At"], later.isoformat())
+        self.assertEqual(json.loads(first.content)["synced_at"], SYNCED_AT.isoformat())
+
+    def test_poll_after_a_change_gets_the_new_data(self):
+        first = self.get(SYNCED_AT)
+        ingest_events(get_mirror_user(EMAIL), EMAIL, [event("e1", 2)])
+        second = self.get(SYNCED_AT, **{"If-None-Match": first["ETag"]})
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(json.loads(second.content)["events"][0]["summary"], "e1 v2")
@@ -0,0 +1,113 @@
+import asyncio
+import gzip
+import unittest
+import zlib
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from authapp import middleware
+from authapp.middleware import CompressionMiddleware, accepted_encodings
+
+BODY = b'{"id": "event", "summary": "Weekly planning"}\n' * 200
+
+
+def compress(response, accept_encoding):
+    request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+    return CompressionMiddleware(lambda request: response).process_response(request, response)
+
+
+def single_gzip_member(data):
+    # What clients that stop after the first gzip member see
+    decompressor = zlib.decompressobj(wbits=31)
+    body = decompressor.decompress(data)
+    return body if decompressor.eof and not decompressor.unused_data else None
+
+
+@override_settings(COMPRESSION_MIN_BYTES=1024, COMPRESSION_BROTLI_QUALITY=5)
+class NegotiationTests(SimpleTestCase):
+    def test_accept_encoding_is_parsed_with_q_values(self):
+        self.assertEqual(
+            accepted_encodings("gzip;q=0.5, BR, identity;q=0, deflate;q=x"),
+            {"gzip": 0.5, "br": 1.0, "identity": 0.0, "deflate": 0.0},
+        )
+
+    def test_gzip_when_that_is_all_the_client_takes(self):
+        self.assertEqual(middleware._negotiate("gzip, deflate"), "gzip")
+
+    def test_refused_or_missing_codings_leave_the_body_alone(self):
+        self.assertIsNone(middleware._negotiate(""))
+        self.assertIsNone(middleware._negotiate("gzip;q=0, br;q=0"))
+        self.assertIsNone(middleware._negotiate("identity"))
+
+    def test_wildcard_accepts_what_we_offer(self):
+        self.assertIsNotNone(middleware._negotiate("*"))
+
+    @unittest.skipIf(middleware.brotli is None, "brotli is not installed")
+    def test_brotli_wins_ties_and_loses_to_a_higher_q(self):
+        self.assertEqual(middleware._negotiate("gzip, br"), "br")
+        self.assertEqual(middleware._negotiate("gzip, br;q=0.5"), "gzip")
+
+
+@override_settings(COMPRESSION_MIN_BYTES=1024, COMPRESSION_BROTLI_QUALITY=5)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def test_small_bodies_are_sent_as_they_are(self):
+        response = compress(HttpResponse(b"{}"), "gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_body_is_gzipped_and_its_etag_weakened(self):
+        response = HttpResponse(BODY, headers={"ETag": '"abc"'})
+        response = compress(response, "gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["ETag"], 'W/"abc"')
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(response.content), BODY)
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+
+    def test_already_encoded_responses_are_left_alone(self):
+        response = compress(HttpResponse(BODY, headers={"Content-Encoding": "br"}), "gzip")
+        self.assertEqual(response.content, BODY)
+
+    def test_streamed_response_is_one_gzip_member(self):
+        chunks = [line + b"\n" for line in BODY.splitlines()]
+        response = compress(StreamingHttpResponse(iter(chunks)), "gzip")
+        self.assertEqual(single_gzip_member(b"".join(response.streaming_content)), BODY)
+
+    def test_streamed_gzip_lines_decode_as_they_arrive(self):
+        chunks = [line + b"\n" for line in BODY.splitlines()]
+        response = compress(StreamingHttpResponse(iter(chunks)), "gzip")
+        parts = list(response.streaming_content)
+        decompressor = zlib.decompressobj(wbits=31)
+        # Everything but the trailer decodes to the line it was sent for
+        self.assertEqual([decompressor.decompress(part) for part in parts[:-1]], chunks)
+        self.assertEqual(single_gzip_member(b"".join(parts)), BODY)
+
+    def test_async_streamed_response_is_one_gzip_member(self):
+        async def chunks():
+            for line in BODY.splitlines():
+                yield line + b"\n"
+
+        response = compress(StreamingHttpResponse(chunks()), "gzip")
+
+        async def read():
+            return [chunk async for chunk in response.streaming_content]
+
+        parts = asyncio.run(read())
+        self.assertEqual(single_gzip_member(b"".join(parts)), BODY)
+        # Each line is flushed on its own so NDJSON consumers see it at once,
+        # without a gzip header and padding per line
+        self.assertGreater(len(parts), 100)
+        self.assertLess(sum(map(len, parts)), len(BODY) // 3)
+
+    @unittest.skipIf(middleware.brotli is None, "brotli is not installed")
+    def test_async_streamed_response_is_one_brotli_stream(self):
+        async def chunks():
+            for line in BODY.splitlines():
+                yield line + b"\n"
+
+        response = compress(StreamingHttpResponse(chunks()), "br")
+
+        async def read():
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        self.assertEqual(middleware.brotli.decompress(asyncio.run(read())), BODY)
@@ -0,0 +1,91 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from google.oauth2.credentials import Credentials
+
+from authapp import credentials as credentials_module
+from authapp.credentials import CredentialManager
+from authapp.models import GoogleCredentials
+from authapp.transport import AuthorizedTransport
+
+EMAIL = "a@example.com"
+
+
+def fake_refresh(calls):
+    def refresh(creds, request):
+        calls.append(creds.token)
+        # Slow enough for concurrent 401s to pile up behind the refresh lock
+        time.sleep(0.05)
+        creds.token = f"token-{len(calls) + 1}"
+        creds.expiry = datetime.utcnow() + timedelta(hours=1)
+    return refresh
+
+
+def response(status):
+    return mock.Mock(status_code=status, headers={}, reason="", content=b"{}")
+
+
+@override_settings(GOOGLE_TOKEN_REFRESH_INTERVAL=0, GOOGLE_CREDENTIAL_CACHE_SIZE=2)
+class CredentialRefreshTests(TransactionTestCase):
+    def setUp(self):
+        GoogleCredentials.objects.create(
+            email=EMAIL, access_token="token-1", refresh_token="refresh", token_uri="https://oauth2.example.com/token",
+            client_id="id", client_secret="secret", expiry=timezone.now() + timedelta(hours=1),
+        )
+        self.manager = CredentialManager()
+        patcher = mock.patch.object(credentials_module, "credential_manager", self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.refreshes = []
+        patcher = mock.patch.object(Credentials, "refresh", fake_refresh(self.refreshes))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unauthorized_response_refreshes_through_the_manager_and_stores_the_token(self):
+        creds = self.manager.get(EMAIL)
+        session = mock.Mock()
+        session.request.side_effect = [response(401), response(200)]
+        with mock.patch("authapp.transport.get_session", return_value=session):
+            info, _ = AuthorizedTransport(creds, EMAIL).request("https://www.googleapis.com/x")
+        self.assertEqual(info.status, 200)
+        self.assertEqual(self.refreshes, ["token-1"])
+        self.assertEqual(GoogleCredentials.objects.get().access_token, "token-2")
+
+    def test_concurrent_unauthorized_responses_refresh_once(self):
+        creds = self.manager.get(EMAIL)
+        rejected = set()
+
+        def send(method, uri, data=None, headers=None, timeout=None):
+            token = headers["authorization"].removeprefix("Bearer ")
+            if token == "token-1":
+                rejected.add(threading.get_ident())
+                time.sleep(0.01)
+                return response(401)
+            return response(200)
+
+        session = mock.Mock()
+        session.request.side_effect = send
+        statuses = []
+
+        def call():
+            info, _ = AuthorizedTransport(creds, EMAIL).request("https://www.googleapis.com/x")
+            statuses.append(info.status)
+
+        with mock.patch("authapp.transport.get_session", return_value=session):
+            threads = [threading.Thread(target=call) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(statuses, [200] * 5)
+        self.assertGreater(len(rejected), 1)
+        self.assertEqual(len(self.refreshes), 1)
+
+    def test_refresh_locks_of_evicted_users_are_forgotten(self):
+        for n in range(10):
+            self.manager._refresh_lock(f"user{n}@example.com")
+        self.assertLessEqual(len(self.manager._refresh_locks), 4)
@@ -0,0 +1,42 @@
+from django.test import TestCase, override_settings
+
+from authapp import metrics
+from authapp.models import RequestProfile
+
+SEARCH = "/auth/search/?email=a@example.com&q=standup"
+PROFILE = {"X-Profile-Request": "secret"}
+
+
+def queries_observed(route):
+    values = metrics.request_queries._values.get((route,))
+    return (values[1], sum(values[0])) if values else (0, 0)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"], PROFILE_TOKEN="secret", PROFILE_SAMPLE_RATE=0)
+class MiddlewareTests(TestCase):
+    def test_wsgi_request_is_profiled_with_its_queries(self):
+        self.client.get(SEARCH, headers=PROFILE)
+        profile = RequestProfile.objects.get()
+        self.assertEqual(profile.route, "auth/search/")
+        self.assertEqual(profile.trigger, RequestProfile.TRIGGER_HEADER)
+        self.assertGreater(profile.query_count, 0)
+        self.assertIn("function calls", profile.profile)
+
+    async def test_asgi_request_is_profiled_with_its_queries(self):
+        await self.async_client.get(SEARCH, headers=PROFILE)
+        profile = await RequestProfile.objects.aget()
+        self.assertEqual(profile.route, "auth/search/")
+        # The sync view ran in a worker thread; its queries are still attributed to it
+        self.assertGreater(profile.query_count, 0)
+        self.assertIn("function calls", profile.profile)
+
+    def test_requests_without_the_token_are_not_profiled(self):
+        self.client.get(SEARCH, headers={"X-Profile-Request": "wrong"})
+        self.assertFalse(RequestProfile.objects.exists())
+
+    async def test_asgi_requests_record_query_counts(self):
+        total_before, count_before = queries_observed("auth/search/")
+        await self.async_client.get(SEARCH)
+        total, count = queries_observed("auth/search/")
+        self.assertEqual(count, count_before + 1)
+        self.assertGreater(total, total_before)
@@ -0,0 +1,123 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from authapp import outbox
+from authapp.mirror import events_page
+from authapp.models import CalendarItem
+from authapp.sync import ingest_events, mirrored_events
+from authapp.throttle import RateLimitExceeded
+
+from .test_sync import event, resolve_primary
+from .test_throttle import http_error
+
+EVENT = {
+    "type": CalendarItem.TYPE_EVENT,
+    "title": "Planning",
+    "start_at": "2025-03-10T09:00:00",
+    "end_at": "2025-03-10T10:00:00",
+}
+
+
+@override_settings(OUTBOX_INPROCESS_WORKER=False, OUTBOX_MAX_ATTEMPTS=3)
+class OutboxTests(TestCase):
+    def setUp(self):
+        resolve_primary()
+
+    def enqueue(self, **data):
+        return outbox.enqueue_item("a@example.com", dict(EVENT, **data))
+
+    def test_enqueued_event_is_pending_with_a_client_chosen_id(self):
+        item = self.enqueue()
+        self.assertEqual(item.sync_status, CalendarItem.SYNC_PENDING)
+        self.assertEqual(item.metadata["id"], item.request_id)
+        self.assertEqual(item.google_calendar_id, "a@example.com")
+
+    def test_claim_leases_due_items_once(self):
+        due, later = self.enqueue(), self.enqueue()
+        CalendarItem.objects.filter(pk=later.pk).update(next_sync_at=timezone.now() + timedelta(hours=1))
+        self.assertEqual(outbox.claim_due_items(10), [due.pk])
+        self.assertEqual(outbox.claim_due_items(10), [])
+        due.refresh_from_db()
+        self.assertGreater(due.next_sync_at, timezone.now() + outbox.CLAIM_LEASE - timedelta(minutes=1))
+
+    def test_claim_takes_the_longest_waiting_first(self):
+        first, second = self.enqueue(), self.enqueue()
+        CalendarItem.objects.filter(pk=first.pk).update(next_sync_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(outbox.claim_due_items(1), [first.pk])
+
+    def assert_failure(self, error, retried):
+        item = self.enqueue()
+        outbox._record_failure(item, error)
+        item.refresh_from_db()
+        self.assertEqual(item.sync_attempts, 1)
+        self.assertEqual(item.sync_status, CalendarItem.SYNC_PENDING if retried else CalendarItem.SYNC_FAILED)
+        self.assertEqual(item.next_sync_at is not None, retried)
+
+    def test_server_errors_and_rate_limits_are_retried(self):
+        self.assert_failure(http_error(503), retried=True)
+        self.assert_failure(http_error(429), retried=True)
+        self.assert_failure(http_error(403, "userRateLimitExceeded"), retried=True)
+        self.assert_failure(RateLimitExceeded("slow down"), retried=True)
+        self.assert_failure(ConnectionError("reset"), retried=True)
+
+    def test_permission_and_payload_errors_fail_at_once(self):
+        self.assert_failure(http_error(403, "forbidden"), retried=False)
+        self.assert_failure(http_error(403, "insufficientPermissions"), retried=False)
+        self.assert_failure(http_error(400), retried=False)
+
+    def test_item_fails_after_the_last_attempt(self):
+        item = self.enqueue()
+        for _ in range(3):
+            outbox._record_failure(item, http_error(503))
+        item.refresh_from_db()
+        self.assertEqual((item.sync_status, item.sync_attempts), (CalendarItem.SYNC_FAILED, 3))
+
+    def test_items_google_does_not_hold_are_left_out_of_reads(self):
+        waiting, failed = self.enqueue(), self.enqueue()
+        outbox._record_failure(failed, http_error(400))
+        ingest_events(waiting.user, "a@example.com", [event("e1")], full=True)
+        self.assertEqual([e["id"] for e in events_page("a@example.com", "primary")[0]], ["e1"])
+        self.assertEqual([e["id"] for e in mirrored_events("a@example.com")], ["e1"])
+
+    @mock.patch("authapp.outbox.calendar_service")
+    @mock.patch("authapp.outbox.get_google_creds")
+    def test_pushed_item_takes_over_a_row_a_sync_mirrored_first(self, get_creds, service):
+        item = self.enqueue()
+        google_event = dict(item.metadata, etag='"1"', htmlLink="https://calendar.google.com/e")
+        CalendarItem.objects.create(
+            user=item.user, type=CalendarItem.TYPE_EVENT, title="Planning",
+            google_calendar_id="a@example.com", google_item_id=item.request_id, sync_status=CalendarItem.SYNC_SYNCED,
+        )
+        with mock.patch("authapp.outbox.execute", return_value=google_event):
+            outbox.push_item(item)
+        row = CalendarItem.objects.get()
+        self.assertEqual((row.pk, row.sync_status, row.google_item_id), (item.pk, CalendarItem.SYNC_SYNCED, item.request_id))
+
+    @mock.patch("authapp.outbox.calendar_service")
+    @mock.patch("authapp.outbox.get_google_creds")
+    def test_insert_that_already_went_through_is_fetched(self, get_creds, service):
+        item = self.enqueue()
+        with mock.patch("authapp.outbox.execute", side_effect=[http_error(409), dict(item.metadata)]) as execute:
+            outbox.push_item(item)
+        self.assertEqual(execute.call_count, 2)
+        service.return_value.events.return_value.get.assert_called_once_with(calendarId="a@example.com", eventId=item.request_id)
+
+
+@override_settings(OUTBOX_INPROCESS_WORKER=False, OUTBOX_WORKERS=2)
+class OutboxWorkerTests(TransactionTestCase):
+    # The worker pushes from pool threads, which only see committed rows
+    def test_worker_claims_items_left_over_from_before_a_restart(self):
+        resolve_primary()
+        waiting, leased, backing_off = (outbox.enqueue_item("a@example.com", EVENT) for _ in range(3))
+        # A lease taken by a worker that died, and a retry that is due by now
+        CalendarItem.objects.filter(pk=leased.pk).update(next_sync_at=timezone.now() - timedelta(seconds=1))
+        CalendarItem.objects.filter(pk=backing_off.pk).update(sync_attempts=2, next_sync_at=timezone.now() - timedelta(minutes=1))
+
+        with mock.patch("authapp.outbox.push_item") as push_item:
+            call_command("run_outbox_worker", "--once")
+        self.assertCountEqual([call.args[0].pk for call in push_item.call_args_list],
+                              [waiting.pk, leased.pk, backing_off.pk])
@@ -0,0 +1,71 @@
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest import mock
+from uuid import UUID
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import SimpleTestCase
+
+from authapp import payloads
+from authapp.payloads import FastJsonResponse, dumps, google_fields, parse_fields, project
+
+ITEMS = [
+    {"id": "e1", "summary": "Standup", "start": {"dateTime": "2025-03-10T09:00:00Z"}, "etag": '"1"'},
+    {"id": "e2", "start": {"date": "2025-03-11"}},
+]
+
+
+class FieldsTests(SimpleTestCase):
+    def test_fields_are_deduplicated_in_order(self):
+        self.assertEqual(parse_fields("id, summary,id,,start"), ("id", "summary", "start"))
+
+    def test_no_fields_means_whole_items(self):
+        self.assertIsNone(parse_fields(None))
+        self.assertIsNone(parse_fields(""))
+
+    def test_invalid_fields_are_rejected(self):
+        for value in ("id,items(summary)", "start.dateTime", ",", "1id"):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                parse_fields(value)
+
+    def test_too_many_fields_are_rejected(self):
+        with self.assertRaisesMessage(ValueError, "At most"):
+            parse_fields(",".join(f"f{n}" for n in range(payloads.MAX_FIELDS + 1)))
+
+    def test_projection_keeps_asked_and_kept_keys_that_exist(self):
+        self.assertEqual(project(ITEMS, ("summary", "id"), keep=("etag",)), [
+            {"summary": "Standup", "id": "e1", "etag": '"1"'},
+            {"id": "e2"},
+        ])
+        self.assertIs(project(ITEMS, None), ITEMS)
+
+    def test_google_selector_asks_for_the_page_keys_and_item_fields(self):
+        self.assertEqual(google_fields(("id", "summary")), "nextPageToken,items(id,summary)")
+        self.assertEqual(google_fields(("id",), ("nextPageToken", "nextSyncToken")),
+                         "nextPageToken,nextSyncToken,items(id)")
+        self.assertIsNone(google_fields(None))
+
+
+class DumpsTests(SimpleTestCase):
+    DATA = {
+        "moment": datetime(2025, 3, 10, 9, 0, 0, 123456, tzinfo=timezone.utc),
+        "day": date(2025, 3, 10),
+        "amount": Decimal("1.50"),
+        "uuid": UUID("12345678-1234-5678-1234-567812345678"),
+        "items": ITEMS,
+    }
+
+    def test_output_matches_the_standard_library_encoder(self):
+        self.assertEqual(json.loads(dumps(self.DATA)), json.loads(json.dumps(self.DATA, cls=DjangoJSONEncoder)))
+
+    def test_standard_library_is_used_without_orjson(self):
+        with mock.patch.object(payloads, "orjson", None):
+            body = dumps(self.DATA)
+        self.assertEqual(json.loads(body)["moment"], "2025-03-10T09:00:00.123Z")
+
+    def test_response_is_json(self):
+        response = FastJsonResponse({"events": ITEMS}, status=201)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.content), {"events": ITEMS})
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from authapp.models import CalendarItem
+from authapp.recurrence import expand_masters, series_end
+from authapp.sync import get_mirror_user, ingest_events
+
+from .test_sync import EMAIL, event
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class SeriesEndTests(SimpleTestCase):
+    def test_counted_series_ends_with_its_last_occurrence(self):
+        self.assertEqual(series_end(event("s", recurrence=["RRULE:FREQ=DAILY;COUNT=3"])), utc(2025, 3, 12, 9, 30))
+
+    def test_series_until_a_date_ends_then(self):
+        master = event("s", recurrence=["RRULE:FREQ=WEEKLY;UNTIL=20250331T235959Z"])
+        self.assertEqual(series_end(master), utc(2025, 3, 31, 9, 30))
+
+    def test_open_ended_series_never_ends(self):
+        self.assertIsNone(series_end(event("s", recurrence=["RRULE:FREQ=DAILY"])))
+
+    def test_all_day_series_ends_at_midnight_after_its_last_day(self):
+        master = {
+            "id": "s", "start": {"date": "2025-03-10"}, "end": {"date": "2025-03-11"},
+            "recurrence": ["RRULE:FREQ=DAILY;COUNT=2"],
+        }
+        self.assertEqual(series_end(master), utc(2025, 3, 12))
+
+
+class ExpandMastersTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_mirror_user(EMAIL)
+
+    def expand(self, time_min=None, time_max=None):
+        masters = CalendarItem.objects.filter(user=self.user, is_recurring=True)
+        return list(expand_masters(masters, time_min, time_max))
+
+    def test_occurrences_carry_instance_ids_and_times(self):
+        ingest_events(self.user, "primary", [event("s", recurrence=["RRULE:FREQ=DAILY;COUNT=2"])], full=True)
+        first, second = self.expand()
+        self.assertEqual((first.start_at, first.end_at), (utc(2025, 3, 10, 9), utc(2025, 3, 10, 9, 30)))
+        self.assertEqual(second.metadata["id"], "s_20250311T090000Z")
+        self.assertEqual(second.metadata["recurringEventId"], "s")
+        self.assertNotIn("recurrence", second.metadata)
+
+    def test_local_time_is_kept_across_a_dst_change(self):
+        master = event("s", recurrence=["RRULE:FREQ=WEEKLY;COUNT=2"])
+        master["start"] = {"dateTime": "2025-03-03T09:00:00", "timeZone": "America/New_York"}
+        master["end"] = {"dateTime": "2025-03-03T09:30:00", "timeZone": "America/New_York"}
+        ingest_events(self.user, "primary", [master], full=True)
+        self.assertEqual([o.start_at for o in self.expand()], [utc(2025, 3, 3, 14), utc(2025, 3, 10, 13)])
+
+    def test_moved_and_cancelled_occurrences_are_skipped(self):
+        ingest_events(self.user, "primary", [
+            event("s", recurrence=["RRULE:FREQ=DAILY;COUNT=3"]),
+            event("s_moved", hour=11, recurringEventId="s", originalStartTime={"dateTime": "2025-03-11T09:00:00Z"}),
+            {"id": "s_gone", "status": "cancelled", "recurringEventId": "s",
+             "originalStartTime": {"dateTime": "2025-03-12T09:00:00Z"}},
+        ], full=True)
+        self.assertEqual([o.start_at for o in self.expand()], [utc(2025, 3, 10, 9)])
+
+    def test_window_keeps_occurrences_overlapping_it(self):
+        ingest_events(self.user, "primary", [event("s", recurrence=["RRULE:FREQ=DAILY"])], full=True)
+        starts = [o.start_at for o in self.expand(utc(2025, 3, 11, 9, 15), utc(2025, 3, 13, 9))]
+        self.assertEqual(starts, [utc(2025, 3, 11, 9), utc(2025, 3, 12, 9)])
+
+    def test_series_are_merged_in_start_order(self):
+        ingest_events(self.user, "primary", [
+            event("late", hour=10, recurrence=["RRULE:FREQ=DAILY;COUNT=2"]),
+            event("early", hour=8, recurrence=["RRULE:FREQ=DAILY;COUNT=2"]),
+        ], full=True)
+        ids = [o.metadata["recurringEventId"] for o in self.expand()]
+        self.assertEqual(ids, ["early", "late", "early", "late"])
+
+    def test_open_window_is_consumed_lazily(self):
+        ingest_events(self.user, "primary", [event("s", recurrence=["RRULE:FREQ=DAILY"])], full=True)
+        occurrences = expand_masters(CalendarItem.objects.filter(is_recurring=True), time_max=None)
+        self.assertEqual(next(occurrences).start_at, utc(2025, 3, 10, 9))
+
+    def test_edited_series_is_expanded_again(self):
+        window = (utc(2025, 3, 10), utc(2025, 3, 20))
+        ingest_events(self.user, "primary", [event("s", recurrence=["RRULE:FREQ=DAILY;COUNT=2"])], full=True)
+        self.assertEqual(len(self.expand(*window)), 2)
+        ingest_events(self.user, "primary", [event("s", 2, recurrence=["RRULE:FREQ=DAILY;COUNT=4"])])
+        self.assertEqual(len(self.expand(*window)), 4)
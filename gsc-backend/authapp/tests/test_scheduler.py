@@ -0,0 +1,161 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from google.auth.exceptions import RefreshError
+
+from authapp import scheduler
+from authapp.models import GoogleCredentials, SyncSchedule, SyncState
+from authapp.sync import TASK_LISTS_STATE_ID, get_mirror_user
+
+
+def credentials(email):
+    return GoogleCredentials.objects.create(
+        email=email, access_token="token", refresh_token="refresh", token_uri="https://oauth2.example.com/token",
+        client_id="id", client_secret="secret", expiry=timezone.now() + timedelta(hours=1),
+    )
+
+
+@override_settings(
+    SCHEDULER_ACTIVE_INTERVAL=300, SCHEDULER_IDLE_INTERVAL=3600, SCHEDULER_DORMANT_INTERVAL=6 * 3600,
+    SCHEDULER_ACTIVE_WINDOW=24 * 3600, SCHEDULER_DORMANT_AFTER=30 * 24 * 3600, SCHEDULER_JITTER=0.2,
+    SCHEDULER_RESOURCES_PER_TURN=2, GOOGLE_WATCHED_MAX_STALENESS_SECONDS=3600,
+)
+class SchedulerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+
+    def schedule(self, email, due_in=timedelta(0), **fields):
+        return SyncSchedule.objects.create(credentials=credentials(email), next_sync_at=self.now + due_in, **fields)
+
+    def test_refresh_interval_follows_recent_activity(self):
+        synced = self.now - timedelta(hours=1)
+        cases = [
+            (None, 6 * 3600),
+            (self.now - timedelta(hours=1), 300),
+            (self.now - timedelta(days=3), 3600),
+            (self.now - timedelta(days=60), 6 * 3600),
+        ]
+        for last_active_at, interval in cases:
+            with self.subTest(last_active_at=last_active_at):
+                schedule = SyncSchedule(last_synced_at=synced, last_active_at=last_active_at)
+                self.assertEqual(scheduler.refresh_interval(schedule, self.now), interval)
+
+    def test_never_synced_account_is_refreshed_like_an_active_one(self):
+        self.assertEqual(scheduler.refresh_interval(SyncSchedule(), self.now), 300)
+
+    def test_mark_active_schedules_a_new_account_due_at_once(self):
+        credentials("new@example.com")
+        scheduler.mark_active("new@example.com")
+        schedule = SyncSchedule.objects.get()
+        self.assertLessEqual(schedule.next_sync_at, timezone.now())
+        self.assertIsNotNone(schedule.last_active_at)
+        self.assertEqual(scheduler.claim_due(1), [schedule.pk])
+
+    def test_mark_active_updates_at_most_once_per_resolution(self):
+        schedule = self.schedule("a@example.com", timedelta(hours=1))
+        scheduler.mark_active("a@example.com")
+        first = SyncSchedule.objects.get().last_active_at
+        scheduler.mark_active("a@example.com")
+        self.assertEqual(SyncSchedule.objects.get().last_active_at, first)
+        self.assertEqual(SyncSchedule.objects.get().next_sync_at, schedule.next_sync_at)
+
+    def test_mark_active_ignores_unknown_accounts(self):
+        scheduler.mark_active("nobody@example.com")
+        self.assertFalse(SyncSchedule.objects.exists())
+
+    def test_ensure_schedules_covers_every_account_once(self):
+        credentials("a@example.com")
+        credentials("b@example.com")
+        self.assertEqual(scheduler.ensure_schedules(), 2)
+        self.assertEqual(scheduler.ensure_schedules(), 0)
+        self.assertEqual(SyncSchedule.objects.count(), 2)
+
+    def test_claim_takes_due_accounts_and_leases_them(self):
+        due = self.schedule("due@example.com", -timedelta(minutes=1), last_synced_at=self.now)
+        self.schedule("later@example.com", timedelta(minutes=10), last_synced_at=self.now)
+        self.assertEqual(scheduler.claim_due(10), [due.pk])
+        self.assertEqual(scheduler.claim_due(10), [])
+        due.refresh_from_db()
+        self.assertGreater(due.next_sync_at, self.now + scheduler.CLAIM_LEASE - timedelta(minutes=1))
+
+    def test_claim_puts_active_accounts_ahead_of_slightly_older_idle_ones(self):
+        self.schedule("idle@example.com", -timedelta(minutes=5), last_synced_at=self.now)
+        active = self.schedule(
+            "active@example.com", -timedelta(minutes=1), last_synced_at=self.now, last_active_at=self.now,
+        )
+        self.assertEqual(scheduler.claim_due(1), [active.pk])
+
+    def test_claim_still_takes_long_overdue_idle_accounts_first(self):
+        idle = self.schedule("idle@example.com", -timedelta(hours=2), last_synced_at=self.now)
+        self.schedule("active@example.com", -timedelta(minutes=1), last_synced_at=self.now, last_active_at=self.now)
+        self.assertEqual(scheduler.claim_due(1), [idle.pk])
+
+    def test_claim_with_no_free_workers_takes_nothing(self):
+        self.schedule("due@example.com", -timedelta(minutes=1))
+        self.assertEqual(scheduler.claim_due(0), [])
+
+
+@override_settings(
+    SCHEDULER_ACTIVE_INTERVAL=300, SCHEDULER_IDLE_INTERVAL=3600, SCHEDULER_DORMANT_INTERVAL=6 * 3600,
+    SCHEDULER_ACTIVE_WINDOW=24 * 3600, SCHEDULER_DORMANT_AFTER=30 * 24 * 3600, SCHEDULER_JITTER=0.2,
+    SCHEDULER_RESOURCES_PER_TURN=2, GOOGLE_WATCHED_MAX_STALENESS_SECONDS=3600,
+)
+class SyncAccountTests(TestCase):
+    def setUp(self):
+        self.schedule = SyncSchedule.objects.create(
+            credentials=credentials("a@example.com"), next_sync_at=timezone.now(),
+        )
+        for target in ("sync_calendar", "sync_tasks", "fetch_user_calendars", "close_old_connections"):
+            patcher = mock.patch(f"authapp.scheduler.{target}")
+            setattr(self, target, patcher.start())
+            self.addCleanup(patcher.stop)
+        self.fetch_user_calendars.return_value = [{"id": "primary"}, {"id": "work"}, {"id": "team"}]
+
+    def test_turn_syncs_the_stalest_resources_and_requeues_the_rest(self):
+        user = get_mirror_user("a@example.com")
+        SyncState.objects.create(user=user, resource=SyncState.RESOURCE_CALENDAR, calendar_id="primary",
+                                 synced_at=timezone.now() - timedelta(hours=2))
+        scheduler.sync_account(self.schedule.pk)
+        # Never synced first: work and team; primary and the tasks wait for the next turn
+        self.assertEqual([call.args[1] for call in self.sync_calendar.call_args_list], ["work", "team"])
+        self.sync_tasks.assert_not_called()
+        self.schedule.refresh_from_db()
+        self.assertLessEqual(self.schedule.next_sync_at, timezone.now())
+
+    def test_account_synced_in_full_waits_its_interval(self):
+        user = get_mirror_user("a@example.com")
+        for calendar_id in ("primary", "work"):
+            SyncState.objects.create(user=user, resource=SyncState.RESOURCE_CALENDAR, calendar_id=calendar_id,
+                                     synced_at=timezone.now())
+        SyncState.objects.create(user=user, resource=SyncState.RESOURCE_TASKS, calendar_id=TASK_LISTS_STATE_ID,
+                                 synced_at=timezone.now())
+        scheduler.sync_account(self.schedule.pk)
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.failures, 0)
+        self.assertIsNotNone(self.schedule.last_synced_at)
+        # Never synced before this turn, so the next one is an active account's
+        self.assertGreater(self.schedule.next_sync_at, timezone.now() + timedelta(seconds=200))
+        self.assertLess(self.schedule.next_sync_at, timezone.now() + timedelta(seconds=400))
+
+    def test_failed_turn_backs_off(self):
+        self.sync_calendar.side_effect = RuntimeError("Google is down")
+        scheduler.sync_account(self.schedule.pk)
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.failures, 1)
+        self.assertIn("Google is down", self.schedule.last_error)
+        self.assertGreater(self.schedule.next_sync_at, timezone.now() + timedelta(seconds=50))
+
+    def test_revoked_access_parks_the_account(self):
+        self.sync_calendar.side_effect = RefreshError("invalid_grant")
+        scheduler.sync_account(self.schedule.pk)
+        self.schedule.refresh_from_db()
+        self.assertGreater(self.schedule.next_sync_at, timezone.now() + timedelta(hours=2))
+
+    def test_disconnected_account_is_skipped(self):
+        self.schedule.delete()
+        scheduler.sync_account(self.schedule.pk)
+        self.fetch_user_calendars.assert_not_called()
@@ -0,0 +1,82 @@
+import json
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from authapp import search
+from authapp.search import search_items
+from authapp.sync import get_mirror_user, ingest_events
+
+from .test_sync import EMAIL, event
+
+
+class SearchItemsTests(TestCase):
+    def setUp(self):
+        self.user = get_mirror_user(EMAIL)
+        ingest_events(self.user, "primary", [
+            event("budget", hour=9),
+            event("standup", hour=10, description="budget numbers for the quarter"),
+            event("launch", hour=11, location="Board Room", attendees=[{"email": "carol@example.com"}]),
+            event("retro", hour=12),
+        ], full=True)
+
+    def ids(self, query, **filters):
+        return [item.google_item_id for item in search_items(self.user.id, query, **filters)]
+
+    def test_title_hits_outrank_description_hits(self):
+        self.assertEqual(self.ids("budget"), ["budget", "standup"])
+
+    def test_every_word_must_match_as_a_prefix(self):
+        self.assertEqual(self.ids("bud quar"), ["standup"])
+        self.assertEqual(self.ids("board car"), ["launch"])
+        self.assertEqual(self.ids("budget launch"), [])
+
+    def test_punctuation_is_not_query_syntax(self):
+        self.assertEqual(self.ids('"budget" AND (NEAR*'), [])
+        self.assertEqual(self.ids('budget"'), ["budget", "standup"])
+        self.assertEqual(self.ids("  "), [])
+
+    def test_date_window_and_limit(self):
+        window = {
+            "time_min": datetime(2025, 3, 10, 10, 15, tzinfo=timezone.utc),
+            "time_max": datetime(2025, 3, 10, 12, tzinfo=timezone.utc),
+        }
+        self.assertEqual(sorted(self.ids("v1", **window)), ["launch", "standup"])
+        self.assertEqual(len(self.ids("v1", limit=2)), 2)
+
+    def test_other_users_rows_are_not_searched(self):
+        self.assertEqual(search_items(get_mirror_user("b@example.com").id, "budget"), [])
+
+    def test_broad_query_lists_the_latest_hits_unranked(self):
+        with mock.patch.object(search, "BROAD_MATCHES", 2):
+            items = search_items(self.user.id, "v1", limit=3)
+        self.assertEqual([item.google_item_id for item in items], ["retro", "launch", "standup"])
+        self.assertEqual({item.rank for item in items}, {None})
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class SearchViewTests(TestCase):
+    def setUp(self):
+        ingest_events(get_mirror_user(EMAIL), "primary", [event("budget")], full=True)
+
+    def get(self, query, **params):
+        return self.client.get("/auth/search/", {"email": EMAIL, "q": query, **params})
+
+    def test_results_carry_the_projected_google_item(self):
+        response = self.get("budg", fields="id,summary")
+        self.assertEqual(response.status_code, 200)
+        result, = json.loads(response.content)["results"]
+        self.assertEqual(result["google_item_id"], "budget")
+        self.assertEqual(result["item"], {"id": "budget", "summary": "budget v1"})
+
+    def test_query_too_big_to_search_is_a_400(self):
+        for query in ("x" * (search.MAX_QUERY_LENGTH + 1), " ".join(["budget"] * (search.MAX_TERMS + 1))):
+            with self.subTest(length=len(query)):
+                response = self.get(query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("Search query must be at most", json.loads(response.content)["error"])
+
+    def test_unknown_user_gets_no_results(self):
+        response = self.client.get("/auth/search/", {"email": "nobody@example.com", "q": "budget"})
+        self.assertEqual(json.loads(response.content), {"results": []})
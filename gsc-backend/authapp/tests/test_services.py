@@ -0,0 +1,54 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from google.oauth2.credentials import Credentials
+
+from authapp import services
+from authapp.services import calendar_service, clear_service_cache, get_discovery_document, tasks_service
+
+
+def credentials():
+    return Credentials("token", refresh_token="refresh", token_uri="https://oauth2.example.com/token",
+                       client_id="id", client_secret="secret")
+
+
+@override_settings(GOOGLE_SERVICE_CACHE_SIZE=2, GOOGLE_SERVICE_CACHE_TTL=3600, GOOGLE_API_ROOT_URL="")
+class ServiceCacheTests(SimpleTestCase):
+    def setUp(self):
+        clear_service_cache()
+        self.addCleanup(clear_service_cache)
+        self.creds = credentials()
+
+    def test_service_is_built_once_per_user_and_api(self):
+        service = calendar_service(self.creds, "a@example.com")
+        self.assertIs(calendar_service(self.creds, "a@example.com"), service)
+        self.assertIsNot(tasks_service(self.creds, "a@example.com"), service)
+        self.assertIsNot(calendar_service(credentials(), "b@example.com"), service)
+
+    def test_service_is_rebuilt_for_new_credentials(self):
+        service = calendar_service(self.creds, "a@example.com")
+        # The user authorized again: the old service would keep sending the old token
+        self.assertIsNot(calendar_service(credentials(), "a@example.com"), service)
+
+    def test_service_is_rebuilt_once_its_ttl_is_up(self):
+        with mock.patch("authapp.services.time.monotonic", return_value=1000.0):
+            service = calendar_service(self.creds, "a@example.com")
+        with mock.patch("authapp.services.time.monotonic", return_value=1000.0 + 3601):
+            self.assertIsNot(calendar_service(self.creds, "a@example.com"), service)
+
+    def test_least_recently_used_services_are_dropped_past_the_size(self):
+        first = calendar_service(self.creds, "a@example.com")
+        calendar_service(self.creds, "b@example.com")
+        calendar_service(self.creds, "a@example.com")
+        calendar_service(self.creds, "c@example.com")
+        self.assertEqual(len(services._services), 2)
+        self.assertIs(calendar_service(self.creds, "a@example.com"), first)
+        self.assertNotIn(("calendar", "v3", "b@example.com"), services._services)
+
+    def test_services_share_one_discovery_document(self):
+        with mock.patch("authapp.services._load_document", wraps=services._load_document) as load:
+            services._documents.pop(("tasks", "v1"), None)
+            tasks_service(self.creds, "a@example.com")
+            tasks_service(credentials(), "b@example.com")
+        load.assert_called_once_with("tasks", "v1")
+        self.assertIn("tasks", get_discovery_document("tasks", "v1")["resources"])
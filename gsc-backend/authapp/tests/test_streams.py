@@ -0,0 +1,65 @@
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+
+def fake_list(total):
+    """execute() stand-in serving total items in pages of maxResults, tokens being offsets."""
+    def execute(params, email=None):
+        start = int(params.get("pageToken") or 0)
+        end = min(total, start + params["maxResults"])
+        page = {"items": [{"id": f"i{n}", "summary": "s", "etag": "e"} for n in range(start, end)]}
+        if end < total:
+            page["nextPageToken"] = str(end)
+        return page
+    return execute
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class StreamTests(SimpleTestCase):
+    def setUp(self):
+        patchers = {name: mock.patch(f"authapp.google_helpers.{name}") for name in (
+            "get_google_creds", "calendar_service", "tasks_service",
+        )}
+        services = {name: patcher.start() for name, patcher in patchers.items()}
+        for patcher in patchers.values():
+            self.addCleanup(patcher.stop)
+        # list() hands its parameters to the faked execute() as the request
+        services["calendar_service"].return_value.events.return_value.list.side_effect = lambda **params: params
+        services["tasks_service"].return_value.tasks.return_value.list.side_effect = lambda **params: params
+
+    def stream(self, path, total):
+        with mock.patch("authapp.google_helpers.execute", side_effect=fake_list(total)):
+            response = self.client.get(path)
+            lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        return lines[:-1], lines[-1]
+
+    def test_limit_smaller_than_a_page_is_honoured(self):
+        items, tail = self.stream("/auth/events/stream?email=a@example.com&limit=10", 1000)
+        self.assertEqual([line["event"]["id"] for line in items], [f"i{n}" for n in range(10)])
+        self.assertEqual(tail, {"next_cursor": "10"})
+
+    def test_limit_across_pages_stops_at_the_limit(self):
+        items, tail = self.stream("/auth/events/stream?email=a@example.com&limit=300", 1000)
+        self.assertEqual(len(items), 300)
+        self.assertEqual(tail, {"next_cursor": "300"})
+
+    def test_cursor_resumes_after_the_last_item_sent(self):
+        items, tail = self.stream("/auth/events/stream?email=a@example.com&limit=5&cursor=10", 12)
+        self.assertEqual([line["event"]["id"] for line in items], [f"i{n}" for n in range(10, 12)])
+        self.assertEqual(tail, {"next_cursor": None})
+
+    def test_without_a_limit_every_page_is_sent(self):
+        items, tail = self.stream("/auth/events/stream?email=a@example.com&fields=id", 600)
+        self.assertEqual(len(items), 600)
+        self.assertEqual(items[0], {"event": {"id": "i0"}})
+        self.assertEqual(tail, {"next_cursor": None})
+
+    def test_task_stream_honours_the_limit(self):
+        items, tail = self.stream("/auth/tasks/stream?email=a@example.com&limit=3", 500)
+        self.assertEqual(len(items), 3)
+        self.assertEqual(tail, {"next_cursor": "3"})
+
+    def test_invalid_limit_is_rejected(self):
+        self.assertEqual(self.client.get("/auth/events/stream?email=a@example.com&limit=ten").status_code, 400)
@@ -0,0 +1,193 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+
+from authapp.caching import cache_key
+from authapp.mirror import events_for_calendars, events_page
+from authapp.models import CalendarItem, SyncState
+from authapp.sync import get_mirror_user, ingest_events, ingest_tasks, mirror_task, mirrored_events, sync_calendar
+
+EMAIL = "a@example.com"
+
+
+def resolve_primary(email=EMAIL, calendar_id=EMAIL):
+    # Has the "primary" alias resolve to calendar_id without asking Google for the calendar list
+    cache.set(cache_key("primary_calendar", email), calendar_id, None)
+
+
+def event(event_id, version=1, hour=9, **extra):
+    return {
+        "id": event_id,
+        "etag": f'"{version}"',
+        "status": "confirmed",
+        "summary": f"{event_id} v{version}",
+        "start": {"dateTime": f"2025-03-10T{hour:02d}:00:00Z"},
+        "end": {"dateTime": f"2025-03-10T{hour:02d}:30:00Z"},
+        **extra,
+    }
+
+
+def task(task_id, version=1, tasklist=None, **extra):
+    item = {"id": task_id, "etag": f'"{version}"', "title": f"{task_id} v{version}", **extra}
+    if tasklist:
+        item["selfLink"] = f"https://www.googleapis.com/tasks/v1/lists/{tasklist}/tasks/{task_id}"
+    return item
+
+
+class IngestEventsTests(TestCase):
+    def setUp(self):
+        self.user = get_mirror_user(EMAIL)
+
+    def rows(self, calendar_id="primary"):
+        return dict(
+            CalendarItem.objects.filter(user=self.user, google_calendar_id=calendar_id)
+            .values_list("google_item_id", "title")
+        )
+
+    def test_full_sync_writes_only_what_changed(self):
+        self.assertEqual(ingest_events(self.user, "primary", [event("e1"), event("e2")], full=True), (2, 0))
+        self.assertEqual(ingest_events(self.user, "primary", [event("e1"), event("e2")], full=True), (0, 0))
+        self.assertEqual(ingest_events(self.user, "primary", [event("e1", 2), event("e2")], full=True), (1, 0))
+        self.assertEqual(self.rows(), {"e1": "e1 v2", "e2": "e2 v1"})
+
+    def test_full_sync_removes_events_missing_from_google(self):
+        ingest_events(self.user, "primary", [event("e1"), event("e2")], full=True)
+        ingest_events(self.user, "other", [event("e3")], full=True)
+        self.assertEqual(ingest_events(self.user, "primary", [event("e2")], full=True), (0, 1))
+        self.assertEqual(self.rows(), {"e2": "e2 v1"})
+        self.assertEqual(self.rows("other"), {"e3": "e3 v1"})
+
+    def test_incremental_changes_update_and_cancel(self):
+        ingest_events(self.user, "primary", [event("e1"), event("e2")], full=True)
+        changes = [event("e1", 2), {"id": "e2", "status": "cancelled"}, event("e3")]
+        self.assertEqual(ingest_events(self.user, "primary", changes), (2, 1))
+        self.assertEqual(self.rows(), {"e1": "e1 v2", "e3": "e3 v1"})
+
+    def test_later_copy_of_an_event_wins(self):
+        ingest_events(self.user, "primary", [event("e1", 1), event("e1", 2)])
+        self.assertEqual(self.rows(), {"e1": "e1 v2"})
+
+    def test_cancelling_a_series_removes_its_exceptions(self):
+        master = event("s1", recurrence=["RRULE:FREQ=DAILY;COUNT=3"])
+        moved = event("s1_20250311", hour=11, recurringEventId="s1", originalStartTime={"dateTime": "2025-03-11T09:00:00Z"})
+        ingest_events(self.user, "primary", [master, moved], full=True)
+        ingest_events(self.user, "primary", [{"id": "s1", "status": "cancelled"}])
+        self.assertEqual(self.rows(), {})
+
+    def test_write_paths_upsert_events_mirrored_by_a_sync(self):
+        ingest_events(self.user, "primary", [event("e1")], full=True)
+        ingest_events(self.user, "primary", [event("e1", 2)])
+        self.assertEqual(CalendarItem.objects.filter(google_item_id="e1").count(), 1)
+
+    def test_mirrored_events_are_ordered_by_start(self):
+        resolve_primary()
+        ingest_events(self.user, EMAIL, [event("late", hour=15), event("early", hour=8)], full=True)
+        self.assertEqual([item["id"] for item in mirrored_events(EMAIL)], ["early", "late"])
+
+
+class IngestTasksTests(TestCase):
+    def setUp(self):
+        self.user = get_mirror_user(EMAIL)
+
+    def rows(self):
+        return list(
+            CalendarItem.objects.filter(user=self.user, type=CalendarItem.TYPE_TASK)
+            .order_by("google_item_id").values_list("google_item_id", "google_calendar_id", "title")
+        )
+
+    def test_task_without_a_list_is_updated_in_place(self):
+        mirror_task(EMAIL, task("t1", 1))
+        mirror_task(EMAIL, task("t1", 2))
+        self.assertEqual(self.rows(), [("t1", None, "t1 v2")])
+
+    def test_task_without_a_list_keeps_the_list_it_is_mirrored_in(self):
+        ingest_tasks(self.user, "L1", [task("t1", 1, "L1")], full=True)
+        mirror_task(EMAIL, task("t1", 2))
+        self.assertEqual(self.rows(), [("t1", "L1", "t1 v2")])
+
+    def test_task_moved_to_another_list_moves_its_row(self):
+        ingest_tasks(self.user, "L1", [task("t1", 1, "L1")], full=True)
+        self.assertEqual(ingest_tasks(self.user, "L2", [task("t1", 1, "L2")], full=True), (1, 0))
+        self.assertEqual(self.rows(), [("t1", "L2", "t1 v1")])
+
+    def test_full_sync_of_a_list_removes_tasks_gone_from_it(self):
+        ingest_tasks(self.user, "L1", [task("t1", tasklist="L1"), task("t2", tasklist="L1")], full=True)
+        ingest_tasks(self.user, "L1", [task("t2", tasklist="L1"), task("t3", deleted=True)], full=True)
+        self.assertEqual(self.rows(), [("t2", "L1", "t2 v1")])
+
+
+class SyncCalendarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patches = [
+            mock.patch("authapp.sync.get_valid_credentials"),
+            mock.patch("authapp.sync.calendar_service"),
+            mock.patch("authapp.sync.calendar_list", return_value={"items": [
+                {"id": "team@group.calendar.google.com"},
+                {"id": EMAIL, "primary": True},
+            ]}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    @mock.patch("authapp.sync.list_event_changes")
+    def test_primary_alias_shares_the_state_of_the_calendar_it_names(self, list_changes):
+        list_changes.return_value = ([event("e1")], "token-1")
+        sync_calendar(EMAIL, "primary")
+        self.assertEqual(list_changes.call_args.args[1], EMAIL)
+        sync_calendar(EMAIL, EMAIL)
+        self.assertEqual(list_changes.call_args.args[2], "token-1")
+        self.assertEqual(list(SyncState.objects.values_list("calendar_id", flat=True)), [EMAIL])
+        self.assertEqual(list(CalendarItem.objects.values_list("google_calendar_id", flat=True)), [EMAIL])
+
+    @mock.patch("authapp.sync.list_event_changes")
+    def test_first_sync_is_full_and_keeps_the_token(self, list_changes):
+        list_changes.return_value = ([event("e1")], "token-1")
+        result = sync_calendar(EMAIL)
+        self.assertTrue(result["full"])
+        self.assertEqual(result["updated"], 1)
+        self.assertEqual(SyncState.objects.get().sync_token, "token-1")
+        self.assertIsNone(list_changes.call_args.args[2])
+
+    @mock.patch("authapp.sync.list_event_changes")
+    def test_next_sync_resumes_from_the_token(self, list_changes):
+        list_changes.return_value = ([event("e1")], "token-1")
+        sync_calendar(EMAIL)
+        list_changes.return_value = ([event("e1", 2)], "token-2")
+        result = sync_calendar(EMAIL)
+        self.assertFalse(result["full"])
+        self.assertEqual(list_changes.call_args.args[2], "token-1")
+        self.assertEqual(SyncState.objects.get().sync_token, "token-2")
+
+    @mock.patch("authapp.sync.list_event_changes")
+    def test_expired_token_falls_back_to_a_full_sync(self, list_changes):
+        list_changes.return_value = ([event("e1"), event("e2")], "token-1")
+        sync_calendar(EMAIL)
+        gone = HttpError(Response({"status": 410}), b"")
+        list_changes.side_effect = [gone, ([event("e2")], "token-2")]
+        result = sync_calendar(EMAIL)
+        self.assertEqual((result["full"], result["deleted"]), (True, 1))
+        self.assertEqual(list(CalendarItem.objects.values_list("google_item_id", flat=True)), ["e2"])
+
+
+class PrimaryAliasReadTests(TransactionTestCase):
+    # events_for_calendars reads from pool threads, which only see committed rows
+    def setUp(self):
+        resolve_primary()
+        ingest_events(get_mirror_user(EMAIL), EMAIL, [event("e1")], full=True)
+        patcher = mock.patch("authapp.mirror.ensure_fresh", return_value=(timezone.now(), False))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_calendar_asked_for_by_alias_and_id_is_read_once(self):
+        events, calendars = events_for_calendars(EMAIL, ["primary", EMAIL])
+        self.assertEqual([(e["id"], e["calendarId"]) for e in events], [("e1", "primary")])
+        self.assertEqual(list(calendars), ["primary"])
+
+    def test_page_read_by_alias_is_the_real_calendar(self):
+        self.assertEqual([e["id"] for e in events_page(EMAIL, "primary")[0]], ["e1"])
@@ -0,0 +1,131 @@
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+
+from authapp import throttle
+from authapp.google_helpers import execute_batch
+
+
+def http_error(status, reason=None):
+    content = json.dumps({"error": {"errors": [{"reason": reason}]}}).encode() if reason else b""
+    return HttpError(Response({"status": status}), content)
+
+
+class FakeRequest:
+    methodId = "calendar.events.insert"
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append(request_id)
+
+    def execute(self):
+        self.service.batch_sizes.append(len(self.requests))
+        for request_id in self.requests:
+            error = self.service.errors.pop(request_id, None)
+            self.callback(request_id, None if error else {"id": request_id}, error)
+
+
+class FakeService:
+    def __init__(self, errors=None):
+        self.batch_sizes = []
+        self.errors = errors or {}
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+def reset_buckets():
+    throttle._project_bucket = None
+    throttle._user_buckets.clear()
+
+
+@override_settings(
+    GOOGLE_USER_QPS=10, GOOGLE_USER_BURST=20, GOOGLE_PROJECT_QPS=100,
+    GOOGLE_THROTTLE_MAX_WAIT=10, GOOGLE_RATE_LIMIT_RETRIES=2, GOOGLE_BACKOFF_BASE=0, GOOGLE_BACKOFF_MAX=0,
+)
+class ThrottleTests(SimpleTestCase):
+    def setUp(self):
+        reset_buckets()
+        self.addCleanup(reset_buckets)
+
+    def test_bucket_refills_at_its_rate(self):
+        bucket = throttle.TokenBucket(rate=10, capacity=2)
+        self.assertEqual(bucket.take(2), 0)
+        self.assertAlmostEqual(bucket.take(1), 0.1, places=2)
+
+    def test_acquire_rejects_more_than_a_bucket_holds(self):
+        self.assertEqual(throttle.max_count("a@example.com"), 20)
+        with self.assertRaises(ValueError):
+            throttle.acquire("a@example.com", 21)
+
+    @override_settings(GOOGLE_THROTTLE_MAX_WAIT=0)
+    def test_acquire_raises_once_the_wait_passes_the_deadline(self):
+        throttle.acquire("a@example.com", 20)
+        with self.assertRaises(throttle.RateLimitExceeded) as raised:
+            throttle.acquire("a@example.com")
+        self.assertGreater(raised.exception.retry_after, 0)
+
+    def test_failed_acquire_gives_back_the_user_tokens(self):
+        throttle.acquire(None, 100)
+        with override_settings(GOOGLE_THROTTLE_MAX_WAIT=0), self.assertRaises(throttle.RateLimitExceeded):
+            throttle.acquire("a@example.com", 5)
+        self.assertEqual(throttle._user_buckets["a@example.com"].tokens, 20)
+
+    def test_only_rate_limit_reasons_count_as_rate_limited(self):
+        self.assertTrue(throttle.is_rate_limit_error(http_error(429)))
+        self.assertTrue(throttle.is_rate_limit_error(http_error(403, "userRateLimitExceeded")))
+        self.assertFalse(throttle.is_rate_limit_error(http_error(403, "forbidden")))
+        self.assertFalse(throttle.is_rate_limit_error(http_error(403, "dailyLimitExceeded")))
+
+    def test_execute_retries_rate_limited_calls(self):
+        request = mock.Mock(methodId="calendar.events.get")
+        request.execute.side_effect = [http_error(429), {"id": "e1"}]
+        self.assertEqual(throttle.execute(request, "a@example.com"), {"id": "e1"})
+        self.assertEqual(request.execute.call_count, 2)
+
+    def test_execute_gives_up_after_the_retries(self):
+        request = mock.Mock(methodId="calendar.events.get")
+        request.execute.side_effect = http_error(403, "rateLimitExceeded")
+        with self.assertRaises(throttle.RateLimitExceeded):
+            throttle.execute(request, "a@example.com")
+        self.assertEqual(request.execute.call_count, 3)
+
+    @override_settings(GOOGLE_RATE_LIMIT_MAX_WAIT=5)
+    def test_execute_does_not_wait_past_its_budget(self):
+        request = mock.Mock(methodId="calendar.events.get")
+        request.execute.side_effect = HttpError(Response({"status": 429, "retry-after": "30"}), b"")
+        with mock.patch("authapp.throttle.time.sleep") as sleep, self.assertRaises(throttle.RateLimitExceeded) as raised:
+            throttle.execute(request, "a@example.com")
+        sleep.assert_not_called()
+        self.assertEqual(throttle.retry_headers(raised.exception), {"Retry-After": "30"})
+
+    def test_retry_after_is_whole_seconds_and_only_for_rate_limits(self):
+        self.assertEqual(throttle.retry_headers(throttle.RateLimitExceeded("slow down", retry_after=0.2)), {"Retry-After": "1"})
+        self.assertEqual(throttle.retry_headers(throttle.RateLimitExceeded("slow down")), {})
+        self.assertEqual(throttle.retry_headers(ValueError("bad")), {})
+
+    @override_settings(GOOGLE_USER_QPS=200)
+    def test_batch_of_50_is_split_to_the_user_burst(self):
+        service = FakeService()
+        delayed = throttle.stats["delayed_locally"]
+        results = execute_batch(service, [FakeRequest()] * 50, "a@example.com")
+        self.assertEqual(service.batch_sizes, [20, 20, 10])
+        self.assertEqual([response["id"] for response, _ in results], [str(i) for i in range(50)])
+        # The later chunks waited for the bucket to refill rather than failing
+        self.assertGreater(throttle.stats["delayed_locally"], delayed)
+
+    def test_batch_resends_only_rate_limited_calls(self):
+        service = FakeService(errors={"3": http_error(429), "7": http_error(403, "forbidden")})
+        results = execute_batch(service, [FakeRequest()] * 10, "a@example.com")
+        self.assertEqual(service.batch_sizes, [10, 1])
+        self.assertEqual(results[3], ({"id": "3"}, None))
+        self.assertEqual(results[7][1].resp.status, 403)
@@ -0,0 +1,81 @@
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+from google.oauth2.credentials import Credentials
+
+from authapp import transport
+from authapp.transport import AuthorizedTransport, get_session
+
+EMAIL = "a@example.com"
+
+
+def response(status, content=b"{}", headers=None):
+    return mock.Mock(status_code=status, headers=headers or {}, reason="Reason", content=content)
+
+
+class AuthorizedTransportTests(SimpleTestCase):
+    def setUp(self):
+        self.creds = Credentials("token-1", refresh_token="refresh", token_uri="https://oauth2.example.com/token",
+                                 client_id="id", client_secret="secret")
+        self.session = mock.Mock()
+        patcher = mock.patch("authapp.transport.get_session", return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, creds=None):
+        return AuthorizedTransport(creds or self.creds, EMAIL).request("https://www.googleapis.com/x", "POST", b"{}")
+
+    def test_response_is_handed_over_the_way_httplib2_would(self):
+        self.session.request.return_value = response(200, b'{"ok": true}', {
+            "Content-Type": "application/json", "Content-Encoding": "gzip", "ETag": '"1"',
+        })
+        info, content = self.request()
+        self.assertEqual(info.status, 200)
+        self.assertEqual(info["etag"], '"1"')
+        # requests already decoded the body
+        self.assertNotIn("content-encoding", info)
+        self.assertEqual(content, b'{"ok": true}')
+
+    def test_requests_carry_the_bearer_token(self):
+        self.session.request.return_value = response(200)
+        self.request()
+        headers = self.session.request.call_args.kwargs["headers"]
+        self.assertEqual(headers["authorization"], "Bearer token-1")
+
+    @mock.patch("authapp.credentials.credential_manager")
+    def test_unauthorized_request_is_sent_again_after_one_refresh(self, manager):
+        def refresh(email, creds, trigger, rejected_token):
+            creds.token = "token-2"
+        manager.refresh.side_effect = refresh
+        self.session.request.side_effect = [response(401), response(200)]
+
+        info, _ = self.request()
+        self.assertEqual(info.status, 200)
+        manager.refresh.assert_called_once_with(EMAIL, self.creds, trigger="unauthorized", rejected_token="token-1")
+        self.assertEqual(self.session.request.call_args.kwargs["headers"]["authorization"], "Bearer token-2")
+
+    @mock.patch("authapp.credentials.credential_manager")
+    def test_unauthorized_request_without_a_refresh_token_is_returned(self, manager):
+        self.session.request.return_value = response(401)
+        creds = Credentials("token-1")
+        info, _ = self.request(creds)
+        self.assertEqual(info.status, 401)
+        manager.refresh.assert_not_called()
+
+    @mock.patch("authapp.transport.metrics.record_google_call")
+    def test_network_errors_are_recorded_and_raised(self, record):
+        self.session.request.side_effect = requests.ConnectionError("reset")
+        with self.assertRaises(requests.ConnectionError):
+            self.request()
+        self.assertEqual(record.call_args.args[1], "ConnectionError")
+
+
+class SessionTests(SimpleTestCase):
+    def test_one_pooled_session_is_shared(self):
+        self.addCleanup(setattr, transport, "_session", transport._session)
+        transport._session = None
+        session = get_session()
+        self.assertIs(get_session(), session)
+        self.assertEqual(session.get_adapter("https://www.googleapis.com").max_retries.status_forcelist,
+                         (500, 502, 503, 504))
@@ -0,0 +1,86 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from authapp import watch
+from authapp.models import WatchChannel
+from authapp.sync import get_mirror_user
+
+EMAIL = "a@example.com"
+
+
+@override_settings(GOOGLE_WATCH_RENEW_MARGIN=24 * 3600, GOOGLE_WEBHOOK_URL="https://example.com/auth/events/webhook")
+class RenewChannelsTests(TestCase):
+    def setUp(self):
+        self.user = get_mirror_user(EMAIL)
+        patcher = mock.patch("authapp.watch.register_channel", side_effect=self.register)
+        self.register_channel = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("authapp.watch.stop_channel", side_effect=lambda channel: channel.delete())
+        self.stop_channel = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def register(self, email, calendar_id):
+        return self.channel(calendar_id, timedelta(days=7))
+
+    def channel(self, calendar_id, expires_in):
+        return WatchChannel.objects.create(
+            user=self.user, calendar_id=calendar_id, channel_id=f"{calendar_id}-{expires_in}",
+            resource_id="r", token="t", expiration=timezone.now() + expires_in,
+        )
+
+    def live(self):
+        return sorted(WatchChannel.objects.values_list("calendar_id", flat=True))
+
+    def test_expiring_channel_is_replaced_and_stopped(self):
+        old = self.channel("primary", timedelta(hours=2))
+        self.assertEqual(watch.renew_expiring_channels(), 1)
+        self.assertEqual([call.args[0].channel_id for call in self.stop_channel.call_args_list], [old.channel_id])
+        self.assertEqual(self.live(), ["primary"])
+        self.assertFalse(WatchChannel.objects.filter(channel_id=old.channel_id).exists())
+
+    def test_channels_far_from_expiry_are_left_alone(self):
+        self.channel("primary", timedelta(days=5))
+        self.assertEqual(watch.renew_expiring_channels(), 0)
+        self.register_channel.assert_not_called()
+
+    def test_expired_channel_is_replaced_and_deleted_without_stopping(self):
+        self.channel("primary", -timedelta(hours=1))
+        self.assertEqual(watch.renew_expiring_channels(), 1)
+        self.stop_channel.assert_not_called()
+        self.assertGreater(WatchChannel.objects.get().expiration, timezone.now())
+
+    def test_expired_channel_is_deleted_even_when_it_cannot_be_replaced(self):
+        self.channel("primary", -timedelta(hours=1))
+        self.register_channel.side_effect = RuntimeError("revoked")
+        self.assertEqual(watch.renew_expiring_channels(), 0)
+        self.assertEqual(self.live(), [])
+
+    def test_expiring_channel_is_kept_when_it_cannot_be_replaced_yet(self):
+        self.channel("primary", timedelta(hours=2))
+        self.register_channel.side_effect = RuntimeError("Google is down")
+        self.assertEqual(watch.renew_expiring_channels(), 0)
+        self.assertEqual(self.live(), ["primary"])
+
+    def test_calendar_already_covered_is_not_registered_again(self):
+        self.channel("primary", timedelta(hours=2))
+        self.channel("primary", timedelta(days=6))
+        self.assertEqual(watch.renew_expiring_channels(), 0)
+        self.register_channel.assert_not_called()
+        self.assertEqual(WatchChannel.objects.count(), 1)
+
+    def test_duplicate_expiring_channels_are_replaced_once(self):
+        self.channel("primary", timedelta(hours=1))
+        self.channel("primary", timedelta(hours=2))
+        self.assertEqual(watch.renew_expiring_channels(), 1)
+        self.assertEqual(WatchChannel.objects.count(), 1)
+
+
+class WebhookSyncTests(TestCase):
+    @mock.patch("authapp.watch.sync_calendar", side_effect=ConnectionError("reset"))
+    def test_failed_sync_is_logged(self, sync_calendar):
+        with self.assertLogs("authapp.watch", "ERROR") as logs:
+            watch._run_sync(EMAIL, "primary")
+        self.assertIn("Webhook sync of calendar primary of a@example.com failed", logs.output[0])
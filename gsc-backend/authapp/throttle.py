@@ -0,0 +1,188 @@
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from googleapiclient.errors import HttpError
+
+from . import metrics
+
+# 403 reasons Google uses for per-user / per-project QPS limits. Daily quota
+# exhaustion (quotaExceeded, dailyLimitExceeded) is not worth retrying.
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+
+MAX_USER_BUCKETS = 10000
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, count=1):
+        """Takes tokens if available; otherwise returns the seconds to wait before retrying."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= count:
+                self.tokens -= count
+                return 0
+            return (count - self.tokens) / self.rate
+
+
+# Buckets live in process memory: limits are per worker process
+_project_bucket = None
+_user_buckets = OrderedDict()
+_buckets_lock = threading.Lock()
+
+stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def record(name, count=1):
+    with _stats_lock:
+        stats[name] += count
+
+
+def _buckets(email):
+    global _project_bucket
+    with _buckets_lock:
+        if _project_bucket is None:
+            _project_bucket = TokenBucket(settings.GOOGLE_PROJECT_QPS, settings.GOOGLE_PROJECT_QPS)
+        if not email:
+            return [_project_bucket]
+        bucket = _user_buckets.get(email)
+        if bucket is None:
+            bucket = _user_buckets[email] = TokenBucket(settings.GOOGLE_USER_QPS, settings.GOOGLE_USER_BURST)
+            while len(_user_buckets) > MAX_USER_BUCKETS:
+                _user_buckets.popitem(last=False)
+        _user_buckets.move_to_end(email)
+        return [bucket, _project_bucket]
+
+
+def _next_wait(email, count):
+    # Both buckets must have room; only take from them once they all do
+    buckets = _buckets(email)
+    for index, bucket in enumerate(buckets):
+        wait = bucket.take(count)
+        if wait:
+            # Give back what the earlier buckets already handed out
+            for taken in buckets[:index]:
+                with taken.lock:
+                    taken.tokens = min(taken.capacity, taken.tokens + count)
+            return wait
+    return 0
+
+
+def max_count(email=None):
+    """The most tokens one acquire() can ask for: a bucket never holds more than its capacity."""
+    return max(1, int(min(bucket.capacity for bucket in _buckets(email))))
+
+
+def acquire(email=None, count=1):
+    if count > max_count(email):
+        raise ValueError(f"Cannot take {count} tokens at once; split the calls into groups of {max_count(email)}")
+    deadline = time.monotonic() + settings.GOOGLE_THROTTLE_MAX_WAIT
+    while True:
+        wait = _next_wait(email, count)
+        if not wait:
+            return
+        if time.monotonic() + wait > deadline:
+            record("rejected_locally")
+            raise RateLimitExceeded("Too many Google API calls, try again shortly", retry_after=wait)
+        record("delayed_locally")
+        time.sleep(wait)
+
+
+async def acquire_async(email=None, count=1):
+    deadline = time.monotonic() + settings.GOOGLE_THROTTLE_MAX_WAIT
+    while True:
+        wait = _next_wait(email, count)
+        if not wait:
+            return
+        if time.monotonic() + wait > deadline:
+            record("rejected_locally")
+            raise RateLimitExceeded("Too many Google API calls, try again shortly", retry_after=wait)
+        record("delayed_locally")
+        await asyncio.sleep(wait)
+
+
+def _reason(content):
+    try:
+        return json.loads(content)["error"]["errors"][0]["reason"]
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+def is_rate_limited(status, content):
+    return status == 429 or (status == 403 and _reason(content) in RATE_LIMIT_REASONS)
+
+
+def is_rate_limit_error(error):
+    return isinstance(error, HttpError) and is_rate_limited(error.resp.status, error.content)
+
+
+def backoff_delay(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(settings.GOOGLE_BACKOFF_MAX, settings.GOOGLE_BACKOFF_BASE * 2 ** attempt))
+
+
+def execute(request, email=None):
+    """request.execute() behind the rate limiter, retrying Google's rate-limit responses.
+
+    Retries stop once they would wait past GOOGLE_RATE_LIMIT_MAX_WAIT in all, so a request
+    thread is not held for the whole backoff; the outbox and the scheduler retry later.
+    """
+    deadline = time.monotonic() + settings.GOOGLE_RATE_LIMIT_MAX_WAIT
+    for attempt in range(settings.GOOGLE_RATE_LIMIT_RETRIES + 1):
+        acquire(email)
+        try:
+            with metrics.google_method(getattr(request, "methodId", None)):
+                result = request.execute()
+        except HttpError as e:
+            if not is_rate_limit_error(e):
+                raise
+            record("throttled")
+            retry_after = e.resp.get("retry-after")
+            delay = backoff_delay(attempt, retry_after)
+            if attempt == settings.GOOGLE_RATE_LIMIT_RETRIES or time.monotonic() + delay > deadline:
+                raise RateLimitExceeded(str(e), retry_after=retry_after or delay)
+            time.sleep(delay)
+            continue
+        record("success")
+        return result
+
+
+def error_status(error):
+    """HTTP status for a failed Google-bound request: 429 when we ran out of quota, else 500."""
+    return 429 if isinstance(error, RateLimitExceeded) else 500
+
+
+def retry_headers(error):
+    """Retry-After for a 429, so the client waits out the limit instead of us."""
+    if not isinstance(error, RateLimitExceeded) or not error.retry_after:
+        return {}
+    try:
+        return {"Retry-After": str(math.ceil(float(error.retry_after)))}
+    except ValueError:
+        # Google may send an HTTP date
+        return {"Retry-After": error.retry_after}
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import httplib2
+import requests
+from django.conf import settings
+from google.auth.transport.requests import Request
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import metrics
+
+REFRESH_STATUS_CODES = (401,)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    # One pooled keep-alive session per worker process, shared by every user
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retries = Retry(
+                    total=settings.GOOGLE_HTTP_RETRIES,
+                    backoff_factor=0.3,
+                    status_forcelist=(500, 502, 503, 504),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=settings.GOOGLE_HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=settings.GOOGLE_HTTP_POOL_SIZE,
+                    max_retries=retries,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _timeout():
+    return (settings.GOOGLE_HTTP_CONNECT_TIMEOUT, settings.GOOGLE_HTTP_READ_TIMEOUT)
+
+
+class AuthorizedTransport:
+    """httplib2-compatible adapter so googleapiclient talks through the shared session."""
+
+    def __init__(self, credentials, email):
+        self.credentials = credentials
+        self.email = email
+        self._auth_request = Request(session=get_session())
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=None, connection_type=None):
+        token = self.credentials.token
+        response = self._send(uri, method, body, headers)
+
+        if response.status_code in REFRESH_STATUS_CODES and self.credentials.refresh_token:
+            # Imported here: the credential manager itself builds on this module's session
+            from .credentials import credential_manager
+
+            # Through the manager, so concurrent 401s share one refresh and the new token is stored
+            credential_manager.refresh(self.email, self.credentials, trigger="unauthorized", rejected_token=token)
+            response = self._send(uri, method, body, headers)
+
+        info = {key.lower(): value for key, value in response.headers.items()}
+        # requests has already decoded the body
+        info.pop("content-encoding", None)
+        info["status"] = str(response.status_code)
+        info["reason"] = response.reason
+        return httplib2.Response(info), response.content
+
+    def _send(self, uri, method, body, headers):
+        headers = dict(headers or {})
+        self.credentials.before_request(self._auth_request, method, uri, headers)
+        started = time.perf_counter()
+        try:
+            response = get_session().request(method, uri, data=body, headers=headers, timeout=_timeout())
+        except requests.RequestException as e:
+            metrics.record_google_call(time.perf_counter() - started, type(e).__name__, len(body or b""))
+            raise
+        metrics.record_google_call(
+            time.perf_counter() - started, response.status_code, len(body or b""), len(response.content),
+        )
+        return response
@@ -1,10 +1,11 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 from .views import (
     CalendarListView,
     SetDefaultCalendarView,
     CalendarItemCreateView,
     CreateGoogleItemView,
+    BatchCreateGoogleItemsView,
      )
 
 urlpatterns = [
@@ -12,18 +13,37 @@ urlpatterns = [
     path('callback/', views.google_auth_callback),
     path('profile/', views.get_user_profile),
     path('tasks/', views.get_tasks),
+    path('tasks/stream', views.stream_tasks),
     path('tasks/delete', views.delete_task_view),
+    path('tasks/bulk-delete', views.bulk_delete_tasks_view),
 
     path('events/', views.fetch_google_events),
+    path('events/all', views.fetch_all_events),
+    path('events/stream', views.stream_events),
     path('events/create', views.create_event),
     path('events/delete', views.delete_event),
     path('events/sync', views.sync_events),
+    path('events/webhook', views.calendar_webhook),
     path('events/update', views.update_event),
+    path('events/bulk-delete', views.bulk_delete_events_view),
+    path('events/bulk-update', views.bulk_update_events_view),
+
+    path('availability/', views.availability),
+    path('search/', views.search),
 
     path('calendars/', CalendarListView.as_view()),
     path('calendars/default/', SetDefaultCalendarView.as_view()),
 
     path("items/create/", CreateGoogleItemView.as_view()),  # main endpoint
+    path("items/batch/", BatchCreateGoogleItemsView.as_view()),
+
+    # Async variants for ASGI deployments
+    path('aio/events/', async_views.fetch_google_events),
+    path('aio/events/create', async_views.create_event),
+    path('aio/events/update', async_views.update_event),
+    path('aio/events/delete', async_views.delete_event),
+    path('aio/tasks/', async_views.get_tasks),
+    path('aio/calendars/', async_views.list_calendars),
 # path("holidays/", PublicHolidaysView.as_view()),
 
 ]
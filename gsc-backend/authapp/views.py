@@ -1,23 +1,45 @@
 import os
-from django.http import HttpResponseRedirect, JsonResponse
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from google_auth_oauthlib.flow import Flow
 from google.oauth2.credentials import Credentials
 from google.oauth2 import id_token
 from google.auth.transport import requests
-from googleapiclient.discovery import build
 from .utils import get_valid_credentials
+from .credentials import credential_manager
+from django.conf import settings
 from django.shortcuts import redirect
+from django.utils.decorators import method_decorator
+from django.contrib.auth import get_user_model
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from .models import GoogleCredentials, CalendarItem
-from .serializers import GoogleCredentialsSerializer, CalendarItemSerializer
-from .google_helpers import get_google_creds, fetch_user_calendars, create_google_event, create_google_task, fetch_user_tasks, delete_google_task
+from .serializers import GoogleCredentialsSerializer, CalendarItemSerializer, GoogleItemCreateSerializer
+from .google_helpers import fetch_user_calendars, delete_google_task, batch_create_items
+from .google_helpers import iter_event_pages, iter_task_pages
+from .google_helpers import build_event_patch, bulk_delete_events, bulk_update_events, bulk_delete_tasks
+from .sync import sync_calendar, mirrored_events, mirror_event, unmirror_events
+from .services import calendar_service
+from .outbox import enqueue_item
+from .watch import handle_notification
+from .throttle import error_status, execute, retry_headers
+from .caching import calendar_list, conditional_response, get_profile, invalidate_user_cache
+from .caching import cached_for, no_store, revalidate
+from .availability import MAX_AVAILABILITY_DAYS, find_availability
+from .search import DEFAULT_LIMIT as SEARCH_DEFAULT_LIMIT, MAX_LIMIT as SEARCH_MAX_LIMIT, search_items, search_terms
+from .mirror import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, ensure_fresh, events_for_calendars, events_page, parse_query_time
+from .mirror import ensure_tasks_fresh, tasks_from_mirror
+from .payloads import FastJsonResponse, dumps, google_fields, parse_fields, project
+from . import metrics
 # from .google_holidays import fetch_public_holidays
 
 from django.views.decorators.csrf import csrf_exempt
+import hmac
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+User = get_user_model()
 
 SCOPES = [
     "https://www.googleapis.com/auth/calendar",
@@ -84,6 +106,8 @@ def google_auth_callback(request):
             "picture": id_info.get("picture")
         }
     )
+    credential_manager.invalidate(email)
+    invalidate_user_cache(email)
     # Default to Vercel in production if env var not set
     # DEVELOPERS: Set FRONTEND_URL=http://localhost:5173 in your .env for local dev
     frontend = os.environ.get("FRONTEND_URL", "https://google-calendar-sync-jet.vercel.app")
@@ -117,6 +141,16 @@ def google_auth_init(request):
 
     return HttpResponseRedirect(auth_url)
 
+def mirror_response(request, data, synced_at, stale):
+    # Syncs move synced_at without changing the data, so it stays out of the ETag and
+    # polls still get a 304. A 304 has no body; the headers carry it there too.
+    response = conditional_response(request, data, {"synced_at": synced_at.isoformat(), "stale": stale})
+    response["X-Synced-At"] = synced_at.isoformat()
+    response["X-Mirror-Stale"] = "true" if stale else "false"
+    return response
+
+
+@revalidate
 def fetch_google_events(request):
     email = request.GET.get("email")
     calendar_id = request.GET.get("calendar_id", "primary")
@@ -125,34 +159,265 @@ def fetch_google_events(request):
         return JsonResponse({"error": "Email is required"}, status=400)
 
     try:
-        creds = get_valid_credentials(email)
-        service = build("calendar", "v3", credentials=creds)
+        time_min = parse_query_time(request.GET.get("time_min"))
+        time_max = parse_query_time(request.GET.get("time_max"))
+        limit = min(int(request.GET.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        fields = parse_fields(request.GET.get("fields"))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        synced_at, stale = ensure_fresh(email, calendar_id)
+        events, next_cursor = events_page(
+            email,
+            calendar_id,
+            time_min=time_min,
+            time_max=time_max,
+            cursor=request.GET.get("cursor"),
+            limit=max(limit, 1),
+        )
+        return mirror_response(request, {
+            "events": project(events, fields),
+            "next_cursor": next_cursor,
+        }, synced_at, stale)
+
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
+
+
+@revalidate
+def fetch_all_events(request):
+    email = request.GET.get("email")
+
+    if not email:
+        return JsonResponse({"error": "Email is required"}, status=400)
+
+    try:
+        time_min = parse_query_time(request.GET.get("time_min"))
+        time_max = parse_query_time(request.GET.get("time_max"))
+        limit = min(int(request.GET.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        fields = parse_fields(request.GET.get("fields"))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        # ?calendar_ids=a,b picks calendars; otherwise every calendar in the user's list
+        selected = request.GET.get("calendar_ids")
+        if selected:
+            calendar_ids = [c for c in selected.split(",") if c]
+        else:
+            calendar_ids = [c["id"] for c in fetch_user_calendars(email)]
+
+        events, calendars = events_for_calendars(
+            email, calendar_ids, time_min=time_min, time_max=time_max, limit=max(limit, 1),
+        )
+        if calendar_ids and all("error" in c for c in calendars.values()):
+            return JsonResponse({"error": "Could not load any calendar", "calendars": calendars}, status=502)
+        return FastJsonResponse({"events": project(events, fields, keep=("calendarId",)), "calendars": calendars})
 
-        events_result = service.events().list(
-            calendarId=calendar_id,
-            maxResults=50,
-            singleEvents=True,
-            orderBy="startTime"
-        ).execute()
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
 
-        events = events_result.get("items", [])
 
-        return JsonResponse({"events": events}, safe=False)
+def _parse_clock(value):
+    try:
+        return datetime.strptime(value, "%H:%M").time()
+    except ValueError:
+        raise ValueError(f"Invalid time of day: {value}")
 
+
+@revalidate
+def availability(request):
+    email = request.GET.get("email")
+    if not email:
+        return JsonResponse({"error": "Email is required"}, status=400)
+
+    try:
+        time_min = parse_query_time(request.GET.get("time_min"))
+        time_max = parse_query_time(request.GET.get("time_max"))
+        if not time_min or not time_max or time_max <= time_min:
+            raise ValueError("time_min and time_max are required and time_max must be after time_min")
+        if time_max - time_min > timedelta(days=MAX_AVAILABILITY_DAYS):
+            raise ValueError(f"Range is limited to {MAX_AVAILABILITY_DAYS} days")
+
+        attendees = [a for a in request.GET.get("attendees", "").split(",") if a]
+        tz = ZoneInfo(request.GET.get("time_zone", "Asia/Kolkata"))
+        work_start = _parse_clock(request.GET.get("work_start", "09:00"))
+        work_end = _parse_clock(request.GET.get("work_end", "17:00"))
+        # Monday is 0, like date.weekday()
+        work_days = {int(d) for d in request.GET.get("work_days", "0,1,2,3,4").split(",") if d}
+        duration = timedelta(minutes=int(request.GET.get("slot_minutes", 30)))
+        buffer = timedelta(minutes=int(request.GET.get("buffer_minutes", 0)))
+        if duration <= timedelta(0) or buffer < timedelta(0):
+            raise ValueError("slot_minutes must be positive and buffer_minutes not negative")
+    except (ValueError, ZoneInfoNotFoundError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        slots, busy, errors = find_availability(
+            email, attendees, time_min, time_max, tz, work_start, work_end, work_days, duration, buffer,
+        )
+        return JsonResponse({
+            "time_zone": str(tz),
+            "slots": [{"start": start.astimezone(tz).isoformat(), "end": end.astimezone(tz).isoformat()}
+                      for start, end in slots],
+            "busy": [{"start": start.astimezone(tz).isoformat(), "end": end.astimezone(tz).isoformat()}
+                     for start, end in busy],
+            "errors": errors,
+        })
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
+
+
+@no_store
+def metrics_view(request):
+    # Prometheus scrape endpoint; with METRICS_TOKEN set, scrapers send it as a bearer token
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied, settings.METRICS_TOKEN):
+            return HttpResponse(status=401)
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@revalidate
+def search(request):
+    email = request.GET.get("email")
+    if not email:
+        return JsonResponse({"error": "Email is required"}, status=400)
+
+    try:
+        time_min = parse_query_time(request.GET.get("time_min"))
+        time_max = parse_query_time(request.GET.get("time_max"))
+        limit = max(1, min(int(request.GET.get("limit", SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT))
+        fields = parse_fields(request.GET.get("fields"))
+        query = request.GET.get("q", "")
+        # Queries too big to search are turned away before any SQL runs
+        search_terms(query)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    # Searches the local mirror only, so typing-as-you-search never reaches Google
+    user_id = User.objects.filter(username=email).values_list("id", flat=True).first()
+    if user_id is None:
+        return JsonResponse({"results": []})
+
+    found = search_items(
+        user_id,
+        query,
+        time_min=time_min,
+        time_max=time_max,
+        item_type=request.GET.get("type"),
+        limit=limit,
+    )
+    # ?fields= applies to the Google item of each result
+    projected = project([item.metadata for item in found], fields)
+    return FastJsonResponse({
+        "results": [
+            {
+                "id": item.id,
+                "type": item.type,
+                "title": item.title,
+                "start_at": item.start_at,
+                "end_at": item.end_at,
+                "due_at": item.due_at,
+                "calendar_id": item.google_calendar_id,
+                "google_item_id": item.google_item_id,
+                "rank": getattr(item, "rank", None),
+                "item": metadata,
+            }
+            for item, metadata in zip(found, projected)
+        ]
+    })
 
 
+@revalidate
 def get_tasks(request):
     email = request.GET.get("email")
     if not email:
         return JsonResponse({"error": "Email is required"}, status=400)
     
     try:
-        tasks = fetch_user_tasks(email)
-        return JsonResponse({"tasks": tasks}, safe=False)
+        fields = parse_fields(request.GET.get("fields"))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        # Served from the mirror, which is kept in step with every task list
+        synced_at, stale = ensure_tasks_fresh(email)
+        tasks = tasks_from_mirror(
+            email,
+            tasklist=request.GET.get("tasklist"),
+            show_completed=request.GET.get("show_completed") == "true",
+        )
+        return mirror_response(request, {
+            "tasks": project(tasks, fields, keep=("tasklist",)),
+        }, synced_at, stale)
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
+
+
+def stream_pages(key, pages, fields=None):
+    # NDJSON: one {key: item} line per item, then a {"next_cursor": ...} line to resume from.
+    # A ?limit= is passed to the page iterator, which sizes its last page to fit.
+    next_cursor = None
+    try:
+        for items, next_cursor in pages:
+            yield b"".join(dumps({key: item}) + b"\n" for item in project(items, fields))
+        yield dumps({"next_cursor": next_cursor}) + b"\n"
+    except Exception as e:
+        # Headers are already sent, so errors are reported in-band
+        yield dumps({"error": str(e)}) + b"\n"
+
+
+def _stream_options(request):
+    limit = request.GET.get("limit")
+    if limit:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        if limit < 0:
+            raise ValueError("limit must not be negative")
+    return limit or None, parse_fields(request.GET.get("fields"))
+
+
+@no_store
+def stream_events(request):
+    email = request.GET.get("email")
+    if not email:
+        return JsonResponse({"error": "Email is required"}, status=400)
+
+    try:
+        limit, fields = _stream_options(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    # Straight from Google, so the field selection goes to Google too
+    pages = iter_event_pages(
+        email, request.GET.get("calendar_id", "primary"), request.GET.get("cursor"),
+        fields=google_fields(fields), limit=limit,
+    )
+    return StreamingHttpResponse(stream_pages("event", pages, fields), content_type="application/x-ndjson")
+
+
+@no_store
+def stream_tasks(request):
+    email = request.GET.get("email")
+    if not email:
+        return JsonResponse({"error": "Email is required"}, status=400)
+
+    try:
+        limit, fields = _stream_options(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    pages = iter_task_pages(
+        email, request.GET.get("cursor"), request.GET.get("tasklist", "@default"),
+        fields=google_fields(fields), limit=limit,
+    )
+    return StreamingHttpResponse(stream_pages("task", pages, fields), content_type="application/x-ndjson")
 
 
 @csrf_exempt
@@ -168,24 +433,20 @@ def delete_task_view(request):
         if not email or not task_id:
             return JsonResponse({"error": "Missing email or task_id"}, status=400)
 
-        delete_google_task(email, task_id)
+        delete_google_task(email, task_id, body.get("tasklist"))
         return JsonResponse({"success": True})
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
     
 
+@cached_for(settings.PROFILE_CACHE_TTL)
 def get_user_profile(request):
     email = request.GET.get("email")
     if not email:
         return JsonResponse({"error": "Email is required"}, status=400)
     
     try:
-        creds = GoogleCredentials.objects.get(email=email)
-        return JsonResponse({
-            "name": creds.name,
-            "picture": creds.picture,
-            "email": creds.email
-        })
+        return conditional_response(request, get_profile(email))
     except GoogleCredentials.DoesNotExist:
         return JsonResponse({"error": "User not found"}, status=404)
 
@@ -245,7 +506,7 @@ def create_event(request):
 
     try:
         creds = get_valid_credentials(email)
-        service = build("calendar", "v3", credentials=creds)
+        service = calendar_service(creds, email)
         attendees = body.get("attendees", [])
 
         event_body = {
@@ -264,20 +525,18 @@ def create_event(request):
                 }
             }
 
-        print("EVENT BODY:", event_body)
-
-
-        created = service.events().insert(
+        created = execute(service.events().insert(
             calendarId=calendar_id, 
             body=event_body,
             sendUpdates='all',
             conferenceDataVersion=1
-        ).execute()
+        ), email)
+        mirror_event(email, calendar_id, created)
         return JsonResponse({"success": True, "event": created, "event-link": created.get("htmlLink")}, status=201)
 
     except Exception as e:
         # Return both the message and a simple repr so debugging is easier
-        return JsonResponse({"error": str(e)}, status=500)
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
     
 
 
@@ -302,14 +561,15 @@ def delete_event(request):
             return JsonResponse({"error": "Missing email or event_id"}, status=400)
 
         creds = get_valid_credentials(email)
-        service = build("calendar", "v3", credentials=creds)
+        service = calendar_service(creds, email)
 
-        service.events().delete(calendarId=calendar_id, eventId=event_id).execute()
+        execute(service.events().delete(calendarId=calendar_id, eventId=event_id), email)
+        unmirror_events(email, calendar_id, [event_id])
 
         return JsonResponse({"success": True})
 
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
 
 
 @csrf_exempt
@@ -321,46 +581,133 @@ def update_event(request):
     email = body.get("email")
     event_id = body.get("event_id")
     calendar_id = body.get("calendar_id", "primary")
-    summary = body.get("summary")
-    description = body.get("description")
-    start = body.get("start")
-    end = body.get("end")
 
     if not email or not event_id:
         return JsonResponse({"error": "Missing email or event_id"}, status=400)
 
     creds = get_valid_credentials(email)
-    service = build("calendar", "v3", credentials=creds)
+    service = calendar_service(creds, email)
 
-    event = service.events().get(calendarId=calendar_id, eventId=event_id).execute()
-
-    if summary: event["summary"] = summary
-    if description: event["description"] = description
-    if start:
-        event["start"] = {"dateTime": start, "timeZone": "Asia/Kolkata"}
-    if end:
-        event["end"] = {"dateTime": end, "timeZone": "Asia/Kolkata"}
-
-    updated_event = service.events().update(
+    # patch sends only the changed fields, no need to GET the event first
+    updated_event = execute(service.events().patch(
         calendarId=calendar_id,
         eventId=event_id,
-        body=event
-    ).execute()
+        body=build_event_patch(body)
+    ), email)
+    mirror_event(email, calendar_id, updated_event)
 
     return JsonResponse({"success": True, "event": updated_event})
 
 
+def _bulk_body(request, ids_key):
+    # json.JSONDecodeError is a ValueError, so bad JSON is a 400 like a missing field
+    body = json.loads(request.body)
+    if not isinstance(body, dict):
+        raise ValueError("Request body must be a JSON object")
+    email = body.get("email")
+    ids = body.get(ids_key)
+    if not email or not isinstance(ids, list) or not ids:
+        raise ValueError(f"Missing email or {ids_key}")
+    return body, email, ids
+
+
+def _bulk_response(results):
+    failed = any(not r["success"] for r in results)
+    return JsonResponse({"results": results}, status=207 if failed else 200)
+
+
+@csrf_exempt
+def bulk_delete_events_view(request):
+    if request.method != "DELETE":
+        return JsonResponse({"error": "DELETE required"}, status=400)
+
+    try:
+        body, email, event_ids = _bulk_body(request, "event_ids")
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return _bulk_response(bulk_delete_events(email, body.get("calendar_id", "primary"), event_ids))
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
+
+
+@csrf_exempt
+def bulk_update_events_view(request):
+    if request.method not in ("PUT", "PATCH"):
+        return JsonResponse({"error": "PUT or PATCH required"}, status=400)
+
+    try:
+        body, email, updates = _bulk_body(request, "updates")
+        if not all(isinstance(u, dict) and u.get("event_id") for u in updates):
+            raise ValueError("Every update needs an event_id")
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return _bulk_response(bulk_update_events(email, body.get("calendar_id", "primary"), updates))
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
+
+
+@csrf_exempt
+def bulk_delete_tasks_view(request):
+    if request.method != "DELETE":
+        return JsonResponse({"error": "DELETE required"}, status=400)
+
+    try:
+        _, email, task_ids = _bulk_body(request, "task_ids")
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return _bulk_response(bulk_delete_tasks(email, task_ids))
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
 
 
 
+
+
+@csrf_exempt
+def calendar_webhook(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=400)
+
+    known = handle_notification(
+        request.headers.get("X-Goog-Channel-ID"),
+        request.headers.get("X-Goog-Channel-Token"),
+        request.headers.get("X-Goog-Resource-State"),
+    )
+    # Anything but 2xx for an unknown channel makes Google stop sending
+    return HttpResponse(status=200 if known else 404)
+
+
 def sync_events(request):
-    return fetch_google_events(request)
+    email = request.GET.get("email")
+    calendar_id = request.GET.get("calendar_id", "primary")
+
+    if not email:
+        return JsonResponse({"error": "Email is required"}, status=400)
+
+    try:
+        result = sync_calendar(email, calendar_id)
+        return JsonResponse({
+            "events": mirrored_events(email, calendar_id),
+            "full_sync": result["full"],
+            "updated": result["updated"],
+            "deleted": result["deleted"],
+            "synced_at": result["synced_at"].isoformat(),
+        })
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
 
 
 
 class CalendarListView(APIView):
     permission_classes = []  # must be public or use email param
 
+    @method_decorator(cached_for(settings.CALENDAR_LIST_CACHE_TTL))
     def get(self, request):
         email = request.GET.get("email")
 
@@ -369,9 +716,9 @@ class CalendarListView(APIView):
 
         try:
             creds = get_valid_credentials(email)
-            service = build("calendar", "v3", credentials=creds)
+            service = calendar_service(creds, email)
 
-            calendars = service.calendarList().list().execute()
+            calendars = calendar_list(email, service)
             items = calendars.get("items", [])
 
             result = []
@@ -382,10 +729,11 @@ class CalendarListView(APIView):
                     "primary": c.get("primary", False)
                 })
 
-            return Response({"calendars": result}, status=200)
+            # A plain JSON response; DRF's content negotiation and rendering add nothing here
+            return conditional_response(request, {"calendars": result})
 
         except Exception as e:
-            return Response({"error": str(e)}, status=500)
+            return Response({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
 
 
 
@@ -398,6 +746,7 @@ class SetDefaultCalendarView(APIView):
         cred, _ = GoogleCredentials.objects.get_or_create(user=request.user, defaults={'token': {}})
         cred.default_calendar_id = default_id
         cred.save()
+        invalidate_user_cache(cred.email)
         return Response({'default_calendar_id': cred.default_calendar_id}, status=status.HTTP_200_OK)
 
 class CalendarItemCreateView(generics.CreateAPIView):
@@ -420,20 +769,36 @@ class CreateGoogleItemView(APIView):
         if not email:
             return Response({"error": "email is required"}, status=400)
 
-        if item_type in ["event", "appointment"]:
-            try:
-                event = create_google_event(email, request.data)
-                return Response({"google_event": event}, status=201)
-            except Exception as e:
-                return Response({"error": str(e)}, status=400)
+        serializer = GoogleItemCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=400)
+
+        if not GoogleCredentials.objects.filter(email=email).exists():
+            return Response({"error": "Google credentials not found for user."}, status=400)
+
+        # Committed locally as pending and pushed to Google by the outbox worker
+        item = enqueue_item(email, serializer.validated_data)
+        data = CalendarItemSerializer(item).data
+        key = "google_task" if item_type == "task" else "google_event"
+        return Response({key: data, "sync_status": item.sync_status}, status=202)
 
-        elif item_type == "task":
-            try:
-                task = create_google_task(email, request.data)
-                return Response({"google_task": task}, status=201)
-            except Exception as e:
-                return Response({"error": str(e)}, status=400)
 
-        return Response({"error": "Invalid type"}, status=400)
+class BatchCreateGoogleItemsView(APIView):
+    permission_classes = []
 
+    def post(self, request):
+        email = request.data.get("email")
+        if not email:
+            return Response({"error": "email is required"}, status=400)
+
+        serializer = GoogleItemCreateSerializer(data=request.data.get("items"), many=True)
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=400)
+
+        try:
+            results = batch_create_items(email, serializer.validated_data)
+        except Exception as e:
+            return Response({"error": str(e)}, status=error_status(e), headers=retry_headers(e))
 
+        failed = any(r["error"] for r in results)
+        return Response({"results": results}, status=207 if failed else 201)
@@ -0,0 +1,150 @@
+import logging
+import secrets
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import WatchChannel
+from .services import calendar_service
+from .sync import get_mirror_user, resolve_calendar_id, sync_calendar
+from .throttle import execute
+from .utils import get_valid_credentials
+
+logger = logging.getLogger(__name__)
+
+# (email, calendar_id) -> pending Timer, so a burst of pings triggers one sync
+_pending_syncs = {}
+_pending_lock = threading.Lock()
+
+
+def active_channel(email, calendar_id):
+    return (
+        WatchChannel.objects.filter(
+            user__username=email,
+            calendar_id=calendar_id,
+            expiration__gt=timezone.now(),
+        )
+        .order_by("-expiration")
+        .first()
+    )
+
+
+def register_channel(email, calendar_id):
+    creds = get_valid_credentials(email)
+    service = calendar_service(creds, email)
+
+    channel_id = uuid.uuid4().hex
+    token = secrets.token_urlsafe(32)
+    response = execute(service.events().watch(
+        calendarId=calendar_id,
+        body={
+            "id": channel_id,
+            "type": "web_hook",
+            "address": settings.GOOGLE_WEBHOOK_URL,
+            "token": token,
+            "params": {"ttl": str(settings.GOOGLE_WATCH_TTL)},
+        },
+    ), email)
+
+    return WatchChannel.objects.create(
+        user=get_mirror_user(email),
+        calendar_id=calendar_id,
+        channel_id=channel_id,
+        resource_id=response["resourceId"],
+        token=token,
+        # Google reports expiration as epoch milliseconds
+        expiration=datetime.fromtimestamp(int(response["expiration"]) / 1000, tz=dt_timezone.utc),
+    )
+
+
+def ensure_channel(email, calendar_id):
+    if not settings.GOOGLE_WEBHOOK_URL:
+        return None
+    calendar_id = resolve_calendar_id(email, calendar_id)
+    return active_channel(email, calendar_id) or register_channel(email, calendar_id)
+
+
+def stop_channel(channel):
+    email = channel.user.username
+    service = calendar_service(get_valid_credentials(email), email)
+    try:
+        execute(service.channels().stop(body={"id": channel.channel_id, "resourceId": channel.resource_id}), email)
+    finally:
+        channel.delete()
+
+
+def renew_expiring_channels():
+    """Replaces channels expiring within GOOGLE_WATCH_RENEW_MARGIN and clears out expired ones.
+
+    Runs hourly inside run_sync_scheduler, deployed as a worker in render.yaml, or
+    from cron through the renew_watch_channels command.
+    """
+    now = timezone.now()
+    cutoff = now + timedelta(seconds=settings.GOOGLE_WATCH_RENEW_MARGIN)
+    # Calendars with a channel good past the cutoff need no new one, e.g. when an
+    # earlier renewal could not stop the channel it replaced
+    covered = set(WatchChannel.objects.filter(expiration__gt=cutoff).values_list("user_id", "calendar_id"))
+    renewed = 0
+    for channel in WatchChannel.objects.select_related("user").filter(expiration__lte=cutoff).order_by("expiration"):
+        key = (channel.user_id, channel.calendar_id)
+        if key not in covered:
+            try:
+                # Overlap the new channel with the old one so no notification is lost
+                register_channel(channel.user.username, channel.calendar_id)
+            except Exception:
+                if channel.expiration > now:
+                    # Still delivering; try again on the next run
+                    continue
+            else:
+                covered.add(key)
+                renewed += 1
+
+        if channel.expiration <= now:
+            # Google has stopped it already
+            channel.delete()
+            continue
+        try:
+            stop_channel(channel)
+        except Exception:
+            pass
+    return renewed
+
+
+def _run_sync(email, calendar_id):
+    with _pending_lock:
+        _pending_syncs.pop((email, calendar_id), None)
+    try:
+        sync_calendar(email, calendar_id)
+    except Exception:
+        # Nobody waits on a webhook sync; the scheduler or the next read catches up
+        logger.exception("Webhook sync of calendar %s of %s failed", calendar_id, email)
+    finally:
+        close_old_connections()
+
+
+def schedule_sync(email, calendar_id):
+    key = (email, calendar_id)
+    with _pending_lock:
+        if key in _pending_syncs:
+            return False
+        timer = threading.Timer(settings.GOOGLE_WEBHOOK_COALESCE_SECONDS, _run_sync, args=key)
+        timer.daemon = True
+        _pending_syncs[key] = timer
+    timer.start()
+    return True
+
+
+def handle_notification(channel_id, token, resource_state):
+    """Returns False for channels we do not know, so the caller can tell Google to stop."""
+    channel = WatchChannel.objects.select_related("user").filter(channel_id=channel_id).first()
+    if channel is None or not secrets.compare_digest(channel.token, token or ""):
+        return False
+
+    # "sync" is the handshake sent right after registration; nothing changed yet
+    if resource_state != "sync":
+        schedule_sync(channel.user.username, channel.calendar_id)
+    return True
@@ -0,0 +1,94 @@
+"""Compare the WSGI (gunicorn) and ASGI (uvicorn) deployments against a fake Google.
+
+    python -m benchmarks.bench_asgi --latency 0.1 --concurrency 100 --requests 2000
+
+Both servers run one worker against the same seeded SQLite database; the WSGI
+server hits the synchronous views and the ASGI server their ``aio/`` twins.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from .common import backend_env, prepare_database, start_process, summarize
+from . import fake_google
+
+EMAIL = "bench@example.com"
+ENDPOINTS = {
+    "calendars": ("/auth/calendars/", "/auth/aio/calendars/"),
+    "tasks": ("/auth/tasks/", "/auth/aio/tasks/"),
+}
+
+
+async def drive(base_url, path, concurrency, total):
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker(client):
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.get(path, params={"email": EMAIL})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.1, help="fake Google latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--wsgi-threads", type=int, default=8)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    google = start_process(fake_google.command(8800, args.latency), None, 8800, ready_path="/__stats")
+    google_root = "http://127.0.0.1:8800/"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = backend_env(Path(tmp) / "bench.sqlite3", google_root)
+        prepare_database(env, [EMAIL])
+
+        servers = {
+            "wsgi": ([sys.executable, "-m", "gunicorn", "config.wsgi", "-w", "1",
+                      "--threads", str(args.wsgi_threads), "-b", "127.0.0.1:8801"], 8801, 0),
+            "asgi": ([sys.executable, "-m", "uvicorn", "config.asgi:application",
+                      "--port", "8802", "--log-level", "warning"], 8802, 1),
+        }
+
+        results = {"latency_s": args.latency, "concurrency": args.concurrency, "results": {}}
+        for name, (command, port, path_index) in servers.items():
+            process = start_process(command, env, port)
+            try:
+                for endpoint, paths in ENDPOINTS.items():
+                    stats = asyncio.run(drive(f"http://127.0.0.1:{port}", paths[path_index], args.concurrency, args.requests))
+                    results["results"][f"{name}:{endpoint}"] = stats
+            finally:
+                process.terminate()
+                process.wait()
+
+    google.terminate()
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
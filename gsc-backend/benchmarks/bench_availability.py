@@ -0,0 +1,109 @@
+"""Time the availability engine on synthetic calendars against per-slot scanning.
+
+    python -m benchmarks.bench_availability --events 10000 --calendars 10 --days 365
+
+No server or database is involved: the busy intervals are generated in memory
+and fed to the same functions availability/ uses.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, time as dt_time, timedelta, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("DJANGO_SECRET_KEY", "benchmark")
+django.setup()
+
+from authapp.availability import _align, free_slots, merge_intervals, working_windows  # noqa: E402
+
+TZ = ZoneInfo("Asia/Kolkata")
+WORK_DAYS = {0, 1, 2, 3, 4}
+
+
+def synthetic_busy(events, calendars, time_min, days, seed):
+    rng = random.Random(seed)
+    busy = []
+    for _ in range(calendars):
+        # Each calendar arrives sorted on its own, like a Google listing
+        starts = sorted(rng.randrange(0, days * 24 * 60, 15) for _ in range(events // calendars))
+        for minute in starts:
+            start = time_min + timedelta(minutes=minute)
+            busy.append((start, start + timedelta(minutes=rng.choice((15, 30, 45, 60)))))
+    return busy
+
+
+def naive_slots(busy, windows, duration):
+    # What the sweep replaces: test every candidate slot against every busy interval
+    slots = []
+    for window_start, window_end in windows:
+        start = _align(window_start)
+        while start + duration <= window_end:
+            end = start + duration
+            if not any(b_start < end and b_end > start for b_start, b_end in busy):
+                slots.append((start, end))
+            start += duration
+    return slots
+
+
+def timed(fn, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, round(best * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--calendars", type=int, default=10)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--slot-minutes", type=int, default=30)
+    parser.add_argument("--buffer-minutes", type=int, default=5)
+    parser.add_argument("--skip-naive", action="store_true", help="only time the sweep")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    time_min = datetime(2025, 3, 3, tzinfo=timezone.utc)
+    time_max = time_min + timedelta(days=args.days)
+    duration = timedelta(minutes=args.slot_minutes)
+    buffer = timedelta(minutes=args.buffer_minutes)
+    busy = synthetic_busy(args.events, args.calendars, time_min, args.days, args.seed)
+    windows = list(working_windows(time_min, time_max, TZ, dt_time(9), dt_time(17), WORK_DAYS))
+
+    def sweep():
+        return free_slots(merge_intervals(busy, buffer), windows, duration)
+
+    slots, sweep_ms = timed(sweep)
+    results = {
+        "events": args.events,
+        "calendars": args.calendars,
+        "days": args.days,
+        "windows": len(windows),
+        "free_slots": len(slots),
+        "sweep_ms": sweep_ms,
+    }
+
+    if not args.skip_naive:
+        widened = [(start - buffer, end + buffer) for start, end in busy]
+        naive, naive_ms = timed(naive_slots, widened, windows, duration, repeat=1)
+        results["naive_ms"] = naive_ms
+        results["speedup"] = round(naive_ms / sweep_ms, 1) if sweep_ms else None
+        results["same_slots"] = naive == slots
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Measure bytes on the wire and time to last byte of a 500-event response per encoding.
+
+    python -m benchmarks.bench_compression --events 500 --repeat 30 --bandwidth 20
+
+Runs gunicorn against benchmarks.fake_google, syncs one calendar into the mirror,
+then fetches events/?limit=N with Accept-Encoding identity, gzip and br (served
+only when the backend has the brotli package), with and without ?fields=, and
+once more with If-None-Match to show the cost of a revalidation. Loopback makes
+the transfer itself nearly free, so a time at --bandwidth Mbit/s is estimated
+from the bytes as well.
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from .common import backend_env, prepare_database, start_process
+from . import fake_google
+
+GOOGLE_PORT = 8820
+BACKEND_PORT = 8821
+EMAIL = "bench@example.com"
+
+
+def fetch(client, params, headers):
+    """(wire bytes, seconds to last byte, response) of one GET of events/."""
+    started = time.perf_counter()
+    with client.stream("GET", "/auth/events/", params=params, headers=headers) as response:
+        size = sum(len(chunk) for chunk in response.iter_raw())
+    return size, time.perf_counter() - started, response
+
+
+def measure(client, params, headers, repeat, bandwidth):
+    sizes, times = [], []
+    for _ in range(repeat):
+        size, elapsed, response = fetch(client, params, headers)
+        sizes.append(size)
+        times.append(elapsed)
+    transfer = max(sizes) * 8 / (bandwidth * 1_000_000)
+    return {
+        "status": response.status_code,
+        "content_encoding": response.headers.get("Content-Encoding", "identity"),
+        "bytes": max(sizes),
+        "ttlb_ms": round(statistics.median(times) * 1000, 2),
+        f"ttlb_at_{bandwidth:g}mbps_ms": round((statistics.median(times) + transfer) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=500, help="events per response")
+    parser.add_argument("--fields", default="id,summary,start,end")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--bandwidth", type=float, default=20, help="Mbit/s for the estimated transfer time")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    google_process = start_process(
+        fake_google.command(GOOGLE_PORT, 0, 1, events=args.events), None, GOOGLE_PORT, ready_path="/__stats",
+    )
+    results = {"events": args.events, "fields": args.fields, "results": {}}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = backend_env(Path(tmp) / "bench.sqlite3", f"http://127.0.0.1:{GOOGLE_PORT}/")
+            prepare_database(env, [EMAIL])
+            backend_process = start_process([
+                sys.executable, "-m", "gunicorn", "config.wsgi", "-w", "1", "-b", f"127.0.0.1:{BACKEND_PORT}",
+            ], env, BACKEND_PORT)
+            try:
+                with httpx.Client(base_url=f"http://127.0.0.1:{BACKEND_PORT}", timeout=60) as client:
+                    whole = {"email": EMAIL, "limit": args.events}
+                    projected = dict(whole, fields=args.fields)
+                    # The first request syncs the calendar into the mirror
+                    fetch(client, whole, {})
+
+                    for encoding in ("identity", "gzip", "br"):
+                        for name, params in (("whole", whole), ("fields", projected)):
+                            results["results"][f"{name}_{encoding}"] = measure(
+                                client, params, {"Accept-Encoding": encoding}, args.repeat, args.bandwidth,
+                            )
+
+                    _, _, response = fetch(client, whole, {"Accept-Encoding": "gzip"})
+                    results["results"]["revalidated_gzip"] = measure(
+                        client, whole, {"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]},
+                        args.repeat, args.bandwidth,
+                    )
+                    results["headers"] = {
+                        key: response.headers.get(key) for key in ("Cache-Control", "Vary", "ETag")
+                    }
+            finally:
+                backend_process.terminate()
+                backend_process.wait()
+    finally:
+        google_process.terminate()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
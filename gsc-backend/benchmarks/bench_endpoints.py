@@ -0,0 +1,236 @@
+"""Drive the main endpoints against a fake Google and report latency, DB and Google calls per request.
+
+    python -m benchmarks.bench_endpoints --latency 0.05 --concurrency 20 --requests 500 \\
+        --output results.json --compare previous.json
+
+Runs gunicorn (one worker, --threads) on a seeded SQLite database. Google is
+replaced by benchmarks.fake_google, which can add latency, small pages, 503s and
+429s. DB queries per request come from the backend's own /metrics and Google
+calls per request from the fake server's counters. Results carry the commit
+they were measured on; --compare prints the change against an earlier file.
+"""
+import argparse
+import asyncio
+import json
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+from .common import BACKEND_DIR, backend_env, prepare_database, start_process, summarize
+from . import fake_google
+
+GOOGLE_PORT = 8810
+BACKEND_PORT = 8811
+
+METRIC_LINE = re.compile(r'^gsc_http_request_db_queries_(sum|count)\{route="([^"]*)"\} (\S+)$')
+
+
+def _slot(i):
+    start = datetime(2025, 6, 2, 9, tzinfo=timezone.utc) + timedelta(minutes=30 * i)
+    return start.strftime("%Y-%m-%dT%H:%M"), (start + timedelta(minutes=30)).strftime("%Y-%m-%dT%H:%M")
+
+
+def _event_body(i, email):
+    start, end = _slot(i)
+    return {"email": email, "title": f"Bench {i}", "start": start, "end": end}
+
+
+def _item_body(i, email):
+    start, end = _slot(i)
+    return {"email": email, "type": "event", "title": f"Bench item {i}", "start_at": start, "end_at": end}
+
+
+def _batch_body(i, email):
+    return {"email": email, "items": [
+        dict(_item_body(i * 10 + j, email), **({"type": "task", "due_at": "2025-06-02"} if j % 2 else {}))
+        for j in range(10)
+    ]}
+
+
+# name: (HTTP method, path, route label in /metrics, JSON body or None for a GET)
+SCENARIOS = {
+    "events": ("GET", "/auth/events/", "auth/events/", None),
+    "events_create": ("POST", "/auth/events/create", "auth/events/create", _event_body),
+    "items_create": ("POST", "/auth/items/create/", "auth/items/create/", _item_body),
+    "items_batch": ("POST", "/auth/items/batch/", "auth/items/batch/", _batch_body),
+    "tasks": ("GET", "/auth/tasks/", "auth/tasks/", None),
+    "calendars": ("GET", "/auth/calendars/", "auth/calendars/", None),
+}
+
+
+def query_totals(client):
+    """(sum, count) of gsc_http_request_db_queries per route, from the backend's /metrics."""
+    totals = {}
+    for line in client.get("/metrics").text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            kind, route, value = match.groups()
+            totals.setdefault(route, [0.0, 0.0])[kind == "count"] = float(value)
+    return totals
+
+
+def google_calls(client):
+    stats = client.get("/__stats").json()
+    return stats["calls"], stats["batched"]
+
+
+async def drive(base_url, scenario, emails, concurrency, total):
+    method, path, _, make_body = SCENARIOS[scenario]
+    latencies = []
+    errors = 0
+    samples = set()
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker(client):
+        nonlocal errors
+        while not queue.empty():
+            i = queue.get_nowait()
+            email = emails[i % len(emails)]
+            started = time.perf_counter()
+            if make_body:
+                response = await client.request(method, path, json=make_body(i, email))
+            else:
+                response = await client.request(method, path, params={"email": email})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+                if len(samples) < 3:
+                    samples.add(f"{response.status_code} {response.text[:200]}")
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return dict(summarize(latencies, elapsed, errors), error_samples=sorted(samples))
+
+
+def run_scenario(name, args, emails, backend, google):
+    route = SCENARIOS[name][2]
+    base_url = f"http://127.0.0.1:{BACKEND_PORT}"
+
+    # First requests per user pay for the initial sync; keep them out of the numbers
+    asyncio.run(drive(base_url, name, emails, min(args.concurrency, len(emails)), len(emails)))
+
+    queries_before = query_totals(backend).get(route, [0.0, 0.0])
+    calls_before = google_calls(google)
+    result = asyncio.run(drive(base_url, name, emails, args.concurrency, args.requests))
+    if name.startswith("items_create"):
+        # The outbox pushes to Google after responding; let it drain before counting calls
+        time.sleep(args.outbox_drain)
+    queries_after = query_totals(backend).get(route, [0.0, 0.0])
+    calls_after = google_calls(google)
+
+    served = queries_after[1] - queries_before[1]
+    result["db_queries_per_request"] = round((queries_after[0] - queries_before[0]) / served, 2) if served else None
+    result["google_calls_per_request"] = round((calls_after[0] - calls_before[0]) / args.requests, 2)
+    result["google_batched_calls_per_request"] = round((calls_after[1] - calls_before[1]) / args.requests, 2)
+    return result
+
+
+def compare(results, baseline):
+    print(f"\n{'scenario':<16}{'metric':<28}{'before':>10}{'after':>10}{'change':>10}")
+    for name, after in results["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "db_queries_per_request", "google_calls_per_request"):
+            old, new = before.get(metric), after.get(metric)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"{name:<16}{metric:<28}{old:>10}{new:>10}{change:>10}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500, help="per scenario")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=16, help="gunicorn threads")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake Google latency in seconds")
+    parser.add_argument("--calendars", type=int, default=3)
+    parser.add_argument("--events", type=int, default=200, help="events per calendar")
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--page-size", type=int, help="largest page the fake Google hands out")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--backoff-base", type=float, default=0.05, help="GOOGLE_BACKOFF_BASE for the backend")
+    parser.add_argument("--outbox-drain", type=float, default=2.0, help="seconds to wait for outbox pushes")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--compare", type=Path, help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    emails = [f"bench{i}@example.com" for i in range(args.users)]
+
+    google_process = start_process(fake_google.command(
+        GOOGLE_PORT, args.latency, args.calendars,
+        events=args.events, tasks=args.tasks, page_size=args.page_size,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, seed=1,
+    ), None, GOOGLE_PORT, ready_path="/__stats")
+
+    results = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": {},
+    }
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = backend_env(
+                Path(tmp) / "bench.sqlite3",
+                f"http://127.0.0.1:{GOOGLE_PORT}/",
+                GOOGLE_BACKOFF_BASE=args.backoff_base,
+                # The benchmark hammers a handful of users far beyond real per-user quotas
+                GOOGLE_USER_QPS=10000,
+                GOOGLE_USER_BURST=10000,
+                GOOGLE_PROJECT_QPS=100000,
+            )
+            prepare_database(env, emails)
+            backend_process = start_process([
+                sys.executable, "-m", "gunicorn", "config.wsgi", "-w", "1",
+                "--threads", str(args.threads), "-b", f"127.0.0.1:{BACKEND_PORT}",
+            ], env, BACKEND_PORT)
+            try:
+                with httpx.Client(base_url=f"http://127.0.0.1:{BACKEND_PORT}", timeout=30) as backend, \
+                        httpx.Client(base_url=f"http://127.0.0.1:{GOOGLE_PORT}", timeout=30) as google:
+                    for name in scenarios:
+                        results["results"][name] = run_scenario(name, args, emails, backend, google)
+            finally:
+                backend_process.terminate()
+                backend_process.wait()
+    finally:
+        google_process.terminate()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
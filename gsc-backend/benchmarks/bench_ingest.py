@@ -0,0 +1,118 @@
+"""Time writing synced Google events into the mirror, bulk versus row by row.
+
+    python -m benchmarks.bench_ingest --events 10000
+
+Builds a throwaway SQLite database (or uses DATABASE_URL if --keep-database-url
+is given, e.g. to measure PostgreSQL) and runs ingest_events() the way a sync
+would: a first full sync, a resync where nothing changed, one where every event
+changed, and an incremental page of changes. The row-by-row baseline is one
+update_or_create() per event, which is how the mirror used to be written.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+
+def make_events(count, version):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    events = []
+    for i in range(count):
+        begin = start + timedelta(minutes=45 * i)
+        events.append({
+            "id": f"ev{i}",
+            "etag": f'"{version}-{i}"',
+            "status": "confirmed",
+            "summary": f"Meeting {i} v{version}",
+            "description": "Weekly sync on roadmap, hiring and the launch checklist",
+            "start": {"dateTime": begin.isoformat()},
+            "end": {"dateTime": (begin + timedelta(minutes=30)).isoformat()},
+            "attendees": [{"email": f"person{i % 50}@example.com"}],
+        })
+    return events
+
+
+def row_by_row(user, calendar_id, events):
+    from authapp.models import CalendarItem
+    from authapp.sync import parse_google_time
+
+    for event in events:
+        CalendarItem.objects.update_or_create(
+            user=user, google_calendar_id=calendar_id, google_item_id=event["id"],
+            defaults={
+                "type": CalendarItem.TYPE_EVENT,
+                "title": event["summary"][:512],
+                "description": event.get("description") or "",
+                "start_at": parse_google_time(event.get("start")),
+                "end_at": parse_google_time(event.get("end")),
+                "metadata": event,
+                "sync_status": CalendarItem.SYNC_SYNCED,
+            },
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--page", type=int, default=250, help="events in the incremental page")
+    parser.add_argument("--skip-baseline", action="store_true", help="only time the bulk writer")
+    parser.add_argument("--keep-database-url", action="store_true", help="benchmark DATABASE_URL instead of SQLite")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory()
+    if not args.keep_database_url:
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir.name}/ingest.sqlite3"
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    os.environ.setdefault("DJANGO_SECRET_KEY", "benchmark")
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+    import django
+    from django.core.management import call_command
+    django.setup()
+    from django.db import connection, transaction
+    from authapp.models import CalendarItem
+    from authapp.sync import get_mirror_user, ingest_events
+
+    call_command("migrate", verbosity=0)
+    user = get_mirror_user("bench@example.com")
+
+    def timed(write, calendar_id, events, **kwargs):
+        with transaction.atomic():
+            started = time.perf_counter()
+            write(user, calendar_id, events, **kwargs)
+            elapsed = time.perf_counter() - started
+        return {"seconds": round(elapsed, 3), "events_per_second": round(len(events) / elapsed)}
+
+    first, changed = make_events(args.events, 1), make_events(args.events, 2)
+    page = make_events(args.page, 3)
+
+    results = {
+        "backend": connection.vendor,
+        "events": args.events,
+        "bulk": {
+            "full_sync_new": timed(ingest_events, "bulk", first, full=True),
+            "full_sync_unchanged": timed(ingest_events, "bulk", first, full=True),
+            "full_sync_all_changed": timed(ingest_events, "bulk", changed, full=True),
+            "incremental_page": timed(ingest_events, "bulk", page),
+        },
+        "rows": CalendarItem.objects.filter(google_calendar_id="bulk").count(),
+    }
+    if not args.skip_baseline:
+        results["row_by_row"] = {
+            "full_sync_new": timed(row_by_row, "rows", first),
+            "full_sync_all_changed": timed(row_by_row, "rows", changed),
+            "incremental_page": timed(row_by_row, "rows", page),
+        }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare body size and encoding time of event lists, whole versus ?fields= projected.
+
+    python -m benchmarks.bench_payloads --events 2500 --fields id,summary,start,end
+
+Encodes one page of Google-shaped events (benchmarks.fake_google.google_event)
+the way the events endpoint used to, json.dumps once for the ETag and once for
+JsonResponse, and the way it does now, a single payloads.dumps() whose bytes are
+also hashed for the ETag, with and without a field selection.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+
+def timed(encode, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = encode()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return {"bytes": len(body), "ms": round(best * 1000, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=2500)
+    parser.add_argument("--fields", default="id,summary,start,end")
+    parser.add_argument("--repeat", type=int, default=20, help="best of this many runs")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    os.environ.setdefault("DJANGO_SECRET_KEY", "benchmark")
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    import django
+    django.setup()
+    from django.core.serializers.json import DjangoJSONEncoder
+    from authapp import payloads
+    from .fake_google import google_event
+
+    events = [google_event(0, i) for i in range(args.events)]
+    fields = payloads.parse_fields(args.fields)
+
+    def before():
+        data = {"events": events, "next_cursor": None}
+        etag = hashlib.sha256(json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+        body = json.dumps(data, cls=DjangoJSONEncoder).encode()
+        return body if etag else b""
+
+    def after(selection):
+        def encode():
+            body = payloads.dumps({"events": payloads.project(events, selection), "next_cursor": None})
+            hashlib.sha256(body).hexdigest()
+            return body
+        return encode
+
+    results = {
+        "events": args.events,
+        "fields": args.fields,
+        "encoder": "orjson" if payloads.orjson else "json",
+        "before": timed(before, args.repeat),
+        "whole": timed(after(None), args.repeat),
+        "projected": timed(after(fields), args.repeat),
+    }
+    for name in ("whole", "projected"):
+        results[name]["bytes_ratio"] = round(results["before"]["bytes"] / results[name]["bytes"], 1)
+        results[name]["speedup"] = round(results["before"]["ms"] / results[name]["ms"], 1)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Time search/ queries against a mirror of synthetic calendar items.
+
+    python -m benchmarks.bench_search --items 100000 --queries 500
+
+Builds a throwaway SQLite database (or uses DATABASE_URL if --keep-database-url
+is given, e.g. to measure PostgreSQL), fills it with items for one user and runs
+prefix queries with and without date filters through the same code as search/.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+WORDS = (
+    "standup planning review retro sync demo launch budget hiring interview design roadmap "
+    "customer onboarding offsite workshop lunch dentist gym flight dinner quarterly board "
+    "marketing sales engineering support security migration release incident postmortem"
+).split()
+PEOPLE = ["alice", "bob", "carol", "dave", "erin", "frank", "grace", "heidi", "ivan", "judy"]
+PLACES = ["Room 101", "Bangalore Office", "Zoom", "Cafe Coffee Day", "Board Room", "Home"]
+# Descriptions draw on a much wider vocabulary, like real notes and agendas
+NOTES = [f"{a}{b}" for a in ("ka", "lo", "mi", "ne", "pu", "ra", "si", "to", "va", "ze") for b in WORDS + PEOPLE]
+
+
+def seed(user, count, rng):
+    from authapp.models import CalendarItem
+
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(count):
+        title = " ".join(rng.sample(WORDS, 3))
+        begin = start + timedelta(minutes=30 * rng.randrange(0, 2 * 365 * 48))
+        attendees = [{"email": f"{name}@example.com"} for name in rng.sample(PEOPLE, 2)]
+        rows.append(CalendarItem(
+            user=user,
+            type=CalendarItem.TYPE_EVENT,
+            title=title,
+            description=" ".join(rng.choices(NOTES, k=12) + rng.choices(WORDS, k=2)),
+            start_at=begin,
+            end_at=begin + timedelta(minutes=30),
+            google_calendar_id="primary",
+            google_item_id=f"ev{i}",
+            metadata={"id": f"ev{i}", "summary": title, "location": rng.choice(PLACES), "attendees": attendees},
+            sync_status=CalendarItem.SYNC_SYNCED,
+        ))
+        if len(rows) == 5000:
+            CalendarItem.objects.bulk_create(rows)
+            rows = []
+    CalendarItem.objects.bulk_create(rows)
+
+
+def random_query(rng):
+    words = rng.sample(WORDS + PEOPLE, rng.choice((1, 1, 2)))
+    # Cut the last word short, like a user still typing
+    words[-1] = words[-1][: rng.randint(2, len(words[-1]))]
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep-database-url", action="store_true", help="benchmark DATABASE_URL instead of SQLite")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory()
+    if not args.keep_database_url:
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir.name}/search.sqlite3"
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    os.environ.setdefault("DJANGO_SECRET_KEY", "benchmark")
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+    import django
+    from django.core.management import call_command
+    django.setup()
+    from django.db import connection
+    from authapp.search import search_items
+    from authapp.sync import get_mirror_user
+
+    call_command("migrate", verbosity=0)
+    rng = random.Random(args.seed)
+    user = get_mirror_user("bench@example.com")
+
+    started = time.perf_counter()
+    seed(user, args.items, rng)
+    seeded_s = time.perf_counter() - started
+
+    def run(window):
+        latencies = []
+        hits = 0
+        for _ in range(args.queries):
+            query = random_query(rng)
+            time_min = time_max = None
+            if window:
+                time_min = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(days=rng.randrange(0, 700))
+                time_max = time_min + timedelta(days=30)
+            t = time.perf_counter()
+            hits += len(search_items(user.id, query, time_min=time_min, time_max=time_max))
+            latencies.append(time.perf_counter() - t)
+        latencies.sort()
+        pct = lambda p: round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000, 2)
+        return {
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "avg_results": round(hits / args.queries, 1),
+        }
+
+    results = {
+        "backend": connection.vendor,
+        "items": args.items,
+        "queries": args.queries,
+        "seed_seconds": round(seeded_s, 1),
+        "text_only": run(window=False),
+        "with_30_day_window": run(window=True),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SEED_CREDENTIALS = """
+from datetime import timedelta
+from django.utils import timezone
+from authapp.models import GoogleCredentials
+for email in {emails!r}:
+    GoogleCredentials.objects.update_or_create(email=email, defaults=dict(
+        access_token="bench-token", refresh_token="bench-refresh", token_uri="{token_uri}",
+        client_id="bench", client_secret="bench", expiry=timezone.now() + timedelta(days=1)))
+"""
+
+
+def backend_env(db_path, google_root, **extra):
+    env = dict(os.environ)
+    env.update({
+        "DJANGO_SETTINGS_MODULE": "config.settings",
+        "DJANGO_SECRET_KEY": env.get("DJANGO_SECRET_KEY", "benchmark"),
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "GOOGLE_API_ROOT_URL": google_root,
+        "GOOGLE_TOKEN_REFRESH_INTERVAL": "0",
+    })
+    env.update({key: str(value) for key, value in extra.items()})
+    return env
+
+
+def prepare_database(env, emails):
+    manage = [sys.executable, "manage.py"]
+    subprocess.run(manage + ["migrate", "-v", "0"], cwd=BACKEND_DIR, env=env, check=True)
+    code = SEED_CREDENTIALS.format(emails=list(emails), token_uri=env["GOOGLE_API_ROOT_URL"] + "token")
+    subprocess.run(manage + ["shell", "-c", code], cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def start_process(command, env, port, ready_path="/admin/login/"):
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}{ready_path}", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{command[0]} did not start on port {port}")
+
+
+def summarize(latencies, elapsed, errors=0):
+    latencies = sorted(latencies)
+
+    def pct(p):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000, 2)
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+    }
@@ -0,0 +1,391 @@
+"""Local stand-in for the Calendar v3 and Tasks v1 REST endpoints used by the app.
+
+Run it with ``python -m benchmarks.fake_google --port 8765 --latency 0.05`` and
+point the backend at it with ``GOOGLE_API_ROOT_URL=http://127.0.0.1:8765/``.
+``GET /__stats`` returns the number of calls served so far.
+
+``fields=`` partial responses are honored for top-level and ``items(...)``
+selections. ``--page-size`` caps every page below what the client asks for, and
+``--error-rate`` / ``--rate-limit-rate`` make that fraction of calls fail with a
+503 backendError or a 429 rateLimitExceeded. Batch requests (``/batch/...``)
+are unpacked and every part is served, and can fail, on its own.
+"""
+import argparse
+import asyncio
+import email
+import json
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import httpx
+import uvicorn
+
+
+class FakeGoogle:
+    def __init__(self, latency=0.0, calendars=3, events_per_calendar=200, tasks=50,
+                 page_size=None, error_rate=0.0, rate_limit_rate=0.0, seed=None):
+        self.latency = latency
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.batched = 0
+        self.faults = Counter()
+        self.calendars = {
+            ("primary" if i == 0 else f"cal{i}@group.calendar.google.com"): self._events(i, events_per_calendar)
+            for i in range(calendars)
+        }
+        self.channels = {}
+        self.tasks = {DEFAULT_TASK_LIST: [self._task(DEFAULT_TASK_LIST, {"title": f"Task {i}"}, f"task{i}") for i in range(tasks)]}
+
+    def _task(self, list_id, body, task_id=None):
+        task_id = task_id or uuid.uuid4().hex
+        return dict(
+            body,
+            id=task_id,
+            status=body.get("status", "needsAction"),
+            updated=datetime.now(timezone.utc).isoformat(),
+            selfLink=f"https://www.googleapis.com/tasks/v1/lists/{list_id}/tasks/{task_id}",
+        )
+
+    def _events(self, seed, count):
+        return [google_event(seed, i) for i in range(count)]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        path = unquote(scope["path"])
+        query = parse_qs(scope["query_string"].decode())
+
+        headers = dict(scope["headers"])
+        content_type = b"application/json"
+        if path == "/__stats":
+            status, payload = 200, {"calls": self.calls, "batched": self.batched, "faults": dict(self.faults)}
+        else:
+            self.calls += 1
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if path.startswith("/batch"):
+                status, payload, content_type = self.batch(headers[b"content-type"], body)
+            else:
+                status, payload = self.serve(scope["method"], path, query, json.loads(body or b"{}"), headers)
+
+        if isinstance(payload, bytes):
+            data = payload
+        else:
+            data = json.dumps(payload).encode() if payload is not None else b""
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type), (b"content-length", str(len(data)).encode())],
+        })
+        await send({"type": "http.response.body", "body": data})
+
+    def serve(self, method, path, query, body, headers):
+        fault = self.fault()
+        if fault:
+            return fault
+        status, payload = self.route(method, path, query, body)
+        if "fields" in query and status == 200 and payload:
+            payload = partial(payload, query["fields"][0])
+        # Conditional GETs against an unchanged list get an empty 304, as from Google
+        if payload and status == 200 and payload.get("etag") and headers.get(b"if-none-match") == payload["etag"].encode():
+            return 304, None
+        return status, payload
+
+    def fault(self):
+        roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            self.faults[429] += 1
+            return 429, {"error": {
+                "code": 429,
+                "message": "Rate Limit Exceeded",
+                "errors": [{"domain": "usageLimits", "reason": "rateLimitExceeded"}],
+            }}
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.faults[503] += 1
+            return 503, {"error": {
+                "code": 503,
+                "message": "Backend Error",
+                "errors": [{"domain": "global", "reason": "backendError"}],
+            }}
+        return None
+
+    def batch(self, content_type, body):
+        # multipart/mixed of application/http parts, each a complete HTTP request
+        message = email.message_from_bytes(b"content-type: " + content_type + b"\r\n\r\n" + body)
+        boundary = uuid.uuid4().hex
+        parts = []
+        for part in message.get_payload():
+            head, _, part_body = part.get_payload().replace("\r\n", "\n").partition("\n\n")
+            method, target, _ = head.split("\n", 1)[0].split(" ", 2)
+            url = urlsplit(target)
+            self.batched += 1
+            status, payload = self.serve(method, unquote(url.path), parse_qs(url.query), json.loads(part_body or "{}"), {})
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'].strip('<>')}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+                f"Content-Type: application/json\r\n\r\n"
+                f"{json.dumps(payload) if payload is not None else ''}\r\n"
+            )
+        data = ("".join(parts) + f"--{boundary}--\r\n").encode()
+        return 200, data, f"multipart/mixed; boundary={boundary}".encode()
+
+    def route(self, method, path, query, body):
+        if path == "/calendar/v3/users/me/calendarList":
+            items = [{"id": cal_id, "summary": cal_id, "primary": cal_id == "primary", "accessRole": "owner"}
+                     for cal_id in self.calendars]
+            return 200, {"items": items, "etag": f'"{hash(tuple(self.calendars))}"'}
+
+        match = re.fullmatch(r"/calendar/v3/calendars/([^/]+)/events/watch", path)
+        if match and method == "POST":
+            self.channels[body["id"]] = {"address": body["address"], "token": body.get("token"), "calendar": match.group(1)}
+            ttl = int(body.get("params", {}).get("ttl", 604800))
+            return 200, {
+                "kind": "api#channel",
+                "id": body["id"],
+                "resourceId": f"res-{match.group(1)}",
+                "expiration": str(int((time.time() + ttl) * 1000)),
+            }
+
+        if path == "/calendar/v3/freeBusy" and method == "POST":
+            return 200, {"calendars": {item["id"]: self.freebusy(item["id"], body) for item in body.get("items", [])}}
+
+        if path == "/calendar/v3/channels/stop":
+            self.channels.pop(body.get("id"), None)
+            return 204, None
+
+        match = re.fullmatch(r"/calendar/v3/calendars/([^/]+)/events(?:/([^/]+))?", path)
+        if match:
+            return self.events(method, match.group(1), match.group(2), query, body)
+
+        match = re.fullmatch(r"/tasks/v1/lists/([^/]+)/tasks(?:/([^/]+))?", path)
+        if match:
+            return self.task_items(method, match.group(1), match.group(2), query, body)
+
+        if path == "/tasks/v1/users/@me/lists":
+            return 200, {"items": [{"id": list_id, "title": list_id} for list_id in self.tasks]}
+
+        return 404, {"error": {"code": 404, "message": f"No route for {method} {path}"}}
+
+    def events(self, method, calendar_id, event_id, query, body):
+        events = self.calendars.setdefault(calendar_id, [])
+        if method == "GET" and not event_id:
+            if "syncToken" in query:
+                return 200, {"items": [], "nextSyncToken": "sync"}
+            result = page(events, query, 250, self.page_size)
+            if "nextPageToken" not in result:
+                result["nextSyncToken"] = "sync"
+            return 200, result
+        if method == "POST":
+            # Like Google, honor client-chosen ids and reject duplicates
+            event_id = body.get("id") or uuid.uuid4().hex
+            if any(e["id"] == event_id for e in events):
+                return 409, {"error": {"code": 409, "message": "The requested identifier already exists."}}
+            event = dict(body, id=event_id, status="confirmed")
+            events.append(event)
+            return 200, event
+        if method in ("PATCH", "PUT"):
+            return 200, dict(body, id=event_id, status="confirmed")
+        if method == "DELETE":
+            return 204, None
+        return 405, {"error": {"code": 405, "message": "Method not allowed"}}
+
+    def freebusy(self, calendar_id, body):
+        if calendar_id not in self.calendars:
+            return {"errors": [{"domain": "global", "reason": "notFound"}], "busy": []}
+        time_min = datetime.fromisoformat(body["timeMin"])
+        time_max = datetime.fromisoformat(body["timeMax"])
+        busy = []
+        for event in self.calendars[calendar_id]:
+            start = datetime.fromisoformat(event["start"]["dateTime"])
+            end = datetime.fromisoformat(event["end"]["dateTime"])
+            if start < time_max and end > time_min:
+                busy.append({"start": start.isoformat(), "end": end.isoformat()})
+        return {"busy": busy}
+
+    def task_items(self, method, list_id, task_id, query, body):
+        if list_id == "@default":
+            list_id = DEFAULT_TASK_LIST
+        tasks = self.tasks.setdefault(list_id, [])
+        if method == "GET" and not task_id:
+            # Deleted tasks are kept as tombstones and only listed on request, like Google does
+            if query.get("showDeleted") != ["true"]:
+                tasks = [task for task in tasks if not task.get("deleted")]
+            if "updatedMin" in query:
+                since = datetime.fromisoformat(query["updatedMin"][0])
+                tasks = [task for task in tasks if datetime.fromisoformat(task["updated"]) >= since]
+            return 200, page(tasks, query, 20, self.page_size)
+        if method == "POST":
+            task = self._task(list_id, body)
+            tasks.append(task)
+            return 200, task
+        if method == "DELETE":
+            for i, task in enumerate(tasks):
+                if task["id"] == task_id:
+                    tasks[i] = self._task(list_id, dict(task, deleted=True), task_id)
+            return 204, None
+        return 405, {"error": {"code": 405, "message": "Method not allowed"}}
+
+
+def google_event(seed, i):
+    """An event shaped like what Calendar v3 returns, bookkeeping fields included."""
+    begin = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(hours=i * 7 + seed)
+    event_id = f"ev{seed}x{i}"
+    organizer = {"email": f"owner{seed}@example.com", "self": True}
+    return {
+        "kind": "calendar#event",
+        "etag": f'"{3400000000000000 + i}"',
+        "id": event_id,
+        "status": "confirmed",
+        "htmlLink": f"https://www.google.com/calendar/event?eid={event_id}",
+        "created": "2024-12-01T10:00:00.000Z",
+        "updated": "2024-12-02T10:00:00.000Z",
+        "summary": f"Event {i}",
+        "creator": organizer,
+        "organizer": organizer,
+        "start": {"dateTime": begin.isoformat(), "timeZone": "UTC"},
+        "end": {"dateTime": (begin + timedelta(hours=1)).isoformat(), "timeZone": "UTC"},
+        "iCalUID": f"{event_id}@google.com",
+        "sequence": 0,
+        "attendees": [
+            {"email": f"person{(i + n) % 40}@example.com", "responseStatus": "needsAction"} for n in range(3)
+        ],
+        "hangoutLink": f"https://meet.google.com/{event_id}",
+        "conferenceData": {
+            "entryPoints": [{
+                "entryPointType": "video",
+                "uri": f"https://meet.google.com/{event_id}",
+                "label": f"meet.google.com/{event_id}",
+            }],
+            "conferenceSolution": {
+                "key": {"type": "hangoutsMeet"},
+                "name": "Google Meet",
+                "iconUri": "https://fonts.gstatic.com/s/i/productlogos/meet_2020q4/v6/web-512dp/logo_meet_2020q4_color_2x_web_512dp.png",
+            },
+            "conferenceId": event_id,
+        },
+        "reminders": {"useDefault": True},
+        "eventType": "default",
+    }
+
+
+# Real id of the list Google also answers to as "@default"
+DEFAULT_TASK_LIST = "MDAwMDAwMDAwMDAwMDAwMDAwMDA6MDow"
+
+
+def page(items, query, default_size, cap=None):
+    size = int(query.get("maxResults", [default_size])[0])
+    size = min(size, cap) if cap else size
+    offset = int(query.get("pageToken", ["0"])[0])
+    result = {"items": items[offset:offset + size]}
+    if offset + size < len(items):
+        result["nextPageToken"] = str(offset + size)
+    return result
+
+
+def _selectors(spec):
+    # "nextPageToken,items(id,start)" -> {"nextPageToken": None, "items": "id,start"}
+    selectors, depth, name, inner = {}, 0, "", ""
+    for char in spec + ",":
+        if char == "(":
+            depth += 1
+            if depth == 1:
+                continue
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                continue
+        if depth:
+            inner += char
+        elif char == ",":
+            if name.strip():
+                selectors[name.strip()] = inner or None
+            name, inner = "", ""
+        else:
+            name += char
+    return selectors
+
+
+def partial(payload, spec):
+    """Google's partial response: only the fields selected, items(a,b) selecting within a list."""
+    result = {}
+    for name, inner in _selectors(spec).items():
+        if name not in payload:
+            continue
+        value = payload[name]
+        if inner and isinstance(value, list):
+            value = [partial(item, inner) for item in value]
+        elif inner and isinstance(value, dict):
+            value = partial(value, inner)
+        result[name] = value
+    return result
+
+
+def send_notification(address, channel_id, token, state="exists", message_number=1):
+    """Stub of Google's push sender: POSTs a watch notification to the webhook."""
+    return httpx.post(address, headers={
+        "X-Goog-Channel-ID": channel_id,
+        "X-Goog-Channel-Token": token or "",
+        "X-Goog-Resource-State": state,
+        "X-Goog-Message-Number": str(message_number),
+    })
+
+
+def command(port, latency, calendars=3, **options):
+    # Run in its own process so it does not compete with the load generator for the GIL.
+    # options are further flags by name, e.g. page_size=50 for --page-size 50.
+    import sys
+    args = [
+        sys.executable, "-m", "benchmarks.fake_google",
+        "--port", str(port), "--latency", str(latency), "--calendars", str(calendars),
+    ]
+    for name, value in options.items():
+        if value is not None:
+            args += ["--" + name.replace("_", "-"), str(value)]
+    return args
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument("--calendars", type=int, default=3)
+    parser.add_argument("--events", type=int, default=200, help="events per calendar")
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--page-size", type=int, help="largest page served, whatever maxResults asks for")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls failing with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of calls failing with 429")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    app = FakeGoogle(
+        latency=args.latency,
+        calendars=args.calendars,
+        events_per_calendar=args.events,
+        tasks=args.tasks,
+        page_size=args.page_size,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", backlog=4096)
+
+
+if __name__ == "__main__":
+    main()
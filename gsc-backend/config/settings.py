@@ -54,7 +54,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'authapp.middleware.MetricsMiddleware',
+    'authapp.middleware.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'authapp.middleware.CompressionMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -102,6 +106,15 @@ else:
         }
     }
 
+# SQLite (local runs, benchmarks): take the write lock when a transaction starts and
+# wait for it, instead of failing with "database is locked" under concurrent writes
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    DATABASES["default"].setdefault("OPTIONS", {}).update({
+        "transaction_mode": "IMMEDIATE",
+        "timeout": 20,
+        "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;",
+    })
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -160,6 +173,13 @@ CORS_ALLOW_HEADERS = [
     "Content-Type",
 ]
 
+# Lets the frontend read when the mirror was synced from a 304, which has no body
+CORS_EXPOSE_HEADERS = [
+    "ETag",
+    "X-Synced-At",
+    "X-Mirror-Stale",
+]
+
 CORS_ALLOW_METHODS = [
     "GET",
     "POST",
@@ -174,3 +194,105 @@ CORS_ALLOW_METHODS = [
 GOOGLE_CLIENT_ID= os.getenv('GOOGLE_CLIENT_ID')
 GOOGLE_CLIENT_SECRET= os.getenv('GOOGLE_CLIENT_SECRET')
 
+# Events are served from the local CalendarItem mirror; older than this triggers a sync
+MIRROR_MAX_STALENESS_SECONDS = int(os.getenv('MIRROR_MAX_STALENESS_SECONDS', '60'))
+
+# Built googleapiclient services are cached per user and token
+GOOGLE_SERVICE_CACHE_SIZE = int(os.getenv('GOOGLE_SERVICE_CACHE_SIZE', '256'))
+GOOGLE_SERVICE_CACHE_TTL = int(os.getenv('GOOGLE_SERVICE_CACHE_TTL', '300'))
+GOOGLE_DISCOVERY_CACHE_DIR = os.getenv('GOOGLE_DISCOVERY_CACHE_DIR', str(BASE_DIR / '.discovery_cache'))
+GOOGLE_API_ROOT_URL = os.getenv('GOOGLE_API_ROOT_URL')
+
+# Pooled keep-alive transport shared by all Calendar and Tasks calls
+GOOGLE_HTTP_POOL_CONNECTIONS = int(os.getenv('GOOGLE_HTTP_POOL_CONNECTIONS', '4'))
+GOOGLE_HTTP_POOL_SIZE = int(os.getenv('GOOGLE_HTTP_POOL_SIZE', '20'))
+GOOGLE_HTTP_CONNECT_TIMEOUT = float(os.getenv('GOOGLE_HTTP_CONNECT_TIMEOUT', '5'))
+GOOGLE_HTTP_READ_TIMEOUT = float(os.getenv('GOOGLE_HTTP_READ_TIMEOUT', '30'))
+GOOGLE_HTTP_RETRIES = int(os.getenv('GOOGLE_HTTP_RETRIES', '3'))
+
+# Decrypted credentials are cached in memory and refreshed ahead of expiry in the background
+GOOGLE_CREDENTIAL_CACHE_SIZE = int(os.getenv('GOOGLE_CREDENTIAL_CACHE_SIZE', '1024'))
+GOOGLE_TOKEN_REFRESH_INTERVAL = int(os.getenv('GOOGLE_TOKEN_REFRESH_INTERVAL', '60'))
+GOOGLE_TOKEN_REFRESH_MARGIN = int(os.getenv('GOOGLE_TOKEN_REFRESH_MARGIN', '300'))
+
+# In-flight connection cap for the async (ASGI) Google client
+GOOGLE_ASYNC_MAX_CONNECTIONS = int(os.getenv('GOOGLE_ASYNC_MAX_CONNECTIONS', '200'))
+
+# Outbox: items/create/ commits locally and a worker pool pushes to Google with retries
+OUTBOX_INPROCESS_WORKER = os.getenv('OUTBOX_INPROCESS_WORKER', 'true').lower() == 'true'
+OUTBOX_WORKERS = int(os.getenv('OUTBOX_WORKERS', '4'))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '8'))
+OUTBOX_BACKOFF_BASE = float(os.getenv('OUTBOX_BACKOFF_BASE', '2'))
+OUTBOX_BACKOFF_MAX = float(os.getenv('OUTBOX_BACKOFF_MAX', '600'))
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', '5'))
+
+# Background refresh of every connected account (manage.py run_sync_scheduler).
+# Accounts used within SCHEDULER_ACTIVE_WINDOW are synced every SCHEDULER_ACTIVE_INTERVAL
+# seconds, others every SCHEDULER_IDLE_INTERVAL, and those unused for SCHEDULER_DORMANT_AFTER
+# every SCHEDULER_DORMANT_INTERVAL, each with +/- SCHEDULER_JITTER spread.
+SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', '8'))
+SCHEDULER_ACTIVE_INTERVAL = int(os.getenv('SCHEDULER_ACTIVE_INTERVAL', '300'))
+SCHEDULER_IDLE_INTERVAL = int(os.getenv('SCHEDULER_IDLE_INTERVAL', '3600'))
+SCHEDULER_DORMANT_INTERVAL = int(os.getenv('SCHEDULER_DORMANT_INTERVAL', str(6 * 3600)))
+SCHEDULER_ACTIVE_WINDOW = int(os.getenv('SCHEDULER_ACTIVE_WINDOW', str(24 * 3600)))
+SCHEDULER_DORMANT_AFTER = int(os.getenv('SCHEDULER_DORMANT_AFTER', str(30 * 24 * 3600)))
+SCHEDULER_JITTER = float(os.getenv('SCHEDULER_JITTER', '0.2'))
+SCHEDULER_RESOURCES_PER_TURN = int(os.getenv('SCHEDULER_RESOURCES_PER_TURN', '5'))
+SCHEDULER_POLL_INTERVAL = float(os.getenv('SCHEDULER_POLL_INTERVAL', '5'))
+
+# Calendar push notifications. Set GOOGLE_WEBHOOK_URL to the public https URL of
+# auth/events/webhook to enable watch channels; unset keeps plain polling.
+# Channels are renewed, and expired ones deleted, hourly by run_sync_scheduler (the
+# gsc-sync-scheduler worker in render.yaml), or by cron running renew_watch_channels.
+GOOGLE_WEBHOOK_URL = os.getenv('GOOGLE_WEBHOOK_URL')
+GOOGLE_WATCH_TTL = int(os.getenv('GOOGLE_WATCH_TTL', str(7 * 24 * 3600)))
+GOOGLE_WATCH_RENEW_MARGIN = int(os.getenv('GOOGLE_WATCH_RENEW_MARGIN', str(24 * 3600)))
+GOOGLE_WEBHOOK_COALESCE_SECONDS = float(os.getenv('GOOGLE_WEBHOOK_COALESCE_SECONDS', '2'))
+GOOGLE_WATCHED_MAX_STALENESS_SECONDS = int(os.getenv('GOOGLE_WATCHED_MAX_STALENESS_SECONDS', '3600'))
+
+# Client-side token buckets in front of every Google call, per user and per project.
+# Limits are per process: divide the Cloud console quotas by the number of workers.
+GOOGLE_USER_QPS = float(os.getenv('GOOGLE_USER_QPS', '10'))
+GOOGLE_USER_BURST = float(os.getenv('GOOGLE_USER_BURST', '20'))
+GOOGLE_PROJECT_QPS = float(os.getenv('GOOGLE_PROJECT_QPS', '100'))
+GOOGLE_THROTTLE_MAX_WAIT = float(os.getenv('GOOGLE_THROTTLE_MAX_WAIT', '10'))
+# Rate-limited calls are retried GOOGLE_RATE_LIMIT_RETRIES times but for at most
+# GOOGLE_RATE_LIMIT_MAX_WAIT seconds in all; past that the view answers 429 with Retry-After.
+GOOGLE_RATE_LIMIT_RETRIES = int(os.getenv('GOOGLE_RATE_LIMIT_RETRIES', '5'))
+GOOGLE_RATE_LIMIT_MAX_WAIT = float(os.getenv('GOOGLE_RATE_LIMIT_MAX_WAIT', '10'))
+GOOGLE_BACKOFF_BASE = float(os.getenv('GOOGLE_BACKOFF_BASE', '1'))
+GOOGLE_BACKOFF_MAX = float(os.getenv('GOOGLE_BACKOFF_MAX', '32'))
+
+# events/all refreshes and reads this many calendars at once per request
+EVENTS_FANOUT_WORKERS = int(os.getenv('EVENTS_FANOUT_WORKERS', '8'))
+
+# Per-user response cache for profiles and calendar lists. Local memory by default;
+# set DJANGO_CACHE_DIR to share entries between workers on one host via files.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('DJANGO_CACHE_DIR'),
+    } if os.getenv('DJANGO_CACHE_DIR') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+PROFILE_CACHE_TTL = int(os.getenv('PROFILE_CACHE_TTL', '600'))
+CALENDAR_LIST_CACHE_TTL = int(os.getenv('CALENDAR_LIST_CACHE_TTL', '300'))
+
+# Responses are gzipped, or brotli-compressed when the brotli package is installed,
+# once they reach COMPRESSION_MIN_BYTES. ConditionalGetMiddleware adds ETags and 304s.
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5'))
+
+# Prometheus text-format metrics are served at /metrics. Set METRICS_TOKEN to
+# require "Authorization: Bearer <token>" from the scraper.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Request profiling, stored as RequestProfile rows in the admin. A fraction of requests
+# is sampled and kept when slower than PROFILE_SLOW_MS; any request carrying the
+# PROFILE_HEADER header set to PROFILE_TOKEN is always profiled. Off by default.
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_SLOW_MS = float(os.getenv('PROFILE_SLOW_MS', '500'))
+PROFILE_HEADER = os.getenv('PROFILE_HEADER', 'X-Profile-Request')
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')